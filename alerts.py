@@ -1,19 +1,188 @@
 \
-import os, json, requests
+import os, json, time, uuid, hashlib, requests
+from datetime import datetime, timedelta, timezone
 from dotenv import load_dotenv
+from sqlalchemy import text, bindparam
+from metrics import inc, observe, stage, timer, host_of
 
 load_dotenv()
 SLACK_WEBHOOK_URL = os.getenv("SLACK_WEBHOOK_URL")
+# Alerts of one kind pending together are merged into messages of up to this
+# many entries (Slack allows 50 blocks per message)
+SLACK_BATCH_SIZE = min(int(os.getenv("SLACK_BATCH_SIZE", "20")), 45)
+SLACK_MAX_RETRIES = int(os.getenv("SLACK_MAX_RETRIES", "5"))
+# Incoming webhooks are limited to roughly one message per second
+SLACK_MIN_INTERVAL = float(os.getenv("SLACK_MIN_INTERVAL", "1.0"))
+# Outbox rows that failed this many dispatches are left for inspection
+ALERT_MAX_ATTEMPTS = int(os.getenv("ALERT_MAX_ATTEMPTS", "5"))
+# A dispatcher claims rows before sending them; a claim older than this is
+# taken to be from a dispatcher that died and may be claimed again
+ALERT_CLAIM_LEASE = float(os.getenv("ALERT_CLAIM_LEASE", "600"))
+
+KIND_TITLES = {"status": "bill status changes", "rss": "news items", "http": "web items"}
+
+_session = None
+_last_post = 0.0
+
+def _get_session():
+    global _session
+    if _session is None:
+        _session = requests.Session()
+    return _session
+
+def _post(payload) -> bool:
+    # Spaces posts SLACK_MIN_INTERVAL apart, honors Retry-After on 429 and
+    # backs off exponentially on 5xx / network errors.
+    global _last_post
+    delay = 1.0
+    err = "rate limited"
+    for attempt in range(SLACK_MAX_RETRIES + 1):
+        wait = _last_post + SLACK_MIN_INTERVAL - time.monotonic()
+        if wait > 0:
+            time.sleep(wait)
+        _last_post = time.monotonic()
+        try:
+            with timer("http_client_request_seconds", host=host_of(SLACK_WEBHOOK_URL)):
+                resp = _get_session().post(SLACK_WEBHOOK_URL, json=payload, timeout=10)
+        except requests.RequestException as e:
+            err = e
+        else:
+            inc("http_client_responses_total", host=host_of(SLACK_WEBHOOK_URL), code=str(resp.status_code))
+            if resp.status_code == 429:
+                time.sleep(float(resp.headers.get("Retry-After", delay)))
+                continue
+            try:
+                resp.raise_for_status()
+                return True
+            except Exception as e:
+                if resp.status_code < 500:
+                    print("Slack send failed:", e)
+                    return False
+                err = e
+        if attempt < SLACK_MAX_RETRIES:
+            time.sleep(delay)
+            delay = min(delay * 2, 60)
+    print("Slack send failed:", err)
+    return False
 
 def send_slack(message: str, blocks=None):
     if not SLACK_WEBHOOK_URL:
         print("⚠️ No SLACK_WEBHOOK_URL set; skipping Slack")
-        return
+        return False
     payload = {"text": message}
     if blocks:
         payload["blocks"] = blocks
-    resp = requests.post(SLACK_WEBHOOK_URL, json=payload, timeout=10)
-    try:
-        resp.raise_for_status()
-    except Exception as e:
-        print("Slack send failed:", e)
+    return _post(payload)
+
+def alert_key(*parts) -> str:
+    return hashlib.sha256("|".join(str(p) for p in parts).encode("utf-8")).hexdigest()
+
+def enqueue_alert(conn, kind, key, message, blocks=None):
+    """Queue a Slack alert in the caller's transaction.
+
+    `key` makes enqueueing idempotent: replaying the same page or item after
+    a crash finds the row already there instead of alerting twice.
+    """
+    result = conn.execute(text("""
+        INSERT INTO alert_outbox (id, kind, message, blocks, created_at, attempts)
+        VALUES (:id, :kind, :message, :blocks, :created_at, 0)
+        ON CONFLICT(id) DO NOTHING
+    """), {
+        "id": key,
+        "kind": kind,
+        "message": message,
+        "blocks": json.dumps(blocks) if blocks else None,
+        "created_at": datetime.now(timezone.utc).isoformat(),
+    })
+    if result.rowcount == 1:  # a replayed key inserts nothing
+        inc("alerts_queued_total", kind=kind)
+
+def _coalesce(kind, rows):
+    if len(rows) == 1:
+        r = rows[0]
+        return r.message, json.loads(r.blocks) if r.blocks else None
+    title = f"*{len(rows)} {KIND_TITLES.get(kind, kind + ' alerts')}*"
+    blocks = [{"type": "section", "text": {"type": "mrkdwn", "text": title}}, {"type": "divider"}]
+    for r in rows:
+        blocks.append({"type": "section", "text": {"type": "mrkdwn", "text": r.message[:3000]}})
+    return title, blocks
+
+_CLAIM_SQL = text("""
+    UPDATE alert_outbox SET claimed_at=:t, claim=:claim
+    WHERE id IN :ids AND sent_at IS NULL AND (claimed_at IS NULL OR claimed_at < :expired)
+""").bindparams(bindparam("ids", expanding=True))
+_SENT_SQL = text("UPDATE alert_outbox SET sent_at=:t, attempts=attempts+1 WHERE id IN :ids").bindparams(bindparam("ids", expanding=True))
+_FAILED_SQL = text("UPDATE alert_outbox SET attempts=attempts+1, last_error='send failed at ' || :t WHERE id IN :ids").bindparams(bindparam("ids", expanding=True))
+_RELEASE_SQL = text("UPDATE alert_outbox SET claimed_at=NULL, claim=NULL WHERE claim=:claim AND sent_at IS NULL")
+
+def dispatch_outbox(engine, chunk=500) -> int:
+    """Send pending outbox rows, oldest first, merging runs of one kind.
+
+    Each chunk is claimed in the transaction that reads it, so dispatchers
+    running at once (the daemon, collectors, `alerts.py dispatch`) never
+    send the same row; a claim lapses after ALERT_CLAIM_LEASE seconds.
+    Rows are marked sent right after their message is accepted; on a failed
+    send the batch records the error and dispatch stops, releasing the rest
+    for the next run. Returns the number of alerts delivered.
+    """
+    if not SLACK_WEBHOOK_URL:
+        print("⚠️ No SLACK_WEBHOOK_URL set; leaving alerts queued")
+        return 0
+    sent = 0
+    claim = uuid.uuid4().hex
+    while True:
+        now = datetime.now(timezone.utc)
+        expired = (now - timedelta(seconds=ALERT_CLAIM_LEASE)).isoformat()
+        with engine.begin() as conn:
+            ids = conn.execute(text("""
+                SELECT id FROM alert_outbox
+                WHERE sent_at IS NULL AND attempts < :max_attempts
+                  AND (claimed_at IS NULL OR claimed_at < :expired)
+                ORDER BY created_at, id
+                LIMIT :lim
+            """), {"lim": chunk, "max_attempts": ALERT_MAX_ATTEMPTS, "expired": expired}).scalars().all()
+            if not ids:
+                return sent
+            conn.execute(_CLAIM_SQL, {"ids": ids, "t": now.isoformat(), "claim": claim, "expired": expired})
+            # only what this dispatcher won: another may have claimed some since the SELECT
+            pending = conn.execute(text("""
+                SELECT id, kind, message, blocks, created_at FROM alert_outbox
+                WHERE claim=:claim AND sent_at IS NULL
+                ORDER BY created_at, id
+            """), {"claim": claim}).all()
+
+        batches = []
+        for r in pending:
+            if batches and batches[-1][0] == r.kind and len(batches[-1][1]) < SLACK_BATCH_SIZE:
+                batches[-1][1].append(r)
+            else:
+                batches.append((r.kind, [r]))
+
+        for kind, rows in batches:
+            message, blocks = _coalesce(kind, rows)
+            with stage("slack_send"):
+                ok = send_slack(message, blocks=blocks)
+            now = datetime.now(timezone.utc)
+            params = {"ids": [r.id for r in rows], "t": now.isoformat()}
+            with engine.begin() as conn:
+                conn.execute(_SENT_SQL if ok else _FAILED_SQL, params)
+                if not ok:
+                    conn.execute(_RELEASE_SQL, {"claim": claim})
+            if not ok:
+                inc("alerts_failed_total", len(rows))
+                return sent
+            inc("alerts_sent_total", len(rows))
+            for r in rows:
+                observe("alert_latency_seconds", (now - datetime.fromisoformat(r.created_at)).total_seconds())
+            sent += len(rows)
+
+if __name__ == "__main__":
+    import sys
+    if len(sys.argv) >= 2 and sys.argv[1] == "dispatch":
+        from db import get_engine
+        from metrics import CollectorRun
+        engine = get_engine()
+        with CollectorRun(engine, "alerts"):
+            print(f"Alerts sent: {dispatch_outbox(engine)}")
+    else:
+        print("Usage: python alerts.py dispatch")
@@ -0,0 +1,147 @@
+import os, argparse, queue, threading, time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from dotenv import load_dotenv
+from db import get_engine, query_hash, get_watermark, set_watermark, clear_watermark
+from ingest import select_changed, prepare_bills, write_prepared
+from openstates_api import OPENSTATES_API_KEY, OPENSTATES_CONCURRENCY, iter_pages
+
+# Load whole sessions: pages stream from concurrent fetches through a
+# bounded queue, are normalized/labeled in a process pool, and are written
+# in page order, one transaction per page. Each page commit also records it
+# as the jurisdiction's checkpoint, so an interrupted run resumes after the
+# last written page. No alerts are queued for backfilled bills.
+
+load_dotenv()
+
+BACKFILL_WORKERS = int(os.getenv("BACKFILL_WORKERS", str(os.cpu_count() or 2)))
+# Pages fetched but not yet handed to the pool, and pages in the pool
+# waiting to be written; both bound memory and push back on the fetchers
+BACKFILL_QUEUE_PAGES = int(os.getenv("BACKFILL_QUEUE_PAGES", "16"))
+BACKFILL_INFLIGHT_PAGES = int(os.getenv("BACKFILL_INFLIGHT_PAGES", str(2 * BACKFILL_WORKERS)))
+PROGRESS_EVERY = float(os.getenv("BACKFILL_PROGRESS_EVERY", "10"))
+
+_DONE = object()
+
+def _fetch(states, params, concurrency, start_pages, out: queue.Queue, stop: threading.Event):
+    try:
+        for item in iter_pages(states, params, concurrency, start_pages=start_pages):
+            while not stop.is_set():
+                try:
+                    out.put(item, timeout=0.5)
+                    break
+                except queue.Full:
+                    continue
+            if stop.is_set():
+                return
+        out.put(_DONE)
+    except BaseException as e:
+        out.put(e)
+
+class Progress:
+    def __init__(self):
+        self.started = time.monotonic()
+        self.last = self.started
+        self.pages = 0
+        self.totals = {"new": 0, "changed": 0, "skipped": 0}
+
+    def add(self, counts):
+        self.pages += 1
+        for k, v in counts.items():
+            self.totals[k] += v
+
+    def line(self, where=""):
+        elapsed = max(time.monotonic() - self.started, 1e-9)
+        bills = sum(self.totals.values())
+        t = self.totals
+        return (f"{where}{self.pages} pages, {bills} bills ({t['new']} new, {t['changed']} changed, "
+                f"{t['skipped']} unchanged) in {elapsed:.0f}s: {bills / elapsed:.1f} bills/s")
+
+    def maybe_print(self, where, queued, inflight):
+        now = time.monotonic()
+        if now - self.last >= PROGRESS_EVERY:
+            self.last = now
+            print(self.line(where) + f"  [queue {queued}, in pool {inflight}]", flush=True)
+
+def main():
+    parser = argparse.ArgumentParser(description="Load entire OpenStates sessions in bulk")
+    parser.add_argument("--state", action="append", required=True, help="Jurisdiction name or postal. Repeatable.")
+    parser.add_argument("--session", required=True, help="Legislative session identifier (e.g. 2025)")
+    parser.add_argument("--q", default="", help="Optional OpenStates keyword query to narrow the load")
+    parser.add_argument("--concurrency", type=int, default=OPENSTATES_CONCURRENCY, help="Parallel page fetches")
+    parser.add_argument("--workers", type=int, default=BACKFILL_WORKERS, help="Normalize/label processes")
+    parser.add_argument("--restart", action="store_true", help="Ignore checkpoints and start from page 1")
+    parser.add_argument("--no-labels", action="store_true", help="Skip topic labeling")
+    args = parser.parse_args()
+
+    if not OPENSTATES_API_KEY:
+        raise SystemExit("OPENSTATES_API_KEY not set")
+
+    # first_action order keeps page contents stable while a long load runs:
+    # bills introduced meanwhile land on the last pages
+    params = {"session": args.session, "sort": "first_action_asc", "per_page": 50,
+              "include": "sponsorships,actions,subject,related_bills"}
+    if args.q:
+        params["q"] = args.q
+    qhash = query_hash(f"{args.session}|{args.q}")
+    with_labels = not args.no_labels
+
+    engine = get_engine()
+    start_pages = {}
+    with engine.begin() as conn:
+        for st in args.state:
+            if args.restart:
+                clear_watermark(conn, "backfill", st, qhash)
+                continue
+            mark = get_watermark(conn, "backfill", st, qhash)
+            if mark:
+                start_pages[st] = int(mark) + 1
+    for st, page in start_pages.items():
+        print(f"{st}: resuming at page {page}")
+
+    pages = queue.Queue(maxsize=BACKFILL_QUEUE_PAGES)
+    stop = threading.Event()
+    fetcher = threading.Thread(target=_fetch, name="backfill-fetch", daemon=True,
+                               args=(args.state, params, args.concurrency, start_pages, pages, stop))
+    fetcher.start()
+
+    progress = Progress()
+    inflight = deque()  # (st, page, future, known, counts), in page order
+
+    def write_head():
+        st, page, fut, known, counts = inflight.popleft()
+        prepared = fut.result()
+        with engine.begin() as conn:
+            write_prepared(conn, prepared, known)
+            set_watermark(conn, "backfill", st, qhash, f"{page:06d}")
+        progress.add(counts)
+        progress.maybe_print(f"{st} p{page}: ", pages.qsize(), len(inflight))
+
+    try:
+        with ProcessPoolExecutor(max_workers=max(1, args.workers)) as pool:
+            while True:
+                item = pages.get()
+                if item is _DONE:
+                    break
+                if isinstance(item, BaseException):
+                    raise item
+                st, page, results = item
+                with engine.begin() as conn:
+                    todo, known, counts = select_changed(conn, results, with_labels)
+                inflight.append((st, page, pool.submit(prepare_bills, todo, with_labels=with_labels), known, counts))
+                # write finished pages in order; block only when the pool is full
+                while inflight and (len(inflight) >= BACKFILL_INFLIGHT_PAGES or inflight[0][2].done()):
+                    write_head()
+            while inflight:
+                write_head()
+    except KeyboardInterrupt:
+        stop.set()
+        print("\nInterrupted; rerun the same command to resume from the last written page.")
+        raise SystemExit(130)
+    finally:
+        stop.set()
+
+    print(progress.line("Backfill complete: "))
+
+if __name__ == "__main__":
+    main()
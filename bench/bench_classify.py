@@ -0,0 +1,60 @@
+"""Compare classify.label_record against the original per-pattern re.search loop.
+
+    python -m bench.bench_classify --n 20000
+
+Checks that both produce identical labels on every generated text, then
+reports throughput for the legacy loop, label_record and label_many.
+"""
+import argparse, random, re, time
+from classify import AI_TERMS, PRIVACY_TERMS, HOUSING_TERMS, HEALTH_TERMS, label_record, label_many
+
+FILLER = ("an act relating to the state department of revenue public safety "
+          "appropriations schools transportation county municipal code amend "
+          "section repeal provide establish requirements reporting").split()
+TERMS = [t.replace("\\b", "").replace("'?", "'") for t in AI_TERMS + PRIVACY_TERMS + HOUSING_TERMS + HEALTH_TERMS]
+
+def legacy_label_record(text):
+    tx = (text or "").lower()
+    def any_match(patterns):
+        return any(re.search(p, tx) for p in patterns)
+    return {
+        "ai": any_match(AI_TERMS),
+        "privacy": any_match(PRIVACY_TERMS),
+        "housing": any_match(HOUSING_TERMS),
+        "healthcare": any_match(HEALTH_TERMS),
+    }
+
+def make_texts(n, words=60, hit_rate=0.3, seed=7):
+    rnd = random.Random(seed)
+    texts = []
+    for _ in range(n):
+        tokens = [rnd.choice(FILLER) for _ in range(words)]
+        while rnd.random() < hit_rate:
+            tokens.insert(rnd.randrange(len(tokens) + 1), rnd.choice(TERMS).upper() if rnd.random() < 0.2 else rnd.choice(TERMS))
+        texts.append(" ".join(tokens))
+    return texts
+
+def timed(fn):
+    t0 = time.perf_counter()
+    out = fn()
+    return out, time.perf_counter() - t0
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--n", type=int, default=20000)
+    parser.add_argument("--words", type=int, default=60)
+    parser.add_argument("--hit-rate", type=float, default=0.3)
+    args = parser.parse_args()
+
+    texts = make_texts(args.n, args.words, args.hit_rate)
+    old, t_old = timed(lambda: [legacy_label_record(t) for t in texts])
+    new, t_new = timed(lambda: [label_record(t) for t in texts])
+    batch, t_batch = timed(lambda: label_many(texts))
+    assert old == new == batch, "label mismatch vs legacy classifier"
+
+    for name, t in (("legacy re.search", t_old), ("label_record", t_new), ("label_many", t_batch)):
+        print(f"{name:18s} {t*1000:8.1f} ms  {args.n / t:10.0f} texts/s")
+    print(f"speedup: {t_old / t_new:.2f}x (identical labels on {args.n} texts)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+"""Dashboard query latency while a collector-style writer is committing.
+
+    python -m bench.bench_db_concurrency --bills 50000 --seconds 10
+
+Runs the same workload twice against a synthetic SQLite database: once with
+plain create_engine() defaults (rollback journal, no busy timeout), once
+with db.get_engine()'s WAL/pragma setup (reader pool for the queries, the
+single-writer engine in the writer process). Readers call
+serve.query_bills with rotating filters; the writer upserts pages of 500
+bills in back-to-back transactions from a separate process.
+"""
+import argparse, os, random, shutil, sqlite3, statistics, sys, tempfile, threading, time
+import multiprocessing as mp
+
+STATES = ["CA", "NY", "TX", "WA", "IL", "FL"]
+STATUSES = ["INTRODUCED", "IN_COMMITTEE", "REPORTED", "ON_FLOOR", "ENACTED"]
+QUERIES = [{}, {"state": "CA"}, {"state": "NY", "status": "ENACTED"}, {"status": "IN_COMMITTEE"},
+           {"only_effective_soon": 1}]
+
+def bill_row(i, rnd, stamp):
+    return {
+        "bill_uid": f"bench:{i:08d}", "source": "bench", "jurisdiction": rnd.choice(STATES), "session": "2025",
+        "bill_number": f"HB {i}", "title": f"An act relating to item {i}", "summary": "x" * rnd.randint(50, 400),
+        "subjects": "", "sponsors_primary": "", "committees": "", "status_general": rnd.choice(STATUSES),
+        "status_specific": "", "introduced_date": "2025-01-01",
+        "effective_date": rnd.choice([None, "2025-07-01", "2026-01-01", "2030-01-01"]),
+        "last_action_date": "2025-03-01", "updated_at": stamp, "fingerprint": None,
+    }
+
+def seed(path, n):
+    os.environ["DATABASE_URL"] = f"sqlite:///{path}"
+    import db
+    db.migrate()
+    rnd = random.Random(7)
+    engine = db.get_engine()
+    with engine.begin() as conn:
+        for start in range(0, n, 5000):
+            db.bulk_upsert_bills(conn, [bill_row(i, rnd, f"2025-03-{1 + i % 28:02d}T00:00:00")
+                                        for i in range(start, min(n, start + 5000))])
+    engine.dispose()
+
+def writer(path, tuned, n, stop_at, out):
+    os.environ["DATABASE_URL"] = f"sqlite:///{path}"
+    import db
+    from sqlalchemy import create_engine
+    engine = db.get_engine() if tuned else create_engine(f"sqlite:///{path}", future=True)
+    rnd = random.Random(11)
+    commits = errors = 0
+    while time.time() < stop_at:
+        stamp = time.strftime("%Y-%m-%dT%H:%M:%S")
+        rows = [bill_row(rnd.randrange(n), rnd, stamp) for _ in range(500)]
+        try:
+            with engine.begin() as conn:
+                db.bulk_upsert_bills(conn, rows)
+            commits += 1
+        except Exception:
+            errors += 1
+    out.put((commits, errors))
+
+def run(path, tuned, n, seconds, readers):
+    os.environ["DATABASE_URL"] = f"sqlite:///{path}"
+    import serve
+    from sqlalchemy import create_engine
+    import db
+    if tuned:
+        db.DATABASE_URL = f"sqlite:///{path}"
+        db._engines.clear()
+        serve.engine = db.get_engine("reader")
+    else:
+        serve.engine = create_engine(f"sqlite:///{path}", future=True)
+
+    ctx = mp.get_context("spawn")
+    out = ctx.Queue()
+    stop_at = time.time() + seconds + 1
+    proc = ctx.Process(target=writer, args=(path, tuned, n, stop_at, out))
+    proc.start()
+    time.sleep(1)  # let the writer get going
+
+    latencies, errors = [], []
+    lock = threading.Lock()
+
+    def reader(k):
+        i = k
+        while time.time() < stop_at:
+            q = QUERIES[i % len(QUERIES)]
+            i += 1
+            t0 = time.perf_counter()
+            try:
+                serve.query_bills(limit=100, **q)
+            except Exception as e:
+                with lock:
+                    errors.append(type(e).__name__)
+                continue
+            with lock:
+                latencies.append(time.perf_counter() - t0)
+
+    threads = [threading.Thread(target=reader, args=(k,)) for k in range(readers)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    commits, werrors = out.get()
+    proc.join()
+    serve.engine.dispose()
+
+    lat = sorted(latencies)
+    q = statistics.quantiles(lat, n=100, method="inclusive") if len(lat) >= 2 else [float("nan")] * 99
+    label = "tuned (WAL + pools)" if tuned else "defaults"
+    print(f"{label:22s} queries {len(lat):6d}  p50 {q[49]*1000:7.1f} ms  p95 {q[94]*1000:7.1f} ms  "
+          f"p99 {q[98]*1000:7.1f} ms  max {lat[-1]*1000 if lat else float('nan'):7.1f} ms  "
+          f"read errors {len(errors)}  writer commits {commits} (errors {werrors})")
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--bills", type=int, default=50000)
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--readers", type=int, default=4)
+    args = parser.parse_args()
+
+    tmp = tempfile.mkdtemp(prefix="bench_db_")
+    try:
+        tuned_path = os.path.join(tmp, "tuned.db")
+        plain_path = os.path.join(tmp, "plain.db")
+        seed(tuned_path, args.bills)
+        c = sqlite3.connect(tuned_path)
+        c.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        c.close()
+        shutil.copy(tuned_path, plain_path)
+        c = sqlite3.connect(plain_path)
+        c.execute("PRAGMA journal_mode=DELETE")
+        c.close()
+        print(f"{args.bills} bills, {args.readers} reader threads, {args.seconds:.0f}s of concurrent writes")
+        run(plain_path, False, args.bills, args.seconds, args.readers)
+        run(tuned_path, True, args.bills, args.seconds, args.readers)
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,92 @@
+"""Time HTTPKeywordPlugin's link extraction on large list pages.
+
+    python -m bench.bench_http_extract --results 3000
+    python -m bench.bench_http_extract --page saved_search.html --link-selector "a" --snippet-selector "p.snippet"
+
+Without --page a deterministic Plural-style search page is generated. The
+original BeautifulSoup scan (whole-document select_one per unmatched link)
+is timed alongside when bs4 is installed.
+"""
+import argparse, random, time
+from plugins.http_keyword import KeywordFilter, extract_links
+
+WORDS = "act relating to public safety roads schools revenue county code amend section budget".split()
+HITS = ["privacy", "biometric data", "artificial intelligence", "tenant screening"]
+
+def make_page(results, seed=11):
+    rnd = random.Random(seed)
+    parts = ["<html><head><title>Search</title></head><body><nav>"]
+    parts += [f'<a href="/nav/{i}">Menu {i}</a>' for i in range(50)]
+    parts.append('</nav><main><ol class="results">')
+    for i in range(results):
+        title = " ".join(rnd.choice(WORDS) for _ in range(8))
+        snippet = " ".join(rnd.choice(WORDS) for _ in range(40))
+        if rnd.random() < 0.1:
+            title += " " + rnd.choice(HITS)
+        elif rnd.random() < 0.1:
+            snippet += " " + rnd.choice(HITS)
+        parts.append(f'<li class="result"><h3><a href="/bill/{i}">{title}</a></h3>'
+                     f'<p class="snippet">{snippet}</p><span><a href="/bill/{i}/votes">votes</a></span></li>')
+    parts.append("</ol></main></body></html>")
+    return "".join(parts).encode("utf-8")
+
+def legacy_extract(html, base_url, link_sel, snippet_sel, include, exclude):
+    from bs4 import BeautifulSoup
+    from urllib.parse import urljoin
+    def _match(text):
+        t = (text or "").lower()
+        if include and not any(k.lower() in t for k in include):
+            return False
+        if exclude and any(k.lower() in t for k in exclude):
+            return False
+        return True
+    soup = BeautifulSoup(html.decode("utf-8", "replace"), "lxml")
+    out = []
+    for a in soup.select(link_sel):
+        title = (a.get_text() or "").strip()
+        href = a.get("href")
+        if not href or not title:
+            continue
+        if not _match(title):
+            if snippet_sel:
+                sn = soup.select_one(snippet_sel)
+                if not _match((sn.get_text() or "").strip() if sn else ""):
+                    continue
+            else:
+                continue
+        out.append((title, urljoin(base_url, href)))
+    return out
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--page", action="append", help="Saved HTML page (repeatable); default: generated")
+    parser.add_argument("--results", type=int, default=3000)
+    parser.add_argument("--link-selector", default="a")
+    parser.add_argument("--snippet-selector", default="p.snippet")
+    parser.add_argument("--include", default="privacy,biometric,artificial intelligence,tenant")
+    parser.add_argument("--exclude", default="")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    include = [w for w in args.include.split(",") if w]
+    exclude = [w for w in args.exclude.split(",") if w]
+    pages = [open(p, "rb").read() for p in args.page] if args.page else [make_page(args.results)]
+    keep = KeywordFilter(include, exclude)
+
+    for i, html in enumerate(pages):
+        base = "https://example.org/search"
+        t0 = time.perf_counter()
+        for _ in range(args.repeat):
+            new = list(extract_links(html, base, args.link_selector, args.snippet_selector, keep))
+        t_new = (time.perf_counter() - t0) / args.repeat
+        print(f"page {i}: {len(html)/1024:.0f} KiB  extract_links {t_new*1000:8.1f} ms  {len(new)} links kept")
+        try:
+            t0 = time.perf_counter()
+            old = legacy_extract(html, base, args.link_selector, args.snippet_selector, include, exclude)
+            t_old = time.perf_counter() - t0
+            print(f"        legacy bs4    {t_old*1000:8.1f} ms  {len(old)} links kept  ({t_old / t_new:.1f}x)")
+        except ImportError:
+            print("        (bs4 not installed; legacy timing skipped)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""Simulate a year of polling with fixed and adaptive intervals.
+
+    python -m bench.bench_polling
+    python -m bench.bench_polling --states 50 --feeds 40 --days 365 --seed 7
+
+No network and no database: each source is a stream of change times, and
+each strategy is run against it with polling.adapt() deciding the next
+interval, as daemon.py does. Jurisdictions get one or two sessions a year
+with tens to a couple of hundred bill changes a day, and a trickle outside
+them. Feeds post daily, weekly or monthly. Reported per kind: polls (the
+request budget) and how long a change waited before a poll picked it up.
+"""
+import argparse, bisect, random
+from polling import adapt, PollState
+
+DAY = 86400.0
+
+def state_changes(rnd, days):
+    out = []
+    for _ in range(rnd.choice([1, 1, 2])):
+        start = rnd.uniform(0, days - 60) * DAY
+        length = rnd.uniform(40, 150) * DAY
+        per_day = rnd.uniform(20, 200)
+        out += _poisson(rnd, per_day, start, min(start + length, days * DAY))
+    out += _poisson(rnd, 0.3, 0, days * DAY)
+    return sorted(out)
+
+def feed_changes(rnd, days):
+    return _poisson(rnd, rnd.choice([1.0, 1 / 7, 1 / 7, 1 / 30]), 0, days * DAY)
+
+def _poisson(rnd, per_day, start, end):
+    out, t = [], start
+    while True:
+        t += rnd.expovariate(per_day / DAY)
+        if t >= end:
+            return out
+        out.append(t)
+
+def simulate(events, default, bounds, days, rnd, jitter=0.1):
+    """Poll the event stream for `days`; bounds=None polls every `default`.
+    Returns (polls, [delay of each change])."""
+    state = PollState(default if bounds is None else min(max(default, bounds[0]), bounds[1]))
+    t = rnd.uniform(0, state.interval)
+    prev, polls, delays, i = 0.0, 0, [], 0
+    end = days * DAY
+    while t < end:
+        polls += 1
+        j = bisect.bisect_right(events, t, i)
+        delays += [t - e for e in events[i:j]]
+        if bounds is not None:
+            state = adapt(state, j - i, t - prev, bounds, t)
+        prev, i = t, j
+        t += state.interval * (1 + rnd.uniform(-jitter, jitter))
+    return polls, delays
+
+def pct(xs, q):
+    return xs[min(len(xs) - 1, int(q * len(xs)))] if xs else 0.0
+
+def fmt(seconds):
+    return f"{seconds / 3600:.1f}h" if seconds >= 3600 else f"{seconds / 60:.0f}m"
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--states", type=int, default=50)
+    parser.add_argument("--feeds", type=int, default=40)
+    parser.add_argument("--days", type=int, default=365)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    from daemon import DEFAULT_INTERVALS, INTERVAL_BOUNDS
+    rnd = random.Random(args.seed)
+    kinds = [("openstates", [state_changes(rnd, args.days) for _ in range(args.states)]),
+             ("rss", [feed_changes(rnd, args.days) for _ in range(args.feeds)])]
+
+    print(f"{args.states} jurisdictions, {args.feeds} feeds, {args.days} days")
+    print(f"{'kind':11s} {'strategy':9s} {'polls':>9s} {'changes':>9s} {'p50 delay':>10s} {'p95 delay':>10s} {'mean':>8s}")
+    for kind, sources in kinds:
+        default = DEFAULT_INTERVALS[kind]
+        for name, bounds in (("fixed", None), ("adaptive", INTERVAL_BOUNDS[kind])):
+            polls, delays = 0, []
+            for events in sources:
+                p, d = simulate(events, default, bounds, args.days, rnd)
+                polls += p
+                delays += d
+            delays.sort()
+            mean = sum(delays) / len(delays) if delays else 0.0
+            print(f"{kind:11s} {name:9s} {polls:9d} {len(delays):9d} {fmt(pct(delays, 0.5)):>10s} "
+                  f"{fmt(pct(delays, 0.95)):>10s} {fmt(mean):>8s}")
+
+if __name__ == "__main__":
+    main()
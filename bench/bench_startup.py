@@ -0,0 +1,76 @@
+"""Measure collector start-up imports with `python -X importtime`.
+
+    python -m bench.bench_startup
+    python -m bench.bench_startup --runs 15 --top 15
+
+Each scenario starts a fresh interpreter that imports collector_plugins and
+loads the source plugins a run with those flags would enable, the way
+collect_plugin() does. "all plugins" is what every run imported before the
+plugin registry, when the RSS and HTTP plugins were imported at the top of
+collector_plugins. Scenarios run round-robin. Reported per scenario: the
+median sum of -X importtime self times and the median wall time of the
+whole process; then the modules an OpenStates-only start skips, by package.
+"""
+import argparse, os, statistics, subprocess, sys, time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SCENARIOS = [
+    ("interpreter only", "pass"),
+    ("openstates only (--no-rss --no-http)", "import collector_plugins"),
+    ("rss (--no-http)", "import collector_plugins; from plugins.registry import load_plugin; load_plugin('rss')"),
+    ("all plugins", "import collector_plugins; from plugins.registry import load_plugin; "
+                    "load_plugin('rss'); load_plugin('http')"),
+]
+
+def importtime(code):
+    """({module: self-import microseconds}, wall seconds) of one run."""
+    t0 = time.perf_counter()
+    p = subprocess.run([sys.executable, "-X", "importtime", "-c", code], cwd=ROOT,
+                       capture_output=True, text=True, check=True)
+    wall = time.perf_counter() - t0
+    modules = {}
+    for line in p.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        own, _, name = line[len("import time:"):].split("|")
+        modules[name.strip()] = int(own)
+    return modules, wall
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=9, help="Interpreter starts per scenario (medians are reported)")
+    parser.add_argument("--top", type=int, default=10, help="Packages to list in the breakdown")
+    args = parser.parse_args()
+
+    runs = {label: [] for label, _ in SCENARIOS}
+    for label, code in SCENARIOS:
+        importtime(code)  # warm the .pyc and OS file caches
+    for _ in range(args.runs):  # round-robin, so machine noise hits every scenario alike
+        for label, code in SCENARIOS:
+            runs[label].append(importtime(code))
+
+    def median_total(label):
+        return statistics.median(sum(m.values()) for m, _ in runs[label])
+
+    base_label, full_label = SCENARIOS[1][0], SCENARIOS[-1][0]
+    base = median_total(base_label)
+    print(f"{'scenario':38s} {'imports':>9s} {'process':>9s}   (median of {args.runs})")
+    for i, (label, _) in enumerate(SCENARIOS):
+        total, wall = median_total(label), statistics.median(w for _, w in runs[label])
+        extra = f"  {(total - base) / 1000:+.1f}ms vs openstates only" if i > 1 else ""
+        print(f"{label:38s} {total / 1000:7.1f}ms {wall * 1000:7.1f}ms{extra}")
+
+    # modules only the plugins pull in, grouped by top-level package
+    skipped = set(runs[full_label][0][0]) - set(runs[base_label][0][0])
+    packages = {}
+    for name in skipped:
+        own = statistics.median(m.get(name, 0) for m, _ in runs[full_label])
+        packages[name.split(".")[0]] = packages.get(name.split(".")[0], 0) + own
+    print(f"\nModules an OpenStates-only start no longer imports: {len(skipped)}, "
+          f"{sum(packages.values()) / 1000:.1f}ms in all plugins runs")
+    for name, us in sorted(packages.items(), key=lambda kv: -kv[1])[:args.top]:
+        print(f"  {name:32s} {us / 1000:7.1f}ms")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""Check and time normalize.derive_status_general against the original.
+
+    python -m bench.bench_status --cases 20000 --lengths 10,100,1000,5000
+
+First a randomized equivalence check: for random action histories (dates
+with ties, several classifications per action, unmapped ones, repeated
+passages) the single-pass version must return exactly what the original
+sort-and-rescan version returned, both computed from scratch and resumed
+from a stored state over only the appended actions. Then both are timed on
+long synthetic histories.
+"""
+import argparse, random, time
+from normalize import CLASSIFY_MAP, StatusState, derive_status_general
+
+def legacy_derive_status_general(actions):
+    order = [
+        "VETOED", "ENACTED", "PASSED_LEGISLATURE",
+        "ON_FLOOR", "REPORTED", "IN_COMMITTEE", "INTRODUCED"
+    ]
+    seen = set()
+    for a in sorted(actions, key=lambda x: x.get("action_date","")):
+        for c in a.get("classification", []):
+            mapped = CLASSIFY_MAP.get(c)
+            if mapped:
+                if mapped == "PASSED_CHAMBER":
+                    seen.add(mapped)
+                    if "PASSED_CHAMBER" in seen and len([1 for s in actions if "passage" in s.get("classification",[])]) >= 2:
+                        return "PASSED_LEGISLATURE"
+                else:
+                    last = mapped
+    return last if (last := locals().get("last")) else "INTRODUCED"
+
+CLASSES = list(CLASSIFY_MAP) + ["amendment-introduction", "filing", "withdrawal"]
+
+def random_history(rnd, n, passage_rate):
+    days = max(3, n // 3)  # plenty of same-day ties
+    out = []
+    for i in range(n):
+        k = rnd.choice([0, 1, 1, 1, 2, 3])
+        classes = [rnd.choice(CLASSES) for _ in range(k)]
+        classes = [c for c in classes if c != "passage"]
+        if rnd.random() < passage_rate:
+            classes.insert(rnd.randrange(len(classes) + 1), "passage")
+        out.append({
+            "action_date": f"2025-{1 + rnd.randrange(days) // 28 % 12:02d}-{1 + rnd.randrange(days) % 28:02d}",
+            "organization": "Senate",
+            "classification": classes,
+            "action_text": f"action {i}",
+        })
+    return out
+
+def check(cases, seed):
+    rnd = random.Random(seed)
+    for i in range(cases):
+        n = rnd.choice([0, 1, 2, 3, 5, 8, 20, 60])
+        acts = random_history(rnd, n, rnd.choice([0.0, 0.05, 0.2, 0.5]))
+        want = legacy_derive_status_general(acts)
+        got = derive_status_general(acts)
+        assert got == want, (i, acts, got, want)
+        cut = rnd.randint(0, n)
+        stored = StatusState.loads(StatusState().feed(acts[:cut]).dumps())
+        resumed = derive_status_general(acts, state=stored)
+        assert resumed == want, (i, cut, acts, resumed, want)
+    print(f"equivalence: {cases} random histories OK (full and resumed)")
+
+def timeit(fn, acts, repeat):
+    t0 = time.perf_counter()
+    for _ in range(repeat):
+        fn(acts)
+    return (time.perf_counter() - t0) / repeat
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--cases", type=int, default=20000)
+    parser.add_argument("--lengths", default="10,100,1000,5000")
+    parser.add_argument("--seed", type=int, default=3)
+    args = parser.parse_args()
+
+    check(args.cases, args.seed)
+    rnd = random.Random(args.seed)
+    for n in [int(x) for x in args.lengths.split(",")]:
+        # one passage only, so the original never returns early
+        acts = random_history(rnd, n, 0.0)
+        acts[rnd.randrange(n)]["classification"].append("passage")
+        repeat = max(3, 20000 // n)
+        old = timeit(legacy_derive_status_general, acts, repeat)
+        new = timeit(derive_status_general, acts, repeat)
+        appended = acts[-5:]
+        state = StatusState().feed(acts[:-5])
+        res = timeit(lambda a: derive_status_general(a, state=state), acts, repeat)
+        print(f"{n:6d} actions  original {old*1e6:9.1f} us  single-pass {new*1e6:9.1f} us ({old/new:4.1f}x)  "
+              f"resume +{len(appended)} {res*1e6:7.1f} us")
+
+if __name__ == "__main__":
+    main()
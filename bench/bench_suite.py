@@ -0,0 +1,307 @@
+"""Benchmark suite: normalize, classify, the per-page upsert path and the
+/bills and dashboard queries, at growing table sizes, on SQLite and (when
+one is given) a local Postgres. Results are written as JSON so runs can be
+compared over time.
+
+    python -m bench.bench_suite                                 # 10k, 100k, 1M bills on SQLite
+    python -m bench.bench_suite --sizes 10000,100000 --postgres postgresql://localhost/scratch
+    python -m bench.bench_suite --sizes 10000 --compare bench/results/suite-20250301T120000.json
+
+Payloads come from bench.synth (deterministic; --actions, --words and
+--topic-rate shape them). The database grows from one size to the next:
+bills are generated and prepared in a process pool and bulk-written, then at
+each size the suite times write_openstates_page on pages of new, changed and
+unchanged bills (one transaction per page, as the collectors do) and the
+HTTP routes through FastAPI's TestClient (httpx), both with the response
+cache cleared before every request and served from it. Without httpx,
+serve.query_bills is timed instead.
+
+Postgres runs inside a scratch schema (policy_bench) that is dropped and
+recreated, so the database behind the URL is otherwise left alone.
+"""
+import argparse, json, os, platform, shutil, sqlite3, statistics, subprocess, sys, tempfile, time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+from urllib.parse import quote
+from bench.synth import Synth
+
+PG_SCHEMA = "policy_bench"
+QUERIES = [
+    ("bills", "/bills?limit=100"),
+    ("bills_state", "/bills?state=California&limit=100"),
+    ("bills_status", "/bills?status=ENACTED&limit=100"),
+    ("bills_topic", "/bills?topic=ai&limit=100"),
+    ("bills_state_topic", "/bills?topic=privacy&state=New%20York&limit=100"),
+    ("bills_page2", None),  # /bills?limit=100 with the first page's cursor
+    ("dashboard", "/?limit=100"),
+    ("dashboard_filtered", "/?topic=housing&state=Texas&status=IN_COMMITTEE&limit=100"),
+]
+NEW_IDS = 10**9  # ids for the "new bills" pages, clear of the seeded range
+
+def stats(samples, ops_per_sample=1):
+    s = sorted(samples)
+    q = statistics.quantiles(s, n=100, method="inclusive") if len(s) >= 2 else [s[0]] * 99
+    total = sum(s)
+    return {"samples": len(s), "ops": len(s) * ops_per_sample, "seconds": round(total, 6),
+            "p50_ms": round(q[49] * 1000, 3), "p95_ms": round(q[94] * 1000, 3), "max_ms": round(s[-1] * 1000, 3),
+            "ops_per_s": round(len(s) * ops_per_sample / total, 1) if total else None}
+
+def timed_each(fn, items):
+    out = []
+    for it in items:
+        t0 = time.perf_counter()
+        fn(it)
+        out.append(time.perf_counter() - t0)
+    return out
+
+# ---- micro benchmarks (no database) ----
+
+def bench_micro(synth, n):
+    from normalize import normalize_openstates_bill, payload_fingerprint
+    from classify import label_record
+    from ingest import label_row
+    payloads = [synth.bill(i) for i in range(n)]
+    results = {
+        "normalize": stats(timed_each(normalize_openstates_bill, payloads)),
+        "fingerprint": stats(timed_each(payload_fingerprint, payloads)),
+    }
+    texts = [" ".join([b["title"] or "", b["summary"] or ""]) for b in payloads]
+    results["classify"] = stats(timed_each(label_record, texts))
+    bills = [normalize_openstates_bill(b)["bill"] for b in payloads]
+    results["label_row"] = stats(timed_each(label_row, bills))
+    return results
+
+# ---- database benchmarks ----
+
+def use_database(url):
+    """Point db's engines and serve.py at `url`."""
+    import db, serve
+    for engine in db._engines.values():
+        engine.dispose()
+    db._engines.clear()
+    db.DATABASE_URL = url
+    serve.engine = db.get_engine("reader")
+    serve._version.update(value=None, checked=None)
+    serve.cache.clear()
+
+def _prepare_range(synth_kwargs, lo, hi):
+    from normalize import payload_fingerprint
+    from ingest import prepare_bills
+    synth = Synth(**synth_kwargs)
+    todo = []
+    for i in range(lo, hi):
+        b = synth.bill(i)
+        todo.append((b, payload_fingerprint(b), None))
+    return prepare_bills(todo)
+
+def seed(synth_kwargs, have, size, workers, chunk=5000):
+    """Grow the bills table from `have` to `size`. Returns seconds taken."""
+    import db
+    from ingest import write_prepared
+    engine = db.get_engine()
+    t0 = time.perf_counter()
+    inflight = deque()
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for lo in range(have, size, chunk):
+            inflight.append(pool.submit(_prepare_range, synth_kwargs, lo, min(size, lo + chunk)))
+            while len(inflight) >= 2 * workers or (inflight and inflight[0].done()):
+                with engine.begin() as conn:
+                    write_prepared(conn, inflight.popleft().result(), {})
+        while inflight:
+            with engine.begin() as conn:
+                write_prepared(conn, inflight.popleft().result(), {})
+    with engine.begin() as conn:
+        db.refresh_facet_counts(conn)
+        conn.exec_driver_sql("ANALYZE")
+    return time.perf_counter() - t0
+
+def bench_pages(synth, size, pages, new_base):
+    """write_openstates_page on pages of new, changed and unchanged bills."""
+    import random, db
+    from ingest import write_openstates_page
+    engine = db.get_engine()
+    rnd = random.Random(size)
+    per = synth.per_page
+    picked = rnd.sample(range(size), min(size, pages * per))
+    existing = [picked[p * per:(p + 1) * per] for p in range(pages)]
+    # "changed" bumps each bill's revision; "unchanged" then re-sends those same payloads
+    batches = [
+        ("upsert_page_new", [[synth.bill(new_base + p * per + k) for k in range(per)] for p in range(pages)]),
+        ("upsert_page_changed", [[synth.bill(i, revision=1) for i in ids] for ids in existing]),
+        ("upsert_page_unchanged", [[synth.bill(i, revision=1) for i in ids] for ids in existing]),
+    ]
+
+    def write(page):
+        with engine.begin() as conn:
+            write_openstates_page(conn, page)
+
+    results = {}
+    for name, page_list in batches:
+        results[name] = stats(timed_each(write, page_list), per)
+    return results
+
+def bench_queries(repeat):
+    import serve
+    try:
+        from fastapi.testclient import TestClient
+    except (ImportError, RuntimeError):
+        return bench_queries_direct(repeat)
+    client = TestClient(serve.app)
+    first = client.get("/bills?limit=100")
+    cursor = first.headers.get("x-next-cursor", "")
+    results = {}
+    for name, path in QUERIES:
+        path = path or f"/bills?limit=100&cursor={quote(cursor)}"
+
+        def cold(_):
+            serve.cache.clear()
+            r = client.get(path)
+            assert r.status_code == 200, (path, r.status_code)
+
+        def warm(_):
+            assert client.get(path).status_code == 200
+
+        results[f"http_{name}"] = stats(timed_each(cold, range(repeat)))
+        warm(None)
+        results[f"http_{name}_cached"] = stats(timed_each(warm, range(repeat)))
+    return results
+
+def bench_queries_direct(repeat):
+    import serve
+    _, cursor = serve.query_bills(limit=100)
+    calls = {
+        "bills": {}, "bills_state": {"state": "California"}, "bills_status": {"status": "ENACTED"},
+        "bills_topic": {"topic": "ai"}, "bills_state_topic": {"topic": "privacy", "state": "New York"},
+        "bills_page2": {"cursor": cursor or ""},
+    }
+    return {f"query_{name}": stats(timed_each(lambda _: serve.query_bills(limit=100, **kw), range(repeat)))
+            for name, kw in calls.items()}
+
+def run_backend(backend, url, sizes, synth, args, record):
+    import db
+    use_database(url)
+    db.migrate()
+    synth_kwargs = dict(seed=synth.seed, actions=synth.actions, words=synth.words,
+                        topic_rate=synth.topic_rate, per_page=synth.per_page)
+    have = 0
+    for size in sizes:
+        seconds = seed(synth_kwargs, have, size, args.workers)
+        record(backend, size, "seed", {"ops": size - have, "seconds": round(seconds, 3),
+                                       "ops_per_s": round((size - have) / seconds, 1) if seconds else None})
+        have = size
+        print(f"[{backend}] {size} bills seeded in {seconds:.1f}s", flush=True)
+        for name, r in bench_pages(synth, size, args.pages, NEW_IDS + size).items():
+            record(backend, size, name, r)
+        for name, r in bench_queries(args.repeat).items():
+            record(backend, size, name, r)
+        use_database(url)  # drop pooled connections between sizes
+
+def pg_url(url):
+    from sqlalchemy import create_engine, make_url
+    engine = create_engine(url, future=True)
+    with engine.begin() as conn:
+        conn.exec_driver_sql(f"DROP SCHEMA IF EXISTS {PG_SCHEMA} CASCADE")
+        conn.exec_driver_sql(f"CREATE SCHEMA {PG_SCHEMA}")
+    engine.dispose()
+    return make_url(url).update_query_dict({"options": f"-csearch_path={PG_SCHEMA}"}) \
+        .render_as_string(hide_password=False)
+
+def drop_pg_schema(url):
+    from sqlalchemy import create_engine
+    engine = create_engine(url, future=True)
+    with engine.begin() as conn:
+        conn.exec_driver_sql(f"DROP SCHEMA IF EXISTS {PG_SCHEMA} CASCADE")
+    engine.dispose()
+
+def environment(args):
+    try:
+        rev = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                             timeout=10).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        rev = None
+    import sqlalchemy
+    params = dict(vars(args))
+    if params.get("postgres"):
+        params["postgres"] = sqlalchemy.make_url(params["postgres"]).render_as_string(hide_password=True)
+    return {"git": rev, "python": platform.python_version(), "platform": platform.platform(),
+            "cpus": os.cpu_count(), "sqlite": sqlite3.sqlite_version, "sqlalchemy": sqlalchemy.__version__,
+            "args": params}
+
+def compare(results, path):
+    with open(path) as f:
+        old = {(r["backend"], r["size"], r["name"]): r for r in json.load(f)["results"]}
+    print(f"\nvs {path} (p50; ratio < 1 is faster now)")
+    for r in results:
+        prev = old.get((r["backend"], r["size"], r["name"]))
+        key = "p50_ms" if "p50_ms" in r else "seconds"
+        if prev and prev.get(key) and r.get(key) is not None:
+            print(f"  {r['backend']:8s} {r['size'] or '':>8} {r['name']:30s} "
+                  f"{prev[key]:10.3f} -> {r[key]:10.3f} {'ms' if key == 'p50_ms' else 's'}  "
+                  f"{r[key] / prev[key]:5.2f}x")
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", default="10000,100000,1000000")
+    parser.add_argument("--backends", default="sqlite,postgres")
+    parser.add_argument("--postgres", default=os.getenv("BENCH_POSTGRES_URL", ""),
+                        help="Postgres URL; the suite works in its own schema there")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--actions", type=int, default=8, help="Mean actions per bill")
+    parser.add_argument("--words", type=int, default=60, help="Summary words per bill")
+    parser.add_argument("--topic-rate", type=float, default=0.2, help="Share of bills matching a topic")
+    parser.add_argument("--micro", type=int, default=5000, help="Payloads for the normalize/classify timings")
+    parser.add_argument("--pages", type=int, default=20, help="Pages per upsert timing")
+    parser.add_argument("--repeat", type=int, default=20, help="Requests per query timing")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 2)
+    parser.add_argument("--out", default="", help="JSON output (default bench/results/suite-<time>.json)")
+    parser.add_argument("--compare", default="", help="Earlier JSON output to compare against")
+    args = parser.parse_args()
+
+    sizes = sorted(int(s) for s in args.sizes.split(","))
+    backends = args.backends.split(",")
+    synth = Synth(seed=args.seed, actions=args.actions, words=args.words, topic_rate=args.topic_rate)
+    stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S")
+    out_path = args.out or os.path.join(os.path.dirname(__file__), "results", f"suite-{stamp}.json")
+    results, skipped = [], {}
+
+    def record(backend, size, name, r):
+        results.append(dict(backend=backend, size=size, name=name, **r))
+        extra = f"p50 {r['p50_ms']:9.3f} ms  p95 {r['p95_ms']:9.3f} ms" if "p50_ms" in r else f"{r['seconds']:9.3f} s"
+        print(f"  {backend:8s} {size or '':>8} {name:30s} {extra}  {r.get('ops_per_s') or '':>10} ops/s", flush=True)
+
+    for name, r in bench_micro(synth, args.micro).items():
+        record("python", None, name, r)
+
+    if "sqlite" in backends:
+        tmp = tempfile.mkdtemp(prefix="bench_suite_")
+        try:
+            run_backend("sqlite", f"sqlite:///{os.path.join(tmp, 'bench.db')}", sizes, synth, args, record)
+        finally:
+            shutil.rmtree(tmp, ignore_errors=True)
+    if "postgres" in backends:
+        if not args.postgres:
+            skipped["postgres"] = "no --postgres / BENCH_POSTGRES_URL"
+        else:
+            try:
+                url = pg_url(args.postgres)
+            except Exception as e:
+                skipped["postgres"] = f"unreachable: {type(e).__name__}: {e}"
+            else:
+                try:
+                    run_backend("postgres", url, sizes, synth, args, record)
+                finally:
+                    drop_pg_schema(args.postgres)
+    for backend, why in skipped.items():
+        print(f"{backend}: skipped ({why})")
+
+    doc = {"created_at": stamp, "environment": environment(args), "skipped": skipped, "results": results}
+    os.makedirs(os.path.dirname(os.path.abspath(out_path)), exist_ok=True)
+    with open(out_path, "w") as f:
+        json.dump(doc, f, indent=1)
+    print(f"results: {out_path}")
+    if args.compare:
+        compare(results, args.compare)
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,80 @@
+"""Profile a collector-shaped run over synthetic pages, with no network.
+
+    python -m bench.profile_collector                          # 2k seeded, 1k new/changed/unchanged
+    python -m bench.profile_collector --seed 20000 --new 5000 --changed 5000 --unchanged 0
+    PROFILE_MEMORY=0 python -m bench.profile_collector --database sqlite:////tmp/radar.db
+
+A scratch SQLite database (or --database) is seeded with bench.synth bills
+outside the profile. The profiled part then does what collector.py does per
+page: write_openstates_page in one transaction (which keeps facet counts
+current) and queue a status alert for each change, over pages of new, changed
+(revision 1 of seeded bills) and unchanged bills. Generating a page stands
+in for the fetch. It runs inside metrics.CollectorRun(profile=True), so it
+leaves a collector_runs row ("bench_profile") and the profile directory
+under PROFILE_DIR, exactly like `python collector.py --profile`.
+"""
+import argparse, os, tempfile, time
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--database", help="Database URL (default: a scratch SQLite file)")
+    parser.add_argument("--seed", type=int, default=2000, help="Bills written before profiling starts")
+    parser.add_argument("--new", type=int, default=1000, help="New bills in the profiled run")
+    parser.add_argument("--changed", type=int, default=1000, help="Seeded bills re-sent with new actions")
+    parser.add_argument("--unchanged", type=int, default=1000, help="Seeded bills re-sent as they are")
+    parser.add_argument("--actions", type=int, default=8)
+    parser.add_argument("--words", type=int, default=60)
+    parser.add_argument("--topic-rate", type=float, default=0.2)
+    args = parser.parse_args()
+    if args.changed > args.seed or args.unchanged > args.seed:
+        parser.error("--changed and --unchanged can't exceed --seed")
+
+    scratch = None
+    if not args.database:
+        scratch = tempfile.TemporaryDirectory(prefix="profile_collector_")
+        args.database = f"sqlite:///{os.path.join(scratch.name, 'radar.db')}"
+    os.environ["DATABASE_URL"] = args.database
+
+    from bench.synth import Synth
+    from db import get_engine, migrate
+    from ingest import write_openstates_page
+    from alerts import alert_key, enqueue_alert
+    from metrics import CollectorRun, stage, timed_iter
+    import profiling
+
+    # Page generation is the stand-in for openstates_get here
+    profiling.STAGE_FRAMES[("synth.py", "pages")] = "fetch"
+
+    synth = Synth(actions=args.actions, words=args.words, topic_rate=args.topic_rate)
+    migrate()
+    engine = get_engine()
+    t0 = time.perf_counter()
+    for page in synth.pages(0, args.seed):
+        with engine.begin() as conn:
+            write_openstates_page(conn, page)
+    print(f"Seeded {args.seed} bills in {time.perf_counter() - t0:.1f}s; profiling…", flush=True)
+
+    def pages():
+        yield from synth.pages(10**9, 10**9 + args.new)
+        yield from synth.pages(0, args.changed, revision=1)
+        yield from synth.pages(args.changed, args.changed + args.unchanged)
+
+    totals = {"new": 0, "changed": 0, "skipped": 0}
+    with CollectorRun(engine, "bench_profile", profile=True) as run:
+        for page in timed_iter(pages(), "fetch"):
+            with engine.begin() as conn:
+                changes, counts = write_openstates_page(conn, page)
+                for bill, _old in changes:
+                    enqueue_alert(conn, "status", alert_key("status", bill["bill_uid"], bill["status_general"],
+                                                            bill["last_action_date"]),
+                                  f"*{bill['bill_number']}* · {bill['title']}\nStatus: *{bill['status_general']}*")
+            for k, v in counts.items():
+                totals[k] += v
+    print(f"Bills: {totals['new']} new, {totals['changed']} changed, {totals['skipped']} unchanged (skipped)")
+    if scratch:
+        print(f"Profile kept in {run.profile_dir}/ (scratch database removed)")
+        engine.dispose()
+        scratch.cleanup()
+
+if __name__ == "__main__":
+    main()
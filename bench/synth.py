@@ -0,0 +1,106 @@
+"""Deterministic synthetic OpenStates /bills payloads for benchmarks.
+
+    from bench.synth import Synth
+    synth = Synth(seed=1, actions=8, words=60, topic_rate=0.2)
+    payload = synth.bill(123)           # same dict for the same (seed, i)
+    pages = synth.pages(0, 10000)       # lists of per_page payloads
+
+Each bill is generated from its own Random(seed, i), so bill i is identical
+whichever range or order it is requested in; revision > 0 appends actions
+and touches updated_at, the way a re-fetched bill that moved changes.
+"""
+import random
+from classify import AI_TERMS, PRIVACY_TERMS, HOUSING_TERMS, HEALTH_TERMS
+
+STATES = ["California", "New York", "Texas", "Washington", "Illinois", "Florida", "Ohio", "Georgia",
+          "Colorado", "Massachusetts", "Virginia", "Oregon"]
+CHAMBERS = ["Senate", "House", "Assembly"]
+COMMITTEES = ["Judiciary Committee", "Appropriations Committee", "Housing Committee", "Health Committee",
+              "Commerce Committee", "Rules Committee", "Technology Committee", "Education Committee"]
+SUBJECTS = ["Taxation", "Education", "Health", "Housing", "Technology", "Transportation", "Public Safety",
+            "Elections", "Environment", "Labor", "Consumer Protection", "Budget"]
+SPONSORS = [f"{f} {l}" for f in ("Alex", "Jordan", "Sam", "Taylor", "Morgan", "Casey", "Riley", "Jamie")
+            for l in ("Smith", "Garcia", "Nguyen", "Johnson", "Patel", "Kim", "Brown", "Lopez")]
+FILLER = ("an act relating to the state department of revenue public safety appropriations schools "
+          "transportation county municipal code amend section repeal provide establish requirements "
+          "reporting for purposes of this chapter person entity agency shall may").split()
+# Plain-text forms of the classifier's patterns, so hits are real matches
+TOPIC_TERMS = [t.replace("\\b", "").replace("'?", "'") for t in AI_TERMS + PRIVACY_TERMS + HOUSING_TERMS + HEALTH_TERMS]
+# Roughly the classification mix of real histories (mostly referrals and
+# readings), mapped and unmapped by normalize.CLASSIFY_MAP alike
+ACTION_FLOW = [
+    (["introduction"], 1), (["referral-committee"], 3), (["referral"], 3), (["reading-1"], 3), (["reading-2"], 2),
+    (["committee-passage"], 2), ([], 6), (["amendment-introduction"], 2), (["reading-3", "passage"], 1),
+    (["committee-failure"], 0.2), (["executive-receipt"], 0.3), (["executive-signature"], 0.4),
+    (["veto"], 0.05), (["became-law"], 0.2),
+]
+_FLOW, _WEIGHTS = zip(*ACTION_FLOW)
+
+class Synth:
+    def __init__(self, seed: int = 1, actions: int = 8, words: int = 60, topic_rate: float = 0.2,
+                 per_page: int = 50, session: str = "2025"):
+        self.seed = seed
+        self.actions = actions          # mean actions per bill (geometric)
+        self.words = words              # summary length; titles are about a fifth of it
+        self.topic_rate = topic_rate    # share of bills mentioning at least one topic term
+        self.per_page = per_page
+        self.session = session
+
+    def _text(self, rnd, n, hit):
+        tokens = [rnd.choice(FILLER) for _ in range(max(1, n))]
+        if hit:
+            tokens.insert(rnd.randrange(len(tokens) + 1), rnd.choice(TOPIC_TERMS))
+        return " ".join(tokens)
+
+    def bill(self, i: int, revision: int = 0) -> dict:
+        rnd = random.Random(self.seed * 1_000_003 + i)
+        state = STATES[i % len(STATES)]
+        chamber = rnd.choice(CHAMBERS)
+        hit = rnd.random() < self.topic_rate
+        in_title = hit and rnd.random() < 0.5
+        title = self._text(rnd, self.words // 5, in_title).capitalize()
+        summary = self._text(rnd, self.words, hit and not in_title)
+        subjects = rnd.sample(SUBJECTS, rnd.randint(0, 4))
+        sponsors = rnd.sample(SPONSORS, rnd.randint(1, 6))
+        n_actions = 1
+        while rnd.random() > 1 / max(1, self.actions) and n_actions < 40 * self.actions:
+            n_actions += 1
+        n_actions += revision
+        day, actions = 0, []
+        for k in range(n_actions):
+            day += rnd.choice((0, 0, 1, 2, 5, 9))
+            classes = ["introduction"] if k == 0 else list(rnd.choices(_FLOW, _WEIGHTS)[0])
+            org = chamber if not classes or rnd.random() < 0.6 else rnd.choice(COMMITTEES)
+            actions.append({
+                "organization": {"name": org, "classification": "lower" if org != "Senate" else "upper"},
+                "description": f"{' '.join(classes) or 'action'}: {self._text(rnd, 6, False)}",
+                "date": f"2025-{1 + day // 28 % 12:02d}-{1 + day % 28:02d}",
+                "classification": classes,
+                "order": k,
+            })
+        return {
+            "id": f"ocd-bill/{self.seed:04d}{i:012d}",
+            "session": self.session,
+            "from_session": self.session,
+            "jurisdiction": {"id": f"ocd-jurisdiction/{state}", "name": state, "classification": "state"},
+            "from_organization": {"name": chamber},
+            "identifier": f"{'SB' if chamber == 'Senate' else 'HB'} {i}",
+            "title": title,
+            "summary": summary,
+            "classification": ["bill"],
+            "subject": subjects,
+            "sponsorships": [{"name": s, "entity_type": "person", "primary": k == 0,
+                              "classification": "primary" if k == 0 else "cosponsor",
+                              "person": {"name": s}} for k, s in enumerate(sponsors)],
+            "actions": actions,
+            "first_action_date": actions[0]["date"],
+            "latest_action_date": actions[-1]["date"],
+            "openstates_url": f"https://openstates.org/{state.lower()}/bills/{self.session}/{i}/",
+            "created_at": "2025-01-01T00:00:00+00:00",
+            "updated_at": f"2025-{1 + (day + revision) // 28 % 12:02d}-{1 + (day + revision) % 28:02d}T12:00:00+00:00",
+        }
+
+    def pages(self, start: int, stop: int, revision: int = 0):
+        """Bills start..stop-1 as lists of per_page payloads."""
+        for lo in range(start, stop, self.per_page):
+            yield [self.bill(i, revision) for i in range(lo, min(stop, lo + self.per_page))]
@@ -1,7 +1,10 @@
 \
-import re
-from typing import Dict
+import os, re, json, hashlib
+from typing import Dict, Iterable, List
 
+TOPICS_FILE = os.getenv("TOPICS_FILE", "topics.yml")
+
+# Built-in taxonomy, used when topics.yml isn't present
 AI_TERMS = [
     r"artificial intelligence", r"\balgorithmic\b", r"automated decision",
     r"\bdeepfake\b", r"synthetic media", r"\bgenerative\b", r"machine learning"
@@ -22,13 +25,67 @@ HEALTH_TERMS = [
     r"utilization management", r"clinical decision support", r"health data", r"HIPAA"
 ]
 
+DEFAULT_TAXONOMY = {
+    "ai": AI_TERMS,
+    "privacy": PRIVACY_TERMS,
+    "housing": HOUSING_TERMS,
+    "healthcare": HEALTH_TERMS,
+}
+
+def load_taxonomy(path=TOPICS_FILE) -> Dict[str, List[str]]:
+    if not path or not os.path.exists(path):
+        return dict(DEFAULT_TAXONOMY)
+    import yaml
+    with open(path, "r", encoding="utf-8") as f:
+        data = yaml.safe_load(f) or {}
+    return {str(topic): [str(p) for p in (patterns or [])] for topic, patterns in data.items()}
+
+# A pattern that is just a literal phrase, optionally wrapped in \b anchors
+_LITERAL = re.compile(r"^(?:\\b)?([A-Za-z0-9 '\-]+)(?:\\b)?$")
+
+class TopicMatcher:
+    """Precompiled topic patterns with a substring prefilter.
+
+    Most taxonomy terms are literal phrases, and a phrase that isn't a
+    substring of the text can't match, so each pattern carries its literal
+    and the compiled regex only runs when `literal in text` (a C-level scan)
+    succeeds. Patterns that aren't plain phrases always run their regex.
+    Results are exactly those of re.search per pattern.
+    """
+
+    def __init__(self, taxonomy: Dict[str, List[str]]):
+        self.topics = list(taxonomy)
+        # changes whenever topics.yml does, so stored labels can be checked against it
+        self.version = hashlib.sha256(json.dumps(taxonomy, sort_keys=True).encode("utf-8")).hexdigest()[:12]
+        self._entries = []
+        for topic in self.topics:
+            entries = []
+            for p in taxonomy[topic]:
+                m = _LITERAL.match(p)
+                entries.append((m.group(1) if m else None, re.compile(p)))
+            self._entries.append((topic, entries))
+
+    def label(self, text: str) -> Dict[str, bool]:
+        tx = (text or "").lower()
+        return {
+            topic: any((lit is None or lit in tx) and rx.search(tx) is not None for lit, rx in entries)
+            for topic, entries in self._entries
+        }
+
+_matcher = None
+
+def get_matcher() -> TopicMatcher:
+    global _matcher
+    if _matcher is None:
+        _matcher = TopicMatcher(load_taxonomy())
+    return _matcher
+
+def taxonomy_version() -> str:
+    return get_matcher().version
+
 def label_record(text: str) -> Dict[str, bool]:
-    tx = (text or "").lower()
-    def any_match(patterns):
-        return any(re.search(p, tx) for p in patterns)
-    return {
-        "ai": any_match(AI_TERMS),
-        "privacy": any_match(PRIVACY_TERMS),
-        "housing": any_match(HOUSING_TERMS),
-        "healthcare": any_match(HEALTH_TERMS),
-    }
+    return get_matcher().label(text)
+
+def label_many(texts: Iterable[str]) -> List[Dict[str, bool]]:
+    m = get_matcher()
+    return [m.label(t) for t in texts]
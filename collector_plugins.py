@@ -1,39 +1,136 @@
-import os, argparse, hashlib, requests, yaml
+import os, argparse, yaml
 from datetime import datetime, timedelta, timezone
 from dotenv import load_dotenv
-from sqlalchemy import text
-from db import get_engine, upsert_bill, upsert_action, set_labels
-from alerts import send_slack
-from plugins.rss_source import RSSPlugin
+from db import get_engine, query_hash, sync_overrides, set_watermark
+from ingest import write_openstates_page
+from alerts import enqueue_alert, alert_key, dispatch_outbox
+from news import SeenNews, store_news
+from plugins.http_cache import HTTPCache
+from plugins.registry import load_plugin, plugin_target
 from plugins.openstates_plugin import OpenStatesAdapter
+from openstates_api import OPENSTATES_CONCURRENCY, iter_pages
+from metrics import CollectorRun, inc, stage, timed_iter
 
 load_dotenv()
 
-OPENSTATES_API_KEY = os.getenv("OPENSTATES_API_KEY")
 DEFAULT_SINCE_DAYS = int(os.getenv("DEFAULT_SINCE_DAYS", "2"))
 DEFAULT_QUERY = os.getenv("DEFAULT_QUERY", "artificial intelligence OR generative OR privacy")
 DEFAULT_STATES = [s.strip() for s in os.getenv("DEFAULT_STATES","").split(",")]
 DRY_RUN = os.getenv("DRY_RUN","0") == "1"
 
-BASE_URL = "https://v3.openstates.org/bills"
-
-def openstates_get(params):
-    headers = {"X-API-KEY": OPENSTATES_API_KEY}
-    r = requests.get(BASE_URL, params=params, headers=headers, timeout=30)
-    r.raise_for_status()
-    return r.json()
-
-def hash_action(bill_uid, a):
-    s = f"{bill_uid}|{a.get('action_date')}|{a.get('organization')}|{','.join(a.get('classification',[]))}|{a.get('action_text')}"
-    import hashlib
-    return hashlib.sha256(s.encode("utf-8")).hexdigest()
-
-def load_feeds_config(path="feeds.yml"):
-    if not os.path.exists(path):
+def load_entries(path):
+    if not path or not os.path.exists(path):
         return []
     with open(path, "r", encoding="utf-8") as f:
         return yaml.safe_load(f) or []
 
+def load_feeds_config(path="feeds.yml"):
+    return load_entries(path)
+
+def load_sources_config(path="sources.yml"):
+    return load_entries(path)
+
+def store_news_items(engine, seen, kind, icon, items):
+    """Store unseen RSS/HTTP items in news_items and queue their alerts in the
+    same transaction; items already stored are dropped before any of that.
+    Under DRY_RUN nothing is stored, so a later real run still alerts them.
+    Returns (items processed, items new)."""
+    with stage("news_store"), engine.begin() as conn:
+        rows = seen.filter(conn, items)
+        if not DRY_RUN:
+            store_news(conn, rows)
+            for item in rows:
+                title = item.get("title","")
+                url = item.get("url","")
+                topic = item.get("topic_labels","")
+                msg = f"{icon} *{title}*\n{url}"
+                if topic:
+                    msg = f"[{topic}] " + msg
+                # per-feed/source `slack:` flag, on unless set to false
+                if item.get("slack", True):
+                    enqueue_alert(conn, kind, alert_key(kind, url, title), msg, blocks=[{"type":"section","text":{"type":"mrkdwn","text":msg}}])
+    if not DRY_RUN:
+        seen.add(rows)
+    inc("news_items_total", len(rows), kind=kind, result="new")
+    inc("news_items_total", len(items) - len(rows), kind=kind, result="seen")
+    return len(items), len(rows)
+
+def collect_plugin(engine, seen, name, entries, cache=None):
+    """Fetch `entries` with the source plugin registered as `name` (see
+    plugins/registry.py; its module is imported here, on first use) and
+    store/alert the new items. Returns (items processed, items new)."""
+    plugin = load_plugin(name)(entries, cache=cache)
+    with stage(f"{name}_fetch"):
+        items = list(plugin.fetch())  # fetch before opening the write transaction
+    count, new = store_news_items(engine, seen, name, plugin.icon, items)
+    if cache and not DRY_RUN:
+        cache.commit()  # a dry run must not hide these bodies from the next real one
+    return count, new
+
+def collect_rss(engine, seen, feeds, cache=None):
+    """Fetch every feed in `feeds` and store/alert its new items."""
+    return collect_plugin(engine, seen, "rss", feeds, cache)
+
+def collect_http(engine, seen, sources, cache=None):
+    """Scan every page in `sources` and store/alert its new matches."""
+    return collect_plugin(engine, seen, "http", sources, cache)
+
+def collect_openstates(engine, states, q, since, concurrency=OPENSTATES_CONCURRENCY, resume=True):
+    """Walk OpenStates for `states`, writing pages and queueing status alerts.
+    With resume, each jurisdiction starts from its stored watermark instead
+    of `since`. Returns (new/changed/skipped totals, status changes)."""
+    total_new_status = 0
+    totals = {"new": 0, "changed": 0, "skipped": 0}
+    adapter = OpenStatesAdapter()
+
+    params = {
+        "q": q,
+        "updated_since": since,
+        "sort": "updated_at",
+        "per_page": 50,
+        "include": "sponsorships,actions,subject,related_bills"
+    }
+    qhash = query_hash(q)
+    overrides = {}
+    if resume:
+        with engine.begin() as conn:
+            overrides = sync_overrides(conn, "openstates", states, qhash)
+
+    def save_mark(jurisdiction, mark):
+        if mark:
+            with engine.begin() as conn:
+                set_watermark(conn, "openstates", jurisdiction, qhash, mark)
+
+    # (jurisdiction, max upstream updated_at) of the walk in progress; it only
+    # becomes the watermark once every page of that jurisdiction is committed.
+    pending = None
+    for st, page, results in timed_iter(iter_pages(states, params, concurrency, overrides), "fetch"):
+        if pending and pending[0] != st:
+            save_mark(*pending)
+            pending = None
+        with engine.begin() as conn:
+            changes, counts = write_openstates_page(conn, results, normalizer=adapter.wrap)
+            for bill, _old in changes:
+                total_new_status += 1
+                new_status = bill["status_general"]
+                if not DRY_RUN:
+                    msg = f"*{bill['bill_number']}* · {bill['title']}\nState: {bill['jurisdiction']}  •  Status: *{new_status}*\nUpdated: {bill['last_action_date']}"
+                    if bill.get("effective_date"):
+                        msg += f"\nEffective: {bill['effective_date']}"
+                    enqueue_alert(conn, "status", alert_key("status", bill["bill_uid"], new_status, bill["last_action_date"]), msg, blocks=[{"type":"section","text":{"type":"mrkdwn","text":msg}}])
+        for k, v in counts.items():
+            totals[k] += v
+
+        top = max(b.get("updated_at") or "" for b in results)
+        pending = (st, max(top, pending[1]) if pending else top)
+    if pending:
+        save_mark(*pending)
+    return totals, total_new_status
+
+def openstates_states():
+    """DEFAULT_STATES, or the all-jurisdictions marker when it's empty."""
+    return [s for s in (DEFAULT_STATES or []) if s.strip()] or ["__ALL__"]
+
 def main():
     parser = argparse.ArgumentParser()
     parser.add_argument("--since", help="ISO date YYYY-MM-DD for OpenStates updated_since")
@@ -41,90 +138,62 @@ def main():
     parser.add_argument("--no-openstates", action="store_true", help="Skip OpenStates source")
     parser.add_argument("--no-rss", action="store_true", help="Skip RSS source")
     parser.add_argument("--feeds", default="feeds.yml", help="Path to feeds.yml")
+    parser.add_argument("--no-http", action="store_true", help="Skip HTTP keyword sources")
+    parser.add_argument("--sources", default="sources.yml", help="Path to sources.yml")
+    parser.add_argument("--plugin", action="append", default=[], metavar="NAME",
+                        help="Also run this registered source plugin on the entries of its config file (repeatable)")
+    parser.add_argument("--no-http-cache", action="store_true", help="Always download and parse every feed/page")
+    parser.add_argument("--no-dispatch", action="store_true", help="Only queue alerts; leave sending to `python alerts.py dispatch`")
+    parser.add_argument("--concurrency", type=int, default=OPENSTATES_CONCURRENCY, help="Parallel OpenStates page fetches (1 = serial)")
+    parser.add_argument("--profile", action="store_true", help="Write a CPU/memory profile of this run under PROFILE_DIR")
     args = parser.parse_args()
+    for name in args.plugin:
+        try:
+            plugin_target(name)
+        except ValueError as e:
+            parser.error(str(e))
 
     since = args.since or (datetime.now(timezone.utc) - timedelta(days=DEFAULT_SINCE_DAYS)).date().isoformat()
     q = args.q or DEFAULT_QUERY
 
     engine = get_engine()
-
-    # --- RSS plugin ---
-    if not args.no_rss:
-        feeds = load_feeds_config(args.feeds)
-        rss = RSSPlugin(feeds)
-        count = 0
-        for item in rss.fetch():
-            count += 1
-            # For now, just Slack it (could upsert into a 'news' table later)
-            title = item.get("title","")
-            url = item.get("url","")
-            topic = item.get("topic_labels","")
-            msg = f"📰 *{title}*\n{url}"
-            if topic:
-                msg = f"[{topic}] " + msg
-            if not DRY_RUN and (item.get("slack") or True):
-                send_slack(msg, blocks=[{"type":"section","text":{"type":"mrkdwn","text":msg}}])
-        print(f"RSS items processed: {count}")
-
-    # --- OpenStates pass-through (still uses your existing DB + normalize) ---
-    if not args.no_openstates:
-        raw_states = DEFAULT_STATES
-        states = [s for s in (raw_states or []) if s.strip()]
-        if not states:
-            states = ["__ALL__"]
-        total_new_status = 0
-        adapter = OpenStatesAdapter()
-
-        for st in states:
-            page = 1
-            while True:
-                params = {
-                    "q": q,
-                    "updated_since": since,
-                    "sort": "updated_at",
-                    "per_page": 50,
-                    "page": page,
-                    "include": "sponsorships,actions,subject,related_bills"
-                }
-                if st != "__ALL__":
-                    params["jurisdiction"] = st
-                data = openstates_get(params)
-                results = data.get("results", [])
-                if not results:
-                    break
-
-                with engine.begin() as conn:
-                    for b in results:
-                        item = adapter.wrap(b)
-                        bill = item["bill"]
-                        actions = item["actions"]
-                        old_status = conn.execute(text("SELECT status_general FROM bills WHERE bill_uid=:u"), {"u": bill["bill_uid"]}).scalar()
-                        upsert_bill(conn, bill)
-                        for a in actions:
-                            aid = hash_action(bill["bill_uid"], a)
-                            conn.execute(text("""
-                                INSERT INTO actions (id, bill_uid, action_date, organization, classification, action_text)
-                                VALUES (:id, :bill_uid, :action_date, :organization, :classification, :action_text)
-                                ON CONFLICT(id) DO NOTHING
-                            """), {
-                                "id": aid,
-                                "bill_uid": bill["bill_uid"],
-                                "action_date": a.get("action_date"),
-                                "organization": a.get("organization"),
-                                "classification": ",".join(a.get("classification", [])),
-                                "action_text": a.get("action_text"),
-                            })
-                        new_status = bill["status_general"]
-                        if new_status and new_status != (old_status or "") and not DRY_RUN:
-                            msg = f"*{bill['bill_number']}* · {bill['title']}\nState: {bill['jurisdiction']}  •  Status: *{new_status}*\nUpdated: {bill['last_action_date']}"
-                            if bill.get("effective_date"):
-                                msg += f"\nEffective: {bill['effective_date']}"
-                            send_slack(msg, blocks=[{"type":"section","text":{"type":"mrkdwn","text":msg}}])
-
-                page += 1
-        print("OpenStates processing complete.")
-
-    print("✅ Plugin run finished.")
+    # Conditional GETs for feeds and pages; validators are only persisted
+    # after the items they produced are committed.
+    cache = None if args.no_http_cache else HTTPCache()
+    seen = SeenNews()
+
+    with CollectorRun(engine, "collector_plugins", profile=args.profile):
+        # --- RSS plugin ---
+        if not args.no_rss:
+            count, new = collect_rss(engine, seen, load_feeds_config(args.feeds), cache)
+            print(f"RSS items processed: {count} ({new} new)")
+
+        # --- HTTP keyword sources ---
+        if not args.no_http:
+            http_count, new = collect_http(engine, seen, load_sources_config(args.sources), cache)
+            print(f"HTTP items processed: {http_count} ({new} new)")
+
+        # --- other registered plugins (SOURCE_PLUGINS, entry points) ---
+        for name in args.plugin:
+            count, new = collect_plugin(engine, seen, name, load_entries(load_plugin(name).config), cache)
+            print(f"{name} items processed: {count} ({new} new)")
+
+        if cache and not (args.no_rss and args.no_http and not args.plugin):
+            print(f"HTTP cache: {cache.stats['changed']} changed, {cache.stats['not_modified']} not modified, {cache.stats['unchanged']} same body")
+
+        # --- OpenStates pass-through (still uses your existing DB + normalize) ---
+        if not args.no_openstates:
+            # Resume each jurisdiction from its committed watermark unless --since
+            # asks for an explicit window/backfill.
+            totals, _ = collect_openstates(engine, openstates_states(), q, since, args.concurrency, resume=not args.since)
+            print(f"OpenStates bills: {totals['new']} new, {totals['changed']} changed, {totals['skipped']} unchanged (skipped)")
+            print("OpenStates processing complete.")
+
+        if not DRY_RUN and not args.no_dispatch:
+            sent = dispatch_outbox(engine)
+            print(f"Alerts sent: {sent}")
+
+        print("✅ Plugin run finished.")
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,537 @@
+import os, re, json, time, random, signal, argparse, threading
+from concurrent.futures import ThreadPoolExecutor, wait
+from datetime import datetime, timedelta, timezone
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+import requests
+from dotenv import load_dotenv
+from db import get_engine, load_schedule_state, record_job_run
+from alerts import dispatch_outbox
+from news import SeenNews
+from plugins.http_cache import HTTPCache
+from openstates_api import OPENSTATES_CONCURRENCY
+from collector_plugins import (DEFAULT_QUERY, DEFAULT_SINCE_DAYS, DRY_RUN, collect_http, collect_openstates,
+                               collect_rss, load_feeds_config, load_sources_config, openstates_states)
+from metrics import REGISTRY, CollectorRun, format_metric, inc, observe
+from polling import ADAPTIVE, PollState, adapt, clamp, explain, fmt_interval
+import implemented_alerts
+
+# Resident replacement for the cron entries: one process keeps its engines,
+# HTTP keep-alive pools, parsed feeds.yml/sources.yml and the known news
+# keys warm, and runs every source as its own job on its own interval:
+#   openstates:<jurisdiction>  one per DEFAULT_STATES entry
+#   rss:<name> / http:<name>   one per feeds.yml / sources.yml entry
+#   digest                     implemented_alerts (effective-date digest)
+#   dispatch                   alerts.dispatch_outbox
+# A job never overlaps itself, OpenStates jobs run one at a time (one API
+# quota), and each run is stored in schedule_state so a restart picks the
+# schedule up where it left off, and as a collector_runs row (collector =
+# job key) holding only that job's counters. Jobs overlap on the network;
+# their writes share the writer engine, which on SQLite is one connection,
+# so they take turns there. Config files are re-read when they change
+# (or on SIGHUP); SIGTERM/SIGINT stop new runs and wait for running ones.
+# OpenStates, RSS and HTTP jobs adapt their interval to how often their
+# source actually changes, within per-kind bounds (see polling.py).
+
+load_dotenv()
+
+_UNITS = {"s": 1, "m": 60, "h": 3600, "d": 86400}
+
+def parse_interval(v) -> float:
+    """Seconds from 90, "90", "15m", "2h" or "1d"."""
+    if isinstance(v, (int, float)):
+        return float(v)
+    m = re.fullmatch(r"\s*(\d+(?:\.\d+)?)\s*([smhd]?)\s*", str(v or ""))
+    if not m:
+        raise ValueError(f"bad interval {v!r}: use seconds or a number with s/m/h/d")
+    return float(m.group(1)) * _UNITS[m.group(2) or "s"]
+
+DAEMON_WORKERS = int(os.getenv("DAEMON_WORKERS", "4"))
+DAEMON_HOST = os.getenv("DAEMON_HOST", "127.0.0.1")
+DAEMON_PORT = int(os.getenv("DAEMON_PORT", "8081"))  # /health and /metrics; 0 = off
+DAEMON_JITTER = float(os.getenv("DAEMON_JITTER", "0.1"))  # ± share of the interval
+DAEMON_CONFIG_CHECK = float(os.getenv("DAEMON_CONFIG_CHECK", "10"))
+DAEMON_SHUTDOWN_GRACE = float(os.getenv("DAEMON_SHUTDOWN_GRACE", "60"))
+# Default (starting) intervals; feeds.yml/sources.yml entries may set their own
+# `interval:`, which is then fixed unless the entry also sets bounds
+DEFAULT_INTERVALS = {
+    "openstates": parse_interval(os.getenv("DAEMON_OPENSTATES_INTERVAL", "1h")),
+    "rss": parse_interval(os.getenv("DAEMON_RSS_INTERVAL", "30m")),
+    "http": parse_interval(os.getenv("DAEMON_HTTP_INTERVAL", "1h")),
+    "digest": parse_interval(os.getenv("DAEMON_DIGEST_INTERVAL", "1d")),
+    "dispatch": parse_interval(os.getenv("DAEMON_DISPATCH_INTERVAL", "1m")),
+}
+# Adaptive bounds per kind; entries may set `min_interval:`/`max_interval:`
+INTERVAL_BOUNDS = {
+    kind: (parse_interval(os.getenv(f"DAEMON_{kind.upper()}_MIN_INTERVAL", lo)),
+           parse_interval(os.getenv(f"DAEMON_{kind.upper()}_MAX_INTERVAL", hi)))
+    for kind, lo, hi in (("openstates", "20m", "1d"), ("rss", "10m", "2h"), ("http", "15m", "12h"))
+}
+KIND_CONCURRENCY = {"openstates": 1}
+DIGEST_WINDOW_DAYS = int(os.getenv("DIGEST_WINDOW_DAYS", "7"))
+
+def _iso(ts):
+    return datetime.fromtimestamp(ts, timezone.utc).isoformat() if ts else None
+
+class Job:
+    __slots__ = ("key", "kind", "default", "bounds", "poll", "fn", "spec", "next_run", "running", "last_started",
+                 "last_status", "last_seconds", "last_error", "last_result", "failures_in_row")
+
+    def __init__(self, key, kind, default, bounds, fn, spec=None):
+        self.key = key
+        self.kind = kind
+        self.default = default  # configured interval: the starting point, or the fixed one
+        self.bounds = bounds    # (min, max) when the interval adapts, else None
+        self.poll = PollState(clamp(default, bounds or (default, default)))
+        self.fn = fn
+        self.spec = spec  # the config entry the job was built from, to spot edits
+        self.next_run = None
+        self.running = False
+        self.last_started = None
+        self.last_status = None
+        self.last_seconds = None
+        self.last_error = None
+        self.last_result = None
+        self.failures_in_row = 0
+
+    @property
+    def interval(self):
+        return self.poll.interval
+
+    def status(self, now) -> dict:
+        return {"job": self.key, "kind": self.kind, "interval_seconds": round(self.interval, 1), "running": self.running,
+                "next_run_in_seconds": round(self.next_run - now, 1) if self.next_run else None,
+                "last_started_at": _iso(self.last_started), "last_status": self.last_status,
+                "last_seconds": self.last_seconds, "last_result": self.last_result,
+                "last_error": self.last_error, "failures_in_row": self.failures_in_row}
+
+    def schedule_status(self, now) -> dict:
+        return {"job": self.key, "kind": self.kind, "interval_seconds": round(self.interval, 1),
+                "default_seconds": self.default, "bounds_seconds": list(self.bounds) if self.bounds else None,
+                "changes_per_day": round(self.poll.changes_per_day(), 2), "quiet_runs": self.poll.quiet_runs,
+                "last_change_at": _iso(self.poll.last_change), "last_started_at": _iso(self.last_started),
+                "next_run_in_seconds": round(self.next_run - now, 1) if self.next_run else None,
+                "why": explain(self.poll, self.bounds) if self.kind in INTERVAL_BOUNDS else "fixed interval"}
+
+def _entry_keys(kind, entries):
+    # name, else url; repeated names get a #n suffix so every entry is its own job
+    seen, out = {}, []
+    for e in entries:
+        base = f"{kind}:{e.get('name') or e.get('url')}"
+        seen[base] = seen.get(base, 0) + 1
+        out.append((base if seen[base] == 1 else f"{base}#{seen[base]}", e))
+    return out
+
+class Scheduler:
+    def __init__(self, engine, feeds_path="feeds.yml", sources_path="sources.yml", workers=DAEMON_WORKERS,
+                 skip=(), jitter=DAEMON_JITTER):
+        self.engine = engine
+        self.feeds_path = feeds_path
+        self.sources_path = sources_path
+        self.skip = set(skip)
+        self.jitter = jitter
+        self.jobs = {}
+        self.started = time.time()
+        self.heartbeat = time.monotonic()
+        self.stopping = threading.Event()
+        self.wakeup = threading.Event()
+        self.reload_requested = threading.Event()
+        self._lock = threading.Lock()
+        self._pool = ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="job")
+        self._futures = {}
+        self._mtimes = {}
+        self._config = {"rss": [], "http": []}
+        self._random = random.Random()
+        self._once = False
+        # Shared across runs: keep-alive connections to feed/page hosts, and
+        # the news_items keys (loaded once, not per run)
+        self.session = requests.Session()
+        self.seen = SeenNews()
+
+    # ---- job table ----
+
+    def _job_specs(self):
+        """{key: (kind, default interval, bounds, fn, spec)} for the current config."""
+        specs = {}
+        if "openstates" not in self.skip:
+            for st in openstates_states():
+                specs[f"openstates:{st}"] = ("openstates", DEFAULT_INTERVALS["openstates"], self._bounds("openstates"),
+                                             lambda st=st: self._run_openstates(st), st)
+        for kind, run in (("rss", self._run_rss), ("http", self._run_http)):
+            if kind in self.skip:
+                continue
+            for key, entry in _entry_keys(kind, self._config[kind]):
+                if not entry.get("url"):
+                    continue
+                try:
+                    interval = parse_interval(entry["interval"]) if entry.get("interval") else DEFAULT_INTERVALS[kind]
+                    bounds = self._bounds(kind, entry)
+                except ValueError as e:
+                    print(f"⚠️ {key}: {e}; using the default interval")
+                    interval, bounds = DEFAULT_INTERVALS[kind], self._bounds(kind)
+                specs[key] = (kind, interval, bounds, lambda entry=entry, run=run: run(entry), entry)
+        if "digest" not in self.skip and not DRY_RUN:
+            specs["digest"] = ("digest", DEFAULT_INTERVALS["digest"], None, self._run_digest, None)
+        if "dispatch" not in self.skip and not DRY_RUN:
+            specs["dispatch"] = ("dispatch", DEFAULT_INTERVALS["dispatch"], None, self._run_dispatch, None)
+        return specs
+
+    @staticmethod
+    def _bounds(kind, entry=None):
+        """Adaptive (min, max) for a job, or None for a fixed interval: with
+        DAEMON_ADAPTIVE=0, or an entry that sets `interval:` without bounds."""
+        entry = entry or {}
+        if not ADAPTIVE or (entry.get("interval") and not (entry.get("min_interval") or entry.get("max_interval"))):
+            return None
+        lo, hi = INTERVAL_BOUNDS[kind]
+        lo = parse_interval(entry["min_interval"]) if entry.get("min_interval") else lo
+        hi = parse_interval(entry["max_interval"]) if entry.get("max_interval") else hi
+        return (lo, max(lo, hi))
+
+    def reconcile(self, state=None):
+        """Bring self.jobs in line with the config: add new jobs, drop removed
+        ones (a running one finishes first), update edited ones in place."""
+        specs = self._job_specs()
+        now = time.time()
+        added, removed, changed = [], [], []
+        with self._lock:
+            for key in list(self.jobs):
+                if key not in specs:
+                    del self.jobs[key]
+                    removed.append(key)
+            for key, (kind, default, bounds, fn, spec) in specs.items():
+                job = self.jobs.get(key)
+                if job is None:
+                    job = self.jobs[key] = Job(key, kind, default, bounds, fn, spec)
+                    row = (state or {}).get(key)
+                    if row:
+                        job.last_started = datetime.fromisoformat(row["last_started_at"]).timestamp()
+                        job.last_status = row["last_status"]
+                        job.last_seconds = row["last_seconds"]
+                        job.last_error = row["last_error"]
+                        last_change = row.get("last_change_at")
+                        job.poll = PollState(clamp(row.get("interval_seconds") or default, bounds or (default, default)),
+                                             row.get("change_rate") or 0.0, row.get("quiet_runs") or 0,
+                                             datetime.fromisoformat(last_change).timestamp() if last_change else None)
+                    self._schedule(job, now)
+                    added.append(key)
+                elif job.spec != spec or job.default != default or job.bounds != bounds:
+                    job.fn, job.spec = fn, spec
+                    if job.default != default or job.bounds != bounds:
+                        job.default, job.bounds = default, bounds
+                        job.poll.interval = clamp(job.interval if bounds else default, bounds or (default, default))
+                        self._schedule(job, now)
+                    changed.append(key)
+        self.wakeup.set()
+        return added, removed, changed
+
+    def _schedule(self, job, now):
+        if job.last_started is None:
+            # Never ran: spread first runs over a minute instead of a thundering start
+            job.next_run = now + self._random.uniform(0, min(60.0, job.interval))
+            return
+        due = job.last_started + job.interval * (1 + self._random.uniform(-self.jitter, self.jitter))
+        job.next_run = due if due > now else now + self._random.uniform(0, min(60.0, job.interval * self.jitter))
+
+    # ---- config ----
+
+    def check_config(self, force=False):
+        changed = False
+        for kind, path, loader in (("rss", self.feeds_path, load_feeds_config),
+                                   ("http", self.sources_path, load_sources_config)):
+            try:
+                mtime = os.stat(path).st_mtime_ns
+            except OSError:
+                mtime = None
+            if not force and self._mtimes.get(path, -1) == mtime:
+                continue
+            try:
+                entries = loader(path)
+            except Exception as e:
+                print(f"⚠️ Could not reload {path}, keeping the previous config: {e}")
+                self._mtimes[path] = mtime
+                continue
+            self._mtimes[path] = mtime
+            self._config[kind] = [e for e in entries if isinstance(e, dict)]
+            changed = True
+        return changed
+
+    # ---- running ----
+
+    def tick(self):
+        """Start every due job that isn't running (and whose kind has room)."""
+        now = time.time()
+        with self._lock:
+            running = {}
+            for job in self.jobs.values():
+                if job.running:
+                    running[job.kind] = running.get(job.kind, 0) + 1
+            for job in sorted(self.jobs.values(), key=lambda j: j.next_run):
+                if job.next_run > now or job.running:
+                    continue
+                limit = KIND_CONCURRENCY.get(job.kind)
+                if limit is not None and running.get(job.kind, 0) >= limit:
+                    continue
+                job.running = True
+                running[job.kind] = running.get(job.kind, 0) + 1
+                self._futures[self._pool.submit(self._execute, job)] = job
+            upcoming = [j.next_run for j in self.jobs.values() if not j.running]
+        return min(upcoming) - now if upcoming else 60.0
+
+    def _execute(self, job):
+        started = time.time()
+        t0 = time.perf_counter()
+        status, error, result, changes = "ok", None, None, None
+        try:
+            with CollectorRun(self.engine, job.key, scoped=True):
+                result, changes = job.fn()
+        except Exception as e:
+            status, error = "error", f"{type(e).__name__}: {e}"
+        seconds = time.perf_counter() - t0
+        inc("job_runs_total", kind=job.kind, status=status)
+        observe("job_run_seconds", seconds, kind=job.kind)
+        with self._lock:
+            if changes is not None:
+                # Fixed-interval jobs still track their change rate, for the status view
+                elapsed = started - job.last_started if job.last_started else job.interval
+                before = fmt_interval(job.interval)
+                job.poll = adapt(job.poll, changes, elapsed, job.bounds or (job.default, job.default), started)
+                if fmt_interval(job.interval) != before:
+                    result = f"{result}; interval {before} → {fmt_interval(job.interval)}"
+            job.running = False
+            job.last_started, job.last_seconds = started, round(seconds, 3)
+            job.last_status, job.last_error, job.last_result = status, error, result
+            job.failures_in_row = 0 if status == "ok" else job.failures_in_row + 1
+            poll = PollState(job.poll.interval, job.poll.rate, job.poll.quiet_runs, job.poll.last_change)
+            if self._once:
+                job.next_run = float("inf")
+            else:
+                self._schedule(job, time.time())
+        print(f"{'✅' if status == 'ok' else '⚠️'} {job.key}: {result or error or status} ({seconds:.1f}s)", flush=True)
+        try:
+            with self.engine.begin() as conn:
+                record_job_run(conn, job.key, started, seconds, status, error, changes,
+                               poll if changes is not None else None)
+        except Exception as e:
+            print(f"⚠️ Could not record {job.key} run: {e}")
+        self.wakeup.set()
+
+    def _run_openstates(self, jurisdiction):
+        since = (datetime.now(timezone.utc) - timedelta(days=DEFAULT_SINCE_DAYS)).date().isoformat()
+        totals, _ = collect_openstates(self.engine, [jurisdiction], DEFAULT_QUERY, since,
+                                       OPENSTATES_CONCURRENCY, resume=True)
+        text = f"{totals['new']} new, {totals['changed']} changed, {totals['skipped']} unchanged bills"
+        return text, totals["new"] + totals["changed"]
+
+    def _run_rss(self, feed):
+        # A cache per run: commit() must only persist validators of this run's items
+        count, new = collect_rss(self.engine, self.seen, [feed], HTTPCache(session=self.session))
+        return f"{count} items ({new} new)", new
+
+    def _run_http(self, source):
+        count, new = collect_http(self.engine, self.seen, [source], HTTPCache(session=self.session))
+        return f"{count} items ({new} new)", new
+
+    def _run_digest(self):
+        implemented_alerts.main(DIGEST_WINDOW_DAYS)
+        return "digest sent", None
+
+    def _run_dispatch(self):
+        return f"{dispatch_outbox(self.engine)} alerts sent", None
+
+    def load(self):
+        """Read the config files and build the job table, resuming each job's
+        last run and learned interval from schedule_state."""
+        with self.engine.begin() as conn:
+            state = load_schedule_state(conn)
+        self.check_config(force=True)
+        self.reconcile(state)
+
+    def run_forever(self):
+        self.load()
+        print(f"⏱️ Scheduler started with {len(self.jobs)} jobs", flush=True)
+        last_check = time.monotonic()
+        while not self.stopping.is_set():
+            self.heartbeat = time.monotonic()
+            if self.reload_requested.is_set() or self.heartbeat - last_check >= DAEMON_CONFIG_CHECK:
+                force = self.reload_requested.is_set()
+                self.reload_requested.clear()
+                last_check = self.heartbeat
+                if self.check_config(force=force):
+                    added, removed, changed = self.reconcile()
+                    if added or removed or changed:
+                        print(f"🔄 Config reloaded: {len(added)} jobs added, {len(removed)} removed, "
+                              f"{len(changed)} changed", flush=True)
+            with self._lock:
+                self._futures = {f: j for f, j in self._futures.items() if not f.done()}
+            delay = self.tick()
+            self.wakeup.wait(max(0.05, min(delay, DAEMON_CONFIG_CHECK, 5.0)))
+            self.wakeup.clear()
+
+    def run_once(self):
+        """Run every job once, in parallel as the schedule would, and return."""
+        self._once = True
+        self.load()
+        with self._lock:
+            for job in self.jobs.values():
+                job.next_run = 0
+        while True:
+            self.tick()
+            with self._lock:
+                pending = [f for f in self._futures if not f.done()]
+                left = [j for j in self.jobs.values() if j.next_run == 0 and not j.running]
+            if not pending and not left:
+                return
+            wait(pending, timeout=1.0)
+
+    def stop(self):
+        self.stopping.set()
+        self.wakeup.set()
+
+    def shutdown(self, grace=DAEMON_SHUTDOWN_GRACE):
+        """Start nothing new and wait up to `grace` seconds for running jobs.
+        Returns the keys of jobs still running after that."""
+        self.stop()
+        with self._lock:
+            pending = list(self._futures)
+        wait(pending, timeout=grace)
+        self._pool.shutdown(wait=False, cancel_futures=True)
+        with self._lock:
+            return [j.key for j in self.jobs.values() if j.running]
+
+    def health(self) -> dict:
+        now = time.time()
+        stalled = time.monotonic() - self.heartbeat > max(30.0, 3 * DAEMON_CONFIG_CHECK)
+        with self._lock:
+            jobs = [j.status(now) for j in sorted(self.jobs.values(), key=lambda j: j.key)]
+        return {"status": "stopping" if self.stopping.is_set() else ("stalled" if stalled else "ok"),
+                "started_at": _iso(self.started), "uptime_seconds": round(now - self.started, 1),
+                "jobs_running": sum(j["running"] for j in jobs),
+                "jobs_failing": [j["job"] for j in jobs if j["failures_in_row"]],
+                "jobs": jobs}
+
+    def schedule(self) -> dict:
+        """Every job's current interval and why, plus the polling budget
+        against the configured defaults."""
+        now = time.time()
+        with self._lock:
+            jobs = sorted(self.jobs.values(), key=lambda j: j.key)
+            rows = [j.schedule_status(now) for j in jobs]
+            polled = [j for j in jobs if j.kind in INTERVAL_BOUNDS]
+            per_day = round(sum(86400 / j.interval for j in polled), 1)
+            per_day_default = round(sum(86400 / j.default for j in polled), 1)
+        return {"adaptive": ADAPTIVE, "polls_per_day": per_day, "polls_per_day_at_defaults": per_day_default,
+                "jobs": rows}
+
+    def render_metrics(self) -> str:
+        now = time.time()
+        with self._lock:
+            jobs = list(self.jobs.values())
+        return REGISTRY.render() + "".join([
+            format_metric("job_interval_seconds", "gauge",
+                          [({"job": j.key, "kind": j.kind}, j.interval) for j in jobs], "Configured interval per job"),
+            format_metric("job_last_run_start_seconds", "gauge",
+                          [({"job": j.key, "kind": j.kind}, j.last_started) for j in jobs if j.last_started],
+                          "Start of each job's latest run (unix time)"),
+            format_metric("job_changes_per_day", "gauge",
+                          [({"job": j.key, "kind": j.kind}, round(j.poll.changes_per_day(), 3)) for j in jobs
+                           if j.kind in INTERVAL_BOUNDS],
+                          "Smoothed new/changed items per day each job finds"),
+            format_metric("job_failures_in_row", "gauge",
+                          [({"job": j.key, "kind": j.kind}, j.failures_in_row) for j in jobs],
+                          "Consecutive failed runs per job"),
+            format_metric("job_running", "gauge", [({"job": j.key, "kind": j.kind}, int(j.running)) for j in jobs],
+                          "1 while the job runs"),
+            format_metric("scheduler_uptime_seconds", "gauge", [({}, round(now - self.started, 1))],
+                          "Seconds since the daemon started"),
+        ])
+
+def serve_health(scheduler, host=DAEMON_HOST, port=DAEMON_PORT) -> ThreadingHTTPServer:
+    """GET /health (JSON; 503 when stalled or stopping), GET /schedule and
+    GET /metrics."""
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            path = self.path.split("?", 1)[0]
+            if path == "/health":
+                h = scheduler.health()
+                body, code, ctype = json.dumps(h).encode("utf-8"), 200 if h["status"] == "ok" else 503, "application/json"
+            elif path == "/schedule":
+                body, code, ctype = json.dumps(scheduler.schedule()).encode("utf-8"), 200, "application/json"
+            elif path == "/metrics":
+                body, code, ctype = scheduler.render_metrics().encode("utf-8"), 200, "text/plain; version=0.0.4; charset=utf-8"
+            else:
+                body, code, ctype = b"not found\n", 404, "text/plain"
+            self.send_response(code)
+            self.send_header("Content-Type", ctype)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass  # probes every few seconds would drown the job log
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="health", daemon=True).start()
+    return server
+
+def print_schedule(schedule):
+    print(f"{'job':32s} {'interval':>8s} {'default':>8s} {'bounds':>9s} {'next in':>8s}  why")
+    for j in schedule["jobs"]:
+        bounds = "-".join(fmt_interval(b) for b in j["bounds_seconds"]) if j["bounds_seconds"] else "fixed"
+        due = j["next_run_in_seconds"]
+        print(f"{j['job'][:32]:32s} {fmt_interval(j['interval_seconds']):>8s} {fmt_interval(j['default_seconds']):>8s} "
+              f"{bounds:>9s} {fmt_interval(max(due, 0)) if due is not None else '-':>8s}  {j['why']}")
+    print(f"\nPolls per day: {schedule['polls_per_day']:.0f} "
+          f"(at the default intervals: {schedule['polls_per_day_at_defaults']:.0f})"
+          + ("" if schedule["adaptive"] else "; adaptive polling is off (DAEMON_ADAPTIVE=0)"))
+
+def main():
+    parser = argparse.ArgumentParser(description="Run every source on its own schedule in one resident process")
+    parser.add_argument("--feeds", default="feeds.yml", help="Path to feeds.yml (re-read when it changes)")
+    parser.add_argument("--sources", default="sources.yml", help="Path to sources.yml (re-read when it changes)")
+    parser.add_argument("--workers", type=int, default=DAEMON_WORKERS, help="Jobs that may run at the same time")
+    parser.add_argument("--port", type=int, default=DAEMON_PORT, help="Port for /health and /metrics (0 = off)")
+    parser.add_argument("--skip", action="append", default=[], choices=["openstates", "rss", "http", "digest", "dispatch"],
+                        help="Don't schedule this kind of job. Repeatable.")
+    parser.add_argument("--once", action="store_true", help="Run every job once and exit")
+    parser.add_argument("--status", action="store_true",
+                        help="Print each job's current interval and why, from schedule_state, and exit")
+    args = parser.parse_args()
+
+    engine = get_engine()
+    scheduler = Scheduler(engine, args.feeds, args.sources, args.workers, skip=args.skip)
+    if args.status:
+        scheduler.jitter = 0  # show when each job is due, not a jittered draw
+        scheduler.load()
+        print_schedule(scheduler.schedule())
+        return
+    if args.once:
+        scheduler.run_once()
+        return
+
+    server = serve_health(scheduler, port=args.port) if args.port else None
+    if server:
+        print(f"🩺 Health on http://{DAEMON_HOST}:{args.port}/health", flush=True)
+
+    def on_stop(signum, frame):
+        print(f"🛑 {signal.Signals(signum).name}: finishing running jobs", flush=True)
+        scheduler.stop()
+
+    signal.signal(signal.SIGTERM, on_stop)
+    signal.signal(signal.SIGINT, on_stop)
+    if hasattr(signal, "SIGHUP"):
+        signal.signal(signal.SIGHUP, lambda signum, frame: (scheduler.reload_requested.set(), scheduler.wakeup.set()))
+
+    scheduler.run_forever()
+    left = scheduler.shutdown()
+    if server:
+        server.shutdown()
+    if left:
+        # Abandoned runs lose at most their uncommitted page; watermarks and
+        # HTTP validators are only saved after commit, so the next run redoes it.
+        print(f"⚠️ Still running after {DAEMON_SHUTDOWN_GRACE:.0f}s, abandoned: {', '.join(left)}", flush=True)
+        os._exit(1)
+    print("👋 Scheduler stopped", flush=True)
+
+if __name__ == "__main__":
+    main()
@@ -1,12 +1,17 @@
 \
-import os, hashlib
-from sqlalchemy import create_engine, text
+import os, io, csv, json, hashlib
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+from sqlalchemy import create_engine, event, text, bindparam, inspect
 from sqlalchemy.engine import Engine
 from dotenv import load_dotenv
 
 load_dotenv()
 
 DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///policy_radar.db")
+# How far before the stored watermark an incremental sync restarts, to absorb
+# clock skew and bills committed upstream out of updated_at order.
+SYNC_OVERLAP_MINUTES = int(os.getenv("SYNC_OVERLAP_MINUTES", "60"))
 
 SCHEMA_SQL = """
 CREATE TABLE IF NOT EXISTS bills (
@@ -25,7 +30,9 @@ CREATE TABLE IF NOT EXISTS bills (
   introduced_date TEXT,
   effective_date TEXT,
   last_action_date TEXT,
-  updated_at TEXT
+  updated_at TEXT,
+  fingerprint TEXT,
+  status_state TEXT
 );
 
 CREATE TABLE IF NOT EXISTS actions (
@@ -46,54 +53,600 @@ CREATE TABLE IF NOT EXISTS labels (
   FOREIGN KEY (bill_uid) REFERENCES bills(bill_uid)
 );
 
+CREATE TABLE IF NOT EXISTS sync_state (
+  source TEXT NOT NULL,
+  jurisdiction TEXT NOT NULL,
+  query_hash TEXT NOT NULL,
+  watermark TEXT,
+  synced_at TEXT,
+  PRIMARY KEY (source, jurisdiction, query_hash)
+);
+
+-- Slack alerts written in the same transaction as the change that caused
+-- them, drained by alerts.dispatch_outbox
+CREATE TABLE IF NOT EXISTS alert_outbox (
+  id TEXT PRIMARY KEY,
+  kind TEXT NOT NULL,
+  message TEXT NOT NULL,
+  blocks TEXT,
+  created_at TEXT NOT NULL,
+  sent_at TEXT,
+  attempts INTEGER DEFAULT 0,
+  last_error TEXT,
+  claimed_at TEXT,
+  claim TEXT
+);
+
+-- RSS / HTTP items, one row per (canonical url, title+summary hash), see news.py
+CREATE TABLE IF NOT EXISTS news_items (
+  id TEXT PRIMARY KEY,
+  source TEXT NOT NULL,
+  jurisdiction TEXT,
+  title TEXT,
+  summary TEXT,
+  url TEXT,
+  canonical_url TEXT NOT NULL,
+  content_hash TEXT NOT NULL,
+  status TEXT,
+  effective_date TEXT,
+  topic_labels TEXT,
+  first_seen TEXT NOT NULL
+);
+
+-- Bumped in every transaction that changes what serve.py shows, and part
+-- of its response-cache keys and ETags
+CREATE TABLE IF NOT EXISTS data_version (
+  name TEXT PRIMARY KEY,
+  version INTEGER NOT NULL,
+  bumped_at TEXT
+);
+
+-- Interned facet values (topic, subject, committee, sponsor) and which bills
+-- carry them, so facet filters and counts use indexes instead of LIKE over
+-- comma-joined strings. facet_counts is kept in step by every bill and
+-- facet write (apply_facet_deltas), and refresh_facet_counts rebuilds it.
+CREATE TABLE IF NOT EXISTS facets (
+  id TEXT PRIMARY KEY,
+  kind TEXT NOT NULL,
+  value TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS bill_facets (
+  facet_id TEXT NOT NULL,
+  bill_uid TEXT NOT NULL,
+  PRIMARY KEY (facet_id, bill_uid)
+);
+
+CREATE TABLE IF NOT EXISTS facet_counts (
+  kind TEXT NOT NULL,
+  value TEXT NOT NULL,
+  bills INTEGER NOT NULL,
+  refreshed_at TEXT,
+  PRIMARY KEY (kind, value)
+);
+
+-- One row per collector run (metrics.CollectorRun): totals as columns for
+-- queries, the per-stage/per-host breakdown as JSON in stats.
+CREATE TABLE IF NOT EXISTS collector_runs (
+  id TEXT PRIMARY KEY,
+  collector TEXT NOT NULL,
+  started_at TEXT NOT NULL,
+  finished_at TEXT NOT NULL,
+  seconds REAL,
+  status TEXT,
+  bills_new INTEGER,
+  bills_changed INTEGER,
+  bills_skipped INTEGER,
+  news_new INTEGER,
+  alerts_queued INTEGER,
+  alerts_sent INTEGER,
+  stats TEXT,
+  profile TEXT
+);
+
+-- Last run of each daemon.py job, so a restarted daemon keeps its schedule
+CREATE TABLE IF NOT EXISTS schedule_state (
+  job TEXT PRIMARY KEY,
+  last_started_at TEXT,
+  last_finished_at TEXT,
+  last_status TEXT,
+  last_seconds REAL,
+  last_error TEXT,
+  runs INTEGER NOT NULL DEFAULT 0,
+  failures INTEGER NOT NULL DEFAULT 0,
+  interval_seconds REAL,
+  change_rate REAL,
+  changes_total INTEGER NOT NULL DEFAULT 0,
+  quiet_runs INTEGER NOT NULL DEFAULT 0,
+  last_change_at TEXT
+);
+
+CREATE INDEX IF NOT EXISTS idx_collector_runs_started ON collector_runs (collector, started_at);
+CREATE UNIQUE INDEX IF NOT EXISTS idx_facets_kind_value ON facets (kind, value);
+CREATE INDEX IF NOT EXISTS idx_bill_facets_bill ON bill_facets (bill_uid);
+CREATE UNIQUE INDEX IF NOT EXISTS idx_news_items_url_hash ON news_items (canonical_url, content_hash);
+CREATE INDEX IF NOT EXISTS idx_news_items_first_seen ON news_items (first_seen);
 CREATE INDEX IF NOT EXISTS idx_actions_bill_uid ON actions (bill_uid);
+CREATE INDEX IF NOT EXISTS idx_alert_outbox_pending ON alert_outbox (sent_at, created_at);
 CREATE INDEX IF NOT EXISTS idx_bills_status ON bills (status_general, jurisdiction);
+-- keyset pagination in serve.py: (updated_at, bill_uid) is the sort key
+CREATE INDEX IF NOT EXISTS idx_bills_updated ON bills (updated_at, bill_uid);
+CREATE INDEX IF NOT EXISTS idx_bills_state_status_updated ON bills (jurisdiction, status_general, updated_at, bill_uid);
+CREATE INDEX IF NOT EXISTS idx_bills_effective ON bills (effective_date);
 """
 
-def get_engine() -> Engine:
-    return create_engine(DATABASE_URL, future=True)
+# Columns added after a table was first created; CREATE TABLE IF NOT EXISTS
+# won't add them to an existing database, so migrate() ALTERs them in.
+ADDED_COLUMNS = {
+    "bills": [("fingerprint", "TEXT"), ("status_state", "TEXT")],
+    "collector_runs": [("profile", "TEXT")],
+    "alert_outbox": [("claimed_at", "TEXT"), ("claim", "TEXT")],
+    "schedule_state": [("interval_seconds", "REAL"), ("change_rate", "REAL"),
+                       ("changes_total", "INTEGER NOT NULL DEFAULT 0"), ("quiet_runs", "INTEGER NOT NULL DEFAULT 0"),
+                       ("last_change_at", "TEXT")],
+}
+
+# SQLite connection tuning. WAL lets serve.py read while a collector writes;
+# busy_timeout makes a second writer wait instead of failing with "database
+# is locked".
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "10000"))
+SQLITE_SYNCHRONOUS = os.getenv("SQLITE_SYNCHRONOUS", "NORMAL")  # durable with WAL except for the last commits on power loss
+SQLITE_CACHE_SIZE_KB = int(os.getenv("SQLITE_CACHE_SIZE_KB", "65536"))
+SQLITE_MMAP_SIZE = int(os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024)))
+# Connections in the read-only pool (serve.py)
+READER_POOL_SIZE = int(os.getenv("READER_POOL_SIZE", "8"))
+
+_engines = {}
+
+def _sqlite_pragmas(engine, role):
+    @event.listens_for(engine, "connect")
+    def _on_connect(dbapi_conn, _record):
+        # let SQLAlchemy emit BEGIN itself (below) instead of pysqlite's implicit one
+        dbapi_conn.isolation_level = None
+        cur = dbapi_conn.cursor()
+        if role == "writer":
+            cur.execute("PRAGMA journal_mode=WAL")
+        cur.execute(f"PRAGMA synchronous={SQLITE_SYNCHRONOUS}")
+        cur.execute(f"PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT_MS}")
+        cur.execute(f"PRAGMA cache_size=-{SQLITE_CACHE_SIZE_KB}")
+        cur.execute(f"PRAGMA mmap_size={SQLITE_MMAP_SIZE}")
+        if role == "reader":
+            cur.execute("PRAGMA query_only=ON")
+        cur.close()
+
+    @event.listens_for(engine, "begin")
+    def _on_begin(conn):
+        # Writers take the write lock up front: a deferred transaction that
+        # upgrades from read to write gets SQLITE_BUSY at once, busy_timeout
+        # or not, when another writer got there first.
+        conn.exec_driver_sql("BEGIN IMMEDIATE" if role == "writer" else "BEGIN")
+
+def get_engine(role: str = "writer") -> Engine:
+    """Process-wide engine for DATABASE_URL.
+
+    role="writer" (collectors, alerts, migrate): on SQLite a single
+    connection, so one process never contends with itself for the write
+    lock; other databases keep SQLAlchemy's default pool.
+    role="reader" (serve.py, digests): a pool of read-only connections.
+    """
+    engine = _engines.get(role)
+    if engine is not None:
+        return engine
+    kwargs = {"future": True}
+    if role == "writer":
+        if DATABASE_URL.startswith("sqlite"):
+            kwargs.update(pool_size=1, max_overflow=0, pool_timeout=SQLITE_BUSY_TIMEOUT_MS / 1000)
+    else:
+        kwargs.update(pool_size=READER_POOL_SIZE, max_overflow=READER_POOL_SIZE)
+    if DATABASE_URL.startswith("sqlite"):
+        engine = create_engine(DATABASE_URL, **kwargs)
+        _sqlite_pragmas(engine, role)
+    else:
+        kwargs["pool_pre_ping"] = True
+        if role == "reader" and DATABASE_URL.startswith("postgresql"):
+            kwargs["execution_options"] = {"postgresql_readonly": True}
+        engine = create_engine(DATABASE_URL, **kwargs)
+    _engines[role] = engine
+    return engine
+
+def _add_missing_columns(conn):
+    insp = inspect(conn)
+    for table, columns in ADDED_COLUMNS.items():
+        have = {c["name"] for c in insp.get_columns(table)}
+        for name, ddl in columns:
+            if name not in have:
+                conn.execute(text(f"ALTER TABLE {table} ADD COLUMN {name} {ddl}"))
 
 def migrate():
+    from search import ensure_search_schema, backfill_search
     engine = get_engine()
     with engine.begin() as conn:
-        conn.execute(text(SCHEMA_SQL))
+        # one statement per execute: the sqlite driver rejects scripts
+        for stmt in SCHEMA_SQL.split(";"):
+            if stmt.strip():
+                conn.execute(text(stmt))
+        _add_missing_columns(conn)
+        faceted = backfill_facets(conn)
+        indexed = backfill_search(conn) if ensure_search_schema(conn) else 0
+        if faceted or indexed:
+            bump_data_version(conn)
+            conn.execute(text("ANALYZE"))  # fresh planner stats for the new tables/indexes
+    if faceted:
+        print(f"Facets backfilled for {faceted} bills")
+    if indexed:
+        print(f"Search index built for {indexed} bills")
     print("✅ DB migrated")
 
+BILL_FIELDS = [
+    "bill_uid","source","jurisdiction","session","bill_number","title","summary",
+    "subjects","sponsors_primary","committees","status_general","status_specific",
+    "introduced_date","effective_date","last_action_date","updated_at","fingerprint","status_state"
+]
+ACTION_FIELDS = ["id","bill_uid","action_date","organization","classification","action_text"]
+LABEL_FIELDS = ["bill_uid","topic_labels","client_vertical","impact_score"]
+
+# table -> (fields, conflict clause); every write statement is derived from this
+UPSERTS = {
+    "bills": (BILL_FIELDS, "ON CONFLICT(bill_uid) DO UPDATE SET " + ", ".join(f"{f}=excluded.{f}" for f in BILL_FIELDS[1:])),
+    "actions": (ACTION_FIELDS, "ON CONFLICT(id) DO NOTHING"),
+    "labels": (LABEL_FIELDS, "ON CONFLICT(bill_uid) DO UPDATE SET " + ", ".join(f"{f}=excluded.{f}" for f in LABEL_FIELDS[1:])),
+    "facets": (["id","kind","value"], "ON CONFLICT(id) DO NOTHING"),
+    "bill_facets": (["facet_id","bill_uid"], "ON CONFLICT(facet_id, bill_uid) DO NOTHING"),
+}
+# Tables whose conflict key is more than the first field
+UPSERT_KEYS = {"bill_facets": ("facet_id", "bill_uid")}
+
+BULK_PAGE_SIZE = int(os.getenv("BULK_PAGE_SIZE", "500"))
+
+_statements = {}
+
+def _upsert_stmt(table):
+    # Built once per process and reused, so SQLAlchemy's compiled cache hits
+    stmt = _statements.get(table)
+    if stmt is None:
+        fields, conflict = UPSERTS[table]
+        stmt = text(f"""
+            INSERT INTO {table} ({", ".join(fields)})
+            VALUES ({", ".join(f":{f}" for f in fields)})
+            {conflict}
+        """)
+        _statements[table] = stmt
+    return stmt
+
+def bulk_upsert(conn, table, rows):
+    """Multi-row upsert into one of the UPSERTS tables.
+
+    Rows sharing a key collapse to the last one (Postgres refuses to touch
+    the same row twice in one INSERT). On Postgres this goes through
+    psycopg2's execute_values, or COPY into a temp table when the
+    connection has the bulk_copy execution option (bulk imports); elsewhere
+    it is a single executemany.
+    """
+    if not rows:
+        return
+    fields, conflict = UPSERTS[table]
+    key = UPSERT_KEYS.get(table, fields[:1])
+    rows = list({tuple(r[k] for k in key): r for r in rows}.values())
+    if conn.dialect.name == "postgresql" and conn.get_execution_options().get("bulk_copy"):
+        _copy_upsert(conn, table, fields, conflict, rows)
+    elif conn.dialect.name == "postgresql":
+        from psycopg2.extras import execute_values
+        cur = conn.connection.dbapi_connection.cursor()
+        try:
+            execute_values(
+                cur,
+                f"INSERT INTO {table} ({', '.join(fields)}) VALUES %s {conflict}",
+                [tuple(r.get(f) for f in fields) for r in rows],
+                page_size=BULK_PAGE_SIZE,
+            )
+        finally:
+            cur.close()
+    else:
+        conn.execute(_upsert_stmt(table), [{f: r.get(f) for f in fields} for r in rows])
+
+def _copy_upsert(conn, table, fields, conflict, rows):
+    # COPY can't resolve conflicts, so rows are copied into a temp table
+    # (dropped at commit) and moved over with the usual conflict clause
+    cols = ", ".join(fields)
+    stage = f"copy_{table}"
+    buf = io.StringIO()
+    w = csv.writer(buf)
+    for r in rows:
+        w.writerow(["\\N" if r.get(f) is None else r.get(f) for f in fields])
+    buf.seek(0)
+    cur = conn.connection.dbapi_connection.cursor()
+    try:
+        cur.execute(f"CREATE TEMP TABLE IF NOT EXISTS {stage} (LIKE {table} INCLUDING DEFAULTS) ON COMMIT DROP")
+        cur.copy_expert(f"COPY {stage} ({cols}) FROM STDIN WITH (FORMAT csv, NULL '\\N')", buf)
+        cur.execute(f"INSERT INTO {table} ({cols}) SELECT {cols} FROM {stage} {conflict}")
+        cur.execute(f"TRUNCATE {stage}")
+    finally:
+        cur.close()
+
 def upsert_bill(conn, bill):
     # bill is a dict with our normalized schema fields
-    fields = [
-        "bill_uid","source","jurisdiction","session","bill_number","title","summary",
-        "subjects","sponsors_primary","committees","status_general","status_specific",
-        "introduced_date","effective_date","last_action_date","updated_at"
-    ]
-    placeholders = ", ".join([f":{f}" for f in fields])
-    updates = ", ".join([f"{f}=:{f}" for f in fields[1:]])
-    sql = text(f"""
-        INSERT INTO bills ({", ".join(fields)})
-        VALUES ({placeholders})
-        ON CONFLICT(bill_uid) DO UPDATE SET {updates}
-    """)
-    conn.execute(sql, bill)
+    conn.execute(_upsert_stmt("bills"), {f: bill.get(f) for f in BILL_FIELDS})
 
 def upsert_action(conn, action):
     # id is a content hash for idempotency
-    fields = ["id","bill_uid","action_date","organization","classification","action_text"]
-    sql = text(f"""
-        INSERT INTO actions ({", ".join(fields)})
-        VALUES (:{fields[0]}, :{fields[1]}, :{fields[2]}, :{fields[3]}, :{fields[4]}, :{fields[5]})
-        ON CONFLICT(id) DO NOTHING
-    """)
-    conn.execute(sql, action)
+    conn.execute(_upsert_stmt("actions"), action)
 
 def set_labels(conn, labels):
-    fields = ["bill_uid","topic_labels","client_vertical","impact_score"]
-    updates = ", ".join([f"{f}=:{f}" for f in fields[1:]])
-    sql = text(f"""
-        INSERT INTO labels ({", ".join(fields)})
-        VALUES (:{fields[0]}, :{fields[1]}, :{fields[2]}, :{fields[3]})
-        ON CONFLICT(bill_uid) DO UPDATE SET {updates}
-    """)
-    conn.execute(sql, labels)
+    conn.execute(_upsert_stmt("labels"), labels)
+
+_COUNTED_SQL = text("SELECT jurisdiction, status_general FROM bills WHERE bill_uid IN :uids") \
+    .bindparams(bindparam("uids", expanding=True))
+
+def bulk_upsert_bills(conn, bills):
+    """Upsert bill rows and move their state/status counts in facet_counts
+    from the stored values to the new ones."""
+    if not bills:
+        return
+    latest = {b["bill_uid"]: b for b in bills}
+    uids = list(latest)
+    delta = Counter()
+    for i in range(0, len(uids), BULK_PAGE_SIZE):
+        for r in conn.execute(_COUNTED_SQL, {"uids": uids[i:i + BULK_PAGE_SIZE]}).mappings():
+            for kind, col in COUNTED_COLUMNS.items():
+                if r[col]:
+                    delta[(kind, r[col])] -= 1
+    for b in latest.values():
+        for kind, col in COUNTED_COLUMNS.items():
+            if b.get(col):
+                delta[(kind, b[col])] += 1
+    bulk_upsert(conn, "bills", bills)
+    apply_facet_deltas(conn, delta)
+
+def bulk_upsert_actions(conn, actions):
+    bulk_upsert(conn, "actions", actions)
+
+def bulk_set_labels(conn, labels):
+    bulk_upsert(conn, "labels", labels)
+
+KNOWN_SQL = text("SELECT bill_uid, status_general, fingerprint, status_state FROM bills WHERE bill_uid IN :uids").bindparams(bindparam("uids", expanding=True))
+
+def fetch_known_bills(conn, bill_uids):
+    """{bill_uid: row} with status_general, fingerprint and status_state for
+    bills we already have, one IN (...) per chunk."""
+    uids = list(dict.fromkeys(bill_uids))
+    found = {}
+    for i in range(0, len(uids), BULK_PAGE_SIZE):
+        for r in conn.execute(KNOWN_SQL, {"uids": uids[i:i + BULK_PAGE_SIZE]}):
+            found[r.bill_uid] = r
+    return found
+
+def bump_data_version(conn, name="bills"):
+    conn.execute(text("""
+        INSERT INTO data_version (name, version, bumped_at) VALUES (:n, 1, :t)
+        ON CONFLICT(name) DO UPDATE SET version=data_version.version+1, bumped_at=excluded.bumped_at
+    """), {"n": name, "t": datetime.now(timezone.utc).isoformat()})
+
+def get_data_version(conn, name="bills"):
+    return conn.execute(text("SELECT version FROM data_version WHERE name=:n"), {"n": name}).scalar()
+
+# bill column (or labels.topic_labels) -> facet kind, all comma-joined lists
+FACET_SOURCES = {"topic": "topic_labels", "subject": "subjects", "committee": "committees", "sponsor": "sponsors_primary"}
+BILL_FACET_KINDS = ("subject", "committee", "sponsor")
+
+def facet_id(kind: str, value: str) -> str:
+    return hashlib.sha256(f"{kind}|{value}".encode("utf-8")).hexdigest()[:16]
+
+def facet_values(joined) -> list:
+    return list(dict.fromkeys(v.strip() for v in (joined or "").split(",") if v.strip()))
+
+_CLEAR_FACETS_SQL = text("""
+    DELETE FROM bill_facets
+    WHERE bill_uid IN :uids AND facet_id IN (SELECT id FROM facets WHERE kind IN :kinds)
+""").bindparams(bindparam("uids", expanding=True), bindparam("kinds", expanding=True))
+
+_OLD_FACETS_SQL = text("""
+    SELECT f.kind, f.value FROM bill_facets bf JOIN facets f ON f.id=bf.facet_id
+    WHERE bf.bill_uid IN :uids AND f.kind IN :kinds
+""").bindparams(bindparam("uids", expanding=True), bindparam("kinds", expanding=True))
+
+def bulk_set_facets(conn, rows, kinds):
+    """Replace the `kinds` facets of the bills in `rows` (dicts holding
+    bill_uid plus the FACET_SOURCES columns for those kinds), moving their
+    facet_counts along. Returns the number of links written."""
+    if not rows:
+        return 0
+    uids = list(dict.fromkeys(r["bill_uid"] for r in rows))
+    delta = Counter()
+    for i in range(0, len(uids), BULK_PAGE_SIZE):
+        chunk = {"uids": uids[i:i + BULK_PAGE_SIZE], "kinds": list(kinds)}
+        for kind, value in conn.execute(_OLD_FACETS_SQL, chunk):
+            delta[(kind, value)] -= 1
+        conn.execute(_CLEAR_FACETS_SQL, chunk)
+    facets, links = {}, {}
+    for r in rows:
+        for kind in kinds:
+            for value in facet_values(r.get(FACET_SOURCES[kind])):
+                fid = facet_id(kind, value)
+                facets[fid] = {"id": fid, "kind": kind, "value": value}
+                links[(fid, r["bill_uid"])] = (kind, value)
+    for kv in links.values():
+        delta[kv] += 1
+    bulk_upsert(conn, "facets", list(facets.values()))
+    bulk_upsert(conn, "bill_facets", [{"facet_id": fid, "bill_uid": uid} for fid, uid in links])
+    apply_facet_deltas(conn, delta)
+    return len(links)
+
+# facet_counts kinds counted straight from a bills column
+COUNTED_COLUMNS = {"state": "jurisdiction", "status": "status_general"}
+
+_FACET_DELTA_SQL = text("""
+    INSERT INTO facet_counts (kind, value, bills, refreshed_at) VALUES (:kind, :value, :delta, :t)
+    ON CONFLICT(kind, value) DO UPDATE SET bills=facet_counts.bills+excluded.bills, refreshed_at=excluded.refreshed_at
+""")
+_FACET_PRUNE_SQL = text("DELETE FROM facet_counts WHERE kind=:kind AND value=:value AND bills <= 0")
+
+def apply_facet_deltas(conn, delta):
+    """Add {(kind, value): change in bills} to facet_counts, in the writer's
+    transaction, so counts track every write without re-aggregating."""
+    changed = sorted((kv, d) for kv, d in delta.items() if d)  # one lock order for concurrent writers
+    if not changed:
+        return
+    t = datetime.now(timezone.utc).isoformat()
+    conn.execute(_FACET_DELTA_SQL, [{"kind": k, "value": v, "delta": d, "t": t} for (k, v), d in changed])
+    gone = [{"kind": k, "value": v} for (k, v), d in changed if d < 0]
+    if gone:
+        conn.execute(_FACET_PRUNE_SQL, gone)
+
+def refresh_facet_counts(conn):
+    """Rebuild facet_counts from scratch: bills per facet value, plus per
+    state and status. Writes keep the counts current on their own; this is
+    for facet backfills and repairs."""
+    t = datetime.now(timezone.utc).isoformat()
+    conn.execute(text("DELETE FROM facet_counts"))
+    conn.execute(text("""
+        INSERT INTO facet_counts (kind, value, bills, refreshed_at)
+        SELECT f.kind, f.value, COUNT(*), :t FROM bill_facets bf JOIN facets f ON f.id=bf.facet_id
+        GROUP BY f.kind, f.value
+    """), {"t": t})
+    for kind, col in COUNTED_COLUMNS.items():
+        conn.execute(text(f"""
+            INSERT INTO facet_counts (kind, value, bills, refreshed_at)
+            SELECT '{kind}', {col}, COUNT(*), :t FROM bills WHERE {col} IS NOT NULL AND {col} <> ''
+            GROUP BY {col}
+        """), {"t": t})
+    bump_data_version(conn)
+
+def backfill_facets(conn, chunk=BULK_PAGE_SIZE * 10) -> int:
+    """Fill bill_facets from the stored comma-joined columns for every bill
+    that has no facet rows yet, so an interrupted backfill is completed on
+    the next migrate(). Returns the number of bills that got facets."""
+    done, after = 0, ""
+    while True:
+        rows = conn.execute(text("""
+            SELECT b.bill_uid, b.subjects, b.committees, b.sponsors_primary, l.topic_labels
+            FROM bills b LEFT JOIN labels l ON l.bill_uid=b.bill_uid
+            WHERE b.bill_uid > :after
+              AND NOT EXISTS (SELECT 1 FROM bill_facets bf WHERE bf.bill_uid=b.bill_uid)
+            ORDER BY b.bill_uid LIMIT :lim
+        """), {"after": after, "lim": chunk}).mappings().all()
+        if not rows:
+            break
+        bulk_set_facets(conn, rows, tuple(FACET_SOURCES))
+        done += sum(1 for r in rows if any(facet_values(r[col]) for col in FACET_SOURCES.values()))
+        after = rows[-1]["bill_uid"]
+    if done:
+        refresh_facet_counts(conn)
+    return done
+
+def collector_run_id(collector, started_at) -> str:
+    return hashlib.sha256(f"{collector}|{started_at}|{os.getpid()}".encode("utf-8")).hexdigest()[:32]
+
+def record_collector_run(conn, collector, started_at, seconds, status, summary, profile=None):
+    """Insert a collector_runs row; summary is metrics.run_summary(), profile
+    the directory a --profile run wrote to."""
+    started = datetime.fromtimestamp(started_at, timezone.utc)
+    conn.execute(text("""
+        INSERT INTO collector_runs (id, collector, started_at, finished_at, seconds, status, bills_new,
+                                    bills_changed, bills_skipped, news_new, alerts_queued, alerts_sent, stats,
+                                    profile)
+        VALUES (:id, :collector, :started_at, :finished_at, :seconds, :status, :bills_new,
+                :bills_changed, :bills_skipped, :news_new, :alerts_queued, :alerts_sent, :stats, :profile)
+    """), {
+        "id": collector_run_id(collector, started_at),
+        "collector": collector,
+        "started_at": started.isoformat(),
+        "finished_at": (started + timedelta(seconds=seconds)).isoformat(),
+        "seconds": round(seconds, 3),
+        "status": status,
+        "bills_new": summary["bills"]["new"],
+        "bills_changed": summary["bills"]["changed"],
+        "bills_skipped": summary["bills"]["skipped"],
+        "news_new": summary["news"]["new"],
+        "alerts_queued": summary["alerts"]["queued"],
+        "alerts_sent": summary["alerts"]["sent"],
+        "stats": json.dumps(summary, sort_keys=True),
+        "profile": profile,
+    })
+
+def load_schedule_state(conn) -> dict:
+    """{job: schedule_state row} for daemon.py."""
+    return {r["job"]: dict(r) for r in conn.execute(text("SELECT * FROM schedule_state")).mappings()}
+
+def record_job_run(conn, job, started_at, seconds, status, error=None, changes=None, poll=None):
+    """Upsert a job's schedule_state row after a run. `changes` is what the
+    run found (None for jobs that don't poll anything); `poll` is its
+    polling.PollState after the run."""
+    started = datetime.fromtimestamp(started_at, timezone.utc)
+    conn.execute(text("""
+        INSERT INTO schedule_state (job, last_started_at, last_finished_at, last_status, last_seconds, last_error,
+                                    runs, failures, interval_seconds, change_rate, changes_total, quiet_runs,
+                                    last_change_at)
+        VALUES (:job, :started_at, :finished_at, :status, :seconds, :error, 1, :failed, :interval, :rate,
+                :changes, :quiet_runs, :last_change_at)
+        ON CONFLICT(job) DO UPDATE SET
+          last_started_at=excluded.last_started_at, last_finished_at=excluded.last_finished_at,
+          last_status=excluded.last_status, last_seconds=excluded.last_seconds, last_error=excluded.last_error,
+          runs=schedule_state.runs + 1, failures=schedule_state.failures + excluded.failures,
+          interval_seconds=excluded.interval_seconds, change_rate=excluded.change_rate,
+          changes_total=schedule_state.changes_total + excluded.changes_total,
+          quiet_runs=excluded.quiet_runs, last_change_at=excluded.last_change_at
+    """), {
+        "job": job,
+        "started_at": started.isoformat(),
+        "finished_at": (started + timedelta(seconds=seconds)).isoformat(),
+        "status": status,
+        "seconds": round(seconds, 3),
+        "error": (error or "")[:500] or None,
+        "failed": 0 if status == "ok" else 1,
+        "changes": changes or 0,
+        "interval": poll.interval if poll else None,
+        "rate": poll.rate if poll else None,
+        "quiet_runs": poll.quiet_runs if poll else 0,
+        "last_change_at": datetime.fromtimestamp(poll.last_change, timezone.utc).isoformat()
+                          if poll and poll.last_change else None,
+    })
+
+def query_hash(q: str) -> str:
+    return hashlib.sha256((q or "").encode("utf-8")).hexdigest()[:16]
+
+def get_watermark(conn, source, jurisdiction, qhash):
+    return conn.execute(text("""
+        SELECT watermark FROM sync_state
+        WHERE source=:s AND jurisdiction=:j AND query_hash=:q
+    """), {"s": source, "j": jurisdiction, "q": qhash}).scalar()
+
+def set_watermark(conn, source, jurisdiction, qhash, watermark):
+    # Only ever moves forward, so a --since backfill can't rewind it
+    conn.execute(text("""
+        INSERT INTO sync_state (source, jurisdiction, query_hash, watermark, synced_at)
+        VALUES (:s, :j, :q, :w, :t)
+        ON CONFLICT(source, jurisdiction, query_hash) DO UPDATE SET
+          watermark=CASE WHEN sync_state.watermark IS NULL OR excluded.watermark > sync_state.watermark
+                         THEN excluded.watermark ELSE sync_state.watermark END,
+          synced_at=excluded.synced_at
+    """), {"s": source, "j": jurisdiction, "q": qhash, "w": watermark,
+           "t": datetime.now(timezone.utc).isoformat()})
+
+def clear_watermark(conn, source, jurisdiction, qhash):
+    conn.execute(text("""
+        DELETE FROM sync_state WHERE source=:s AND jurisdiction=:j AND query_hash=:q
+    """), {"s": source, "j": jurisdiction, "q": qhash})
+
+def sync_overrides(conn, source, jurisdictions, qhash):
+    """Per-jurisdiction updated_since params resumed from stored watermarks."""
+    overrides = {}
+    for j in jurisdictions:
+        since = resume_since(get_watermark(conn, source, j, qhash))
+        if since:
+            overrides[j] = {"updated_since": since}
+    return overrides
+
+def resume_since(watermark, overlap_minutes=SYNC_OVERLAP_MINUTES):
+    """Turn a stored watermark into an updated_since value, or None."""
+    if not watermark:
+        return None
+    try:
+        wm = datetime.fromisoformat(watermark)
+    except ValueError:
+        return None
+    if wm.tzinfo is not None:
+        wm = wm.astimezone(timezone.utc).replace(tzinfo=None)
+    return (wm - timedelta(minutes=overlap_minutes)).strftime("%Y-%m-%dT%H:%M:%S")
 
 if __name__ == "__main__":
     import sys
@@ -1,15 +1,13 @@
-import os
 from datetime import date, timedelta
-from sqlalchemy import create_engine, text
+from sqlalchemy import text
 from dotenv import load_dotenv
 from alerts import send_slack
+from db import get_engine
 
 load_dotenv()
 
-DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///policy_radar.db")
-
 def main(window_days: int = 7):
-    eng = create_engine(DATABASE_URL, future=True)
+    eng = get_engine("reader")
     today = date.today()
     start = (today - timedelta(days=window_days)).isoformat()
     end = (today + timedelta(days=0)).isoformat()
@@ -0,0 +1,234 @@
+import os, io, csv, json, argparse, sqlite3, tempfile, time, zipfile
+from contextlib import ExitStack
+from dotenv import load_dotenv
+from db import get_engine
+from ingest import select_changed, prepare_bills, write_prepared
+
+# Seed or rebuild the database from a local Open States bulk dump: a zip,
+# a directory, or single files. Records are read a batch at a time and go
+# through the same select_changed/prepare_bills/write_prepared steps as the
+# collectors, in one transaction. Postgres loads through COPY; SQLite uses
+# batched executemany. No network, no API quota, no alerts.
+#
+# Accepted inputs:
+#   *.json            one bill, a list of bills, or an API page ({"results": [...]})
+#   *.ndjson/*.jsonl  one bill per line
+#   *bills.csv        with *bill_actions.csv, *bill_sponsorships.csv and
+#                     *bill_abstracts.csv alongside (the CSV export layout)
+# Bills keep their Open States ids, so imported rows and later API syncs
+# address the same bill_uid.
+
+load_dotenv()
+
+IMPORT_BATCH = int(os.getenv("IMPORT_BATCH", "2000"))
+
+CSV_CHILDREN = {"bill_actions.csv": "actions", "bill_sponsorships.csv": "sponsorships",
+                "bill_abstracts.csv": "abstracts"}
+
+def _members(paths, stack):
+    """(name, open) for every file under `paths`; zips are read in place and
+    stay open until `stack` (an ExitStack) closes, since bills files are
+    only opened after every other member has been read."""
+    for path in paths:
+        if os.path.isdir(path):
+            for root, _, files in os.walk(path):
+                for f in sorted(files):
+                    full = os.path.join(root, f)
+                    yield from _members([full], stack) if f.endswith(".zip") else [(full, lambda p=full: open(p, "rb"))]
+        elif path.endswith(".zip"):
+            z = stack.enter_context(zipfile.ZipFile(path))
+            for info in z.infolist():
+                if not info.is_dir():
+                    yield f"{path}:{info.filename}", lambda n=info.filename, z=z: z.open(n)
+        else:
+            yield path, lambda p=path: open(p, "rb")
+
+def _text(fh):
+    return io.TextIOWrapper(fh, encoding="utf-8-sig", newline="")
+
+def _csv_list(v):
+    # Postgres array literal ({a,"b c"}), JSON list, or a plain ;-joined string
+    v = (v or "").strip()
+    if not v:
+        return []
+    if v.startswith("[") and v.endswith("]"):
+        return json.loads(v)
+    if v.startswith("{") and v.endswith("}"):
+        return [x for x in next(csv.reader([v[1:-1]], skipinitialspace=True), []) if x and x != "NULL"]
+    return [x.strip() for x in v.split(";") if x.strip()]
+
+def _truthy(v):
+    return str(v).strip().lower() in ("t", "true", "1", "yes")
+
+def api_shape(b, jurisdiction=None):
+    """Map a dump record onto the /bills payload fields normalize reads.
+    Records already shaped like the API pass through unchanged."""
+    juris = b.get("jurisdiction")
+    if isinstance(juris, dict) and b.get("from_session") is not None:
+        return b
+    out = dict(b)
+    out["jurisdiction"] = juris if isinstance(juris, dict) else {"name": juris or b.get("jurisdiction_name") or jurisdiction}
+    out["from_session"] = b.get("from_session") or b.get("session") or b.get("legislative_session") or b.get("session_identifier")
+    if not out.get("summary") and b.get("abstracts"):
+        out["summary"] = b["abstracts"][0].get("abstract")
+    out["actions"] = [dict(a, organization=a.get("organization") if isinstance(a.get("organization"), dict)
+                           else {"name": a.get("organization") or a.get("organization_name") or ""})
+                      for a in b.get("actions") or []]
+    return out
+
+def iter_json(name, open_member, jurisdiction):
+    with open_member() as fh:
+        if name.endswith((".ndjson", ".jsonl")):
+            for line in _text(fh):
+                b = json.loads(line) if line.strip() else None
+                if b and b.get("id"):
+                    yield api_shape(b, jurisdiction)
+            return
+        doc = json.load(_text(fh))  # one file at a time; big dumps are per-bill files or NDJSON
+    records = doc.get("results", [doc]) if isinstance(doc, dict) else doc
+    for b in records:
+        if isinstance(b, dict) and b.get("id"):
+            yield api_shape(b, jurisdiction)
+
+class CsvChildren:
+    """Actions/sponsorships/abstracts rows spooled to a temporary SQLite file
+    keyed by bill_id, so bills.csv can stream while their children are looked
+    up a batch at a time instead of held in memory."""
+
+    def __init__(self):
+        self._dir = tempfile.TemporaryDirectory(prefix="import_dump_")
+        self.db = sqlite3.connect(os.path.join(self._dir.name, "children.db"))
+        self.db.execute("PRAGMA journal_mode=OFF")
+        self.db.execute("PRAGMA synchronous=OFF")
+        self.db.execute("CREATE TABLE children (bill_id TEXT, kind TEXT, ord INTEGER, data TEXT)")
+
+    def load(self, kind, open_member):
+        with open_member() as fh:
+            batch = []
+            for row in csv.DictReader(_text(fh)):
+                batch.append((row.get("bill_id"), kind, int(row.get("order") or 0), json.dumps(row)))
+                if len(batch) >= IMPORT_BATCH:
+                    self.db.executemany("INSERT INTO children VALUES (?,?,?,?)", batch)
+                    batch = []
+            self.db.executemany("INSERT INTO children VALUES (?,?,?,?)", batch)
+
+    def index(self):
+        self.db.execute("CREATE INDEX children_bill ON children (bill_id, kind, ord)")
+        self.db.commit()
+
+    def lookup(self, bill_ids):
+        out = {}
+        for i in range(0, len(bill_ids), 900):  # under SQLite's default variable limit
+            chunk = bill_ids[i:i + 900]
+            for bill_id, kind, data in self.db.execute(
+                    f"SELECT bill_id, kind, data FROM children WHERE bill_id IN ({','.join('?' * len(chunk))}) "
+                    f"ORDER BY bill_id, kind, ord, rowid", chunk):
+                out.setdefault(bill_id, {}).setdefault(kind, []).append(json.loads(data))
+        return out
+
+    def close(self):
+        self.db.close()
+        self._dir.cleanup()
+
+def csv_bill(row, kids, jurisdiction):
+    actions = [{"date": a.get("date"), "description": a.get("description"),
+                "classification": _csv_list(a.get("classification")),
+                "organization": {"name": a.get("organization") or a.get("organization_name")
+                                 or a.get("organization_classification") or ""}}
+               for a in kids.get("actions", [])]
+    sponsors = [{"name": s.get("name"), "primary": _truthy(s.get("primary"))} for s in kids.get("sponsorships", [])]
+    abstracts = [a.get("abstract") for a in kids.get("abstracts", []) if a.get("abstract")]
+    return {
+        "id": row["id"],
+        "jurisdiction": {"name": row.get("jurisdiction") or row.get("jurisdiction_name") or jurisdiction},
+        "from_session": row.get("session_identifier") or row.get("legislative_session") or row.get("session"),
+        "identifier": row.get("identifier"),
+        "title": row.get("title"),
+        "summary": abstracts[0] if abstracts else None,
+        "classification": _csv_list(row.get("classification")),
+        "subject": _csv_list(row.get("subject")),
+        "sponsorships": sponsors,
+        "actions": actions,
+        "first_action_date": row.get("first_action_date") or None,
+        "latest_action_date": row.get("latest_action_date") or None,
+        "updated_at": row.get("updated_at") or None,
+    }
+
+def iter_csv(bills_members, children, jurisdiction):
+    for _, open_member in bills_members:
+        with open_member() as fh:
+            rows = []
+            for row in csv.DictReader(_text(fh)):
+                rows.append(row)
+                if len(rows) >= IMPORT_BATCH:
+                    yield from _attach(rows, children, jurisdiction)
+                    rows = []
+            yield from _attach(rows, children, jurisdiction)
+
+def _attach(rows, children, jurisdiction):
+    kids = children.lookup([r["id"] for r in rows])
+    for r in rows:
+        yield csv_bill(r, kids.get(r["id"], {}), jurisdiction)
+
+def iter_records(paths, jurisdiction=None):
+    """Every bill in the dump(s), API-shaped, read lazily. CSV child tables
+    are spooled first; bills files and JSON are then streamed."""
+    bills_csv, children = [], None
+    with ExitStack() as zips:
+        try:
+            for name, open_member in _members(paths, zips):
+                base = os.path.basename(name).lower()
+                if base.endswith((".json", ".ndjson", ".jsonl")):
+                    yield from iter_json(base, open_member, jurisdiction)
+                elif base.endswith("bills.csv"):
+                    bills_csv.append((name, open_member))
+                else:
+                    kind = next((k for suffix, k in CSV_CHILDREN.items() if base.endswith(suffix)), None)
+                    if kind:
+                        children = children or CsvChildren()
+                        children.load(kind, open_member)
+            if bills_csv:
+                children = children or CsvChildren()
+                children.index()
+                yield from iter_csv(bills_csv, children, jurisdiction)
+        finally:
+            if children is not None:
+                children.close()
+
+def batches(records, size):
+    batch = []
+    for r in records:
+        batch.append(r)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+def main():
+    parser = argparse.ArgumentParser(description="Import Open States bulk dumps (zip, CSV, JSON) without the API")
+    parser.add_argument("paths", nargs="+", help="Dump zip(s), directories or files")
+    parser.add_argument("--jurisdiction", help="Jurisdiction name for records that don't carry one")
+    parser.add_argument("--batch", type=int, default=IMPORT_BATCH, help="Bills per bulk write")
+    parser.add_argument("--no-labels", action="store_true", help="Skip topic labeling")
+    args = parser.parse_args()
+
+    engine = get_engine()
+    started = time.monotonic()
+    totals = {"new": 0, "changed": 0, "skipped": 0}
+    with engine.begin() as conn:
+        conn.execution_options(bulk_copy=True)
+        for batch in batches(iter_records(args.paths, args.jurisdiction), max(1, args.batch)):
+            todo, known, counts = select_changed(conn, batch, not args.no_labels)
+            write_prepared(conn, prepare_bills(todo, with_labels=not args.no_labels), known)
+            for k, v in counts.items():
+                totals[k] += v
+            done = sum(totals.values())
+            print(f"{done} bills read ({totals['new']} new, {totals['changed']} changed)", flush=True)
+    elapsed = max(time.monotonic() - started, 1e-9)
+    done = sum(totals.values())
+    print(f"Import complete: {done} bills ({totals['new']} new, {totals['changed']} changed, "
+          f"{totals['skipped']} unchanged) in {elapsed:.1f}s: {done / elapsed:.0f} bills/s")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+import hashlib
+from db import fetch_known_bills, bulk_upsert_bills, bulk_upsert_actions, bulk_set_labels, bulk_set_facets, BILL_FACET_KINDS, bump_data_version
+from normalize import normalize_openstates_bill, openstates_bill_uid, payload_fingerprint
+from classify import label_record, taxonomy_version
+from search import index_bills, search_row
+from metrics import inc, stage
+
+def hash_action(bill_uid, a):
+    s = f"{bill_uid}|{a.get('action_date')}|{a.get('organization')}|{','.join(a.get('classification',[]))}|{a.get('action_text')}"
+    return hashlib.sha256(s.encode("utf-8")).hexdigest()
+
+def action_row(bill_uid, a):
+    return {
+        "id": hash_action(bill_uid, a),
+        "bill_uid": bill_uid,
+        "action_date": a.get("action_date"),
+        "organization": a.get("organization"),
+        "classification": ",".join(a.get("classification", [])),
+        "action_text": a.get("action_text"),
+    }
+
+def label_row(bill):
+    labels = label_record(" ".join([bill.get("title") or "", bill.get("summary") or ""]))
+    topics = [k for k,v in labels.items() if v]
+    return {
+        "bill_uid": bill["bill_uid"],
+        "topic_labels": ",".join(topics),
+        "client_vertical": "property_mgmt,healthcare" if ("housing" in topics or "healthcare" in topics) else "",
+        "impact_score": 50 if ("ai" in topics or "privacy" in topics) else 20
+    }
+
+def select_changed(conn, results, with_labels=True):
+    """Split a page of OpenStates payloads into bills to (re)write and bills
+    whose payload fingerprint matches the stored one. Returns (todo, known,
+    counts): todo is [(payload, fingerprint, stored status_state)], known the
+    fetch_known_bills rows, counts tallies new/changed/skipped.
+
+    Labelled writes store the fingerprint with the taxonomy version it was
+    labelled at ("<payload>:<version>"), and only skip a bill stored that
+    way, so bills first written unlabelled (collector_plugins, the daemon)
+    or labelled before a topics.yml change get labelled on the next
+    labelled run. Unlabelled writes skip on the payload alone. A uid that
+    shows up more than once in `results` is counted once, at its last
+    payload."""
+    counts = {"new": 0, "changed": 0, "skipped": 0}
+    with stage("select_changed"):
+        latest = {openstates_bill_uid(b): b for b in results}
+        known = fetch_known_bills(conn, list(latest))
+        suffix = f":{taxonomy_version()}" if with_labels else ""
+        todo = []
+        for uid, b in latest.items():
+            fp = payload_fingerprint(b)
+            row = known.get(uid)
+            stored = (row.fingerprint or "") if row is not None else None
+            if stored is not None and (stored == fp + suffix or (not with_labels and stored.split(":")[0] == fp)):
+                counts["skipped"] += 1
+                continue
+            counts["changed" if row is not None else "new"] += 1
+            todo.append((b, fp + suffix, row.status_state if row is not None else None))
+    for k, v in counts.items():
+        if v:
+            inc("bills_total", v, result=k)
+    return todo, known, counts
+
+def prepare_bills(todo, normalizer=normalize_openstates_bill, with_labels=True):
+    """Normalize/label/derive every row to write, touching no database, so
+    it can run in a worker process. Returns a dict of row lists for
+    write_prepared."""
+    packs = []
+    with stage("normalize"):
+        for b, fp, status_state in todo:
+            # status resumes from the stored state over just the appended actions
+            pack = normalizer(b, status_state=status_state)
+            pack["bill"]["fingerprint"] = fp
+            packs.append(pack)
+        bills = [p["bill"] for p in packs]
+        actions = [action_row(p["bill"]["bill_uid"], a) for p in packs for a in p["actions"]]
+        search = [search_row(p["bill"], [a.get("action_text") for a in p["actions"]]) for p in packs]
+    labels = None
+    if with_labels:
+        with stage("label"):
+            labels = [label_row(b) for b in bills]
+    return {"bills": bills, "actions": actions, "search": search, "labels": labels}
+
+def write_prepared(conn, prepared, known):
+    """Bulk-write the output of prepare_bills. Returns [(bill, old_status)]
+    for every bill whose status_general changed."""
+    bills = prepared["bills"]
+    with stage("db_write"):
+        bulk_upsert_bills(conn, bills)
+        bulk_upsert_actions(conn, prepared["actions"])
+        bulk_set_facets(conn, bills, BILL_FACET_KINDS)
+        index_bills(conn, prepared["search"])
+        if prepared["labels"] is not None:
+            bulk_set_labels(conn, prepared["labels"])
+            bulk_set_facets(conn, prepared["labels"], ("topic",))
+        if bills:
+            bump_data_version(conn)
+
+    changes = []
+    for bill in bills:
+        new_status = bill["status_general"]
+        old_status = known[bill["bill_uid"]].status_general if bill["bill_uid"] in known else None
+        if new_status and new_status != (old_status or ""):
+            changes.append((bill, old_status))
+    return changes
+
+def write_openstates_page(conn, results, normalizer=normalize_openstates_bill, with_labels=True):
+    """Normalize and write one page of OpenStates bills with bulk statements.
+
+    Bills whose payload fingerprint matches the stored one (and, with
+    labels, were labelled at the current taxonomy) are skipped before
+    normalize/classify/write. Returns (changes, counts): changes is
+    [(bill, old_status)] for every bill whose status_general changed
+    (old_status is None for bills we had never seen), counts tallies
+    new/changed/skipped bills.
+    """
+    todo, known, counts = select_changed(conn, results, with_labels)
+    changes = write_prepared(conn, prepare_bills(todo, normalizer, with_labels), known)
+    return changes, counts
@@ -0,0 +1,307 @@
+import os, time, threading, contextvars
+from bisect import bisect_left
+from contextlib import nullcontext
+from functools import partial
+from urllib.parse import urlparse
+
+# Process-local counters and latency histograms for the ingest pipeline and
+# serve.py, rendered in Prometheus text format. Collectors save each run's
+# totals to collector_runs (see CollectorRun); serve.py's /metrics reports
+# those next to its own request latencies. METRICS=0 turns every call here
+# into a no-op. Inside a CollectorRun(scoped=True) everything is also
+# recorded in a run-local registry, so runs sharing the process (daemon.py
+# jobs) each get their own totals.
+
+METRICS_ENABLED = os.getenv("METRICS", "1") != "0"
+PREFIX = "policy_radar_"
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 300.0, 3600.0)
+
+HELP = {
+    "http_client_request_seconds": "Outgoing HTTP request latency by host",
+    "http_client_responses_total": "Outgoing HTTP responses by host and status code",
+    "http_server_request_seconds": "serve.py handler latency by route",
+    "http_server_responses_total": "serve.py responses by route and status code",
+    "stage_seconds": "Time spent in each pipeline stage",
+    "bills_total": "OpenStates bills seen, by result (new, changed, skipped)",
+    "news_items_total": "RSS/HTTP items seen, by kind and result (new, seen)",
+    "alerts_queued_total": "Alerts queued in the outbox, by kind",
+    "alerts_sent_total": "Alerts delivered to Slack",
+    "alerts_failed_total": "Alerts whose Slack send failed",
+    "alert_latency_seconds": "Time from queueing an alert to its delivery",
+    "job_runs_total": "daemon.py job runs, by kind and status",
+    "job_run_seconds": "daemon.py job run time, by kind",
+}
+
+_NOOP = nullcontext()
+_scope = contextvars.ContextVar("metrics_scope", default=None)  # run-local Registry, if any
+
+def host_of(url: str) -> str:
+    return urlparse(url).netloc.lower() or "unknown"
+
+def _key(labels):
+    return tuple(sorted(labels.items()))
+
+class Histogram:
+    __slots__ = ("counts", "sum", "count")
+
+    def __init__(self):
+        self.counts = [0] * (len(LATENCY_BUCKETS) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, v: float):
+        self.counts[bisect_left(LATENCY_BUCKETS, v)] += 1
+        self.sum += v
+        self.count += 1
+
+class _Timer:
+    __slots__ = ("registry", "name", "labels", "t0")
+
+    def __init__(self, registry, name, labels):
+        self.registry = registry
+        self.name = name
+        self.labels = labels
+
+    def __enter__(self):
+        self.t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.registry.observe(self.name, time.perf_counter() - self.t0, **self.labels)
+        return False
+
+class Registry:
+    def __init__(self, enabled: bool = METRICS_ENABLED):
+        self.enabled = enabled
+        self._lock = threading.Lock()  # fetch threads record concurrently
+        self._counters = {}    # (name, labels) -> float
+        self._histograms = {}  # (name, labels) -> Histogram
+
+    def inc(self, name: str, value: float = 1, **labels):
+        if not self.enabled:
+            return
+        k = (name, _key(labels))
+        with self._lock:
+            self._counters[k] = self._counters.get(k, 0) + value
+        local = _scope.get()
+        if local is not None and local is not self:
+            local.inc(name, value, **labels)
+
+    def observe(self, name: str, seconds: float, **labels):
+        if not self.enabled:
+            return
+        k = (name, _key(labels))
+        with self._lock:
+            h = self._histograms.get(k)
+            if h is None:
+                h = self._histograms[k] = Histogram()
+            h.observe(seconds)
+        local = _scope.get()
+        if local is not None and local is not self:
+            local.observe(name, seconds, **labels)
+
+    def timer(self, name: str, **labels):
+        return _Timer(self, name, labels) if self.enabled else _NOOP
+
+    def snapshot(self) -> dict:
+        """Copy of every counter and histogram: {"counters": {key: value},
+        "histograms": {key: (bucket counts, sum, count)}}."""
+        with self._lock:
+            return {"counters": dict(self._counters),
+                    "histograms": {k: (list(h.counts), h.sum, h.count) for k, h in self._histograms.items()}}
+
+    def render(self) -> str:
+        snap = self.snapshot()
+        out = []
+        for name, samples in _group(snap["counters"]).items():
+            out.append(format_metric(name, "counter", samples))
+        for name, hists in _group(snap["histograms"]).items():
+            out.append(format_histogram(name, hists))
+        return "".join(out)
+
+REGISTRY = Registry()
+inc = REGISTRY.inc
+observe = REGISTRY.observe
+timer = REGISTRY.timer
+
+def in_scope(fn):
+    """`fn` bound to a copy of the caller's context, for submitting to a
+    worker thread: threads don't inherit context variables, so a scoped
+    CollectorRun would otherwise miss what its fetch threads record."""
+    return partial(contextvars.copy_context().run, fn)
+
+def stage(name: str):
+    """Time a pipeline stage: `with stage("normalize"): ...`"""
+    return REGISTRY.timer("stage_seconds", stage=name)
+
+def timed_iter(iterable, stage_name: str):
+    """Yield from `iterable`, timing each wait for the next item as a stage
+    (e.g. the fetch side of a fetch-then-write loop)."""
+    if not REGISTRY.enabled:
+        yield from iterable
+        return
+    it = iter(iterable)
+    while True:
+        t0 = time.perf_counter()
+        try:
+            item = next(it)
+        except StopIteration:
+            REGISTRY.observe("stage_seconds", time.perf_counter() - t0, stage=stage_name)
+            return
+        REGISTRY.observe("stage_seconds", time.perf_counter() - t0, stage=stage_name)
+        yield item
+
+# ---- Prometheus text format ----
+
+def _group(samples: dict) -> dict:
+    by_name = {}
+    for (name, labels), v in samples.items():
+        by_name.setdefault(name, []).append((dict(labels), v))
+    return by_name
+
+def _escape(v) -> str:
+    return str(v).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _labels(labels: dict) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in labels.items()) + "}"
+
+def _num(v) -> str:
+    return repr(float(v)) if isinstance(v, float) else str(v)
+
+def format_metric(name: str, kind: str, samples, help_text: str = None) -> str:
+    """Lines for one counter/gauge: samples is [(labels dict, value)]."""
+    full = PREFIX + name
+    lines = [f"# HELP {full} {help_text or HELP.get(name, name)}", f"# TYPE {full} {kind}"]
+    lines += [f"{full}{_labels(labels)} {_num(v)}" for labels, v in samples]
+    return "\n".join(lines) + "\n"
+
+def format_histogram(name: str, hists) -> str:
+    """hists is [(labels dict, (bucket counts, sum, count))]."""
+    full = PREFIX + name
+    lines = [f"# HELP {full} {HELP.get(name, name)}", f"# TYPE {full} histogram"]
+    for labels, (counts, total, count) in hists:
+        running = 0
+        for bound, c in zip(LATENCY_BUCKETS + ("+Inf",), counts):
+            running += c
+            lines.append(f"{full}_bucket{_labels(dict(labels, le=bound))} {running}")
+        lines.append(f"{full}_sum{_labels(labels)} {_num(total)}")
+        lines.append(f"{full}_count{_labels(labels)} {count}")
+    return "\n".join(lines) + "\n"
+
+# ---- per-run summaries ----
+
+def run_summary(before: dict, after: dict, seconds: float) -> dict:
+    """What changed in the registry between two snapshots, in the shape
+    stored in collector_runs.stats."""
+    counters = {}
+    for k, v in after["counters"].items():
+        d = v - before["counters"].get(k, 0)
+        if d:
+            counters[k] = d
+    stages, hosts, alert_latency = {}, {}, None
+    for (name, labels), (counts, total, count) in after["histograms"].items():
+        prev = before["histograms"].get((name, labels))
+        if prev:
+            counts = [a - b for a, b in zip(counts, prev[0])]
+            total, count = total - prev[1], count - prev[2]
+        if not count:
+            continue
+        lab = dict(labels)
+        entry = {"count": count, "seconds": round(total, 6), "p95_seconds": _quantile(counts, count, 0.95)}
+        if name == "stage_seconds":
+            stages[lab["stage"]] = entry
+        elif name == "http_client_request_seconds":
+            hosts[lab["host"]] = entry
+        elif name == "alert_latency_seconds":
+            alert_latency = entry
+
+    def total_of(name, **match):
+        return sum(v for (n, labels), v in counters.items()
+                   if n == name and all(dict(labels).get(k) == m for k, m in match.items()))
+
+    bills = total_of("bills_total")
+    written = total_of("bills_total", result="new") + total_of("bills_total", result="changed")
+    write_seconds = stages.get("db_write", {}).get("seconds")
+    return {
+        "bills": {r: total_of("bills_total", result=r) for r in ("new", "changed", "skipped")},
+        "news": {r: total_of("news_items_total", result=r) for r in ("new", "seen")},
+        "alerts": {"queued": total_of("alerts_queued_total"), "sent": total_of("alerts_sent_total"),
+                   "failed": total_of("alerts_failed_total"), "latency": alert_latency},
+        "stages": stages,
+        "hosts": hosts,
+        "rates": {
+            "bills_per_second": round(bills / seconds, 2) if seconds else None,
+            "rows_written_per_second": round(written / write_seconds, 2) if write_seconds else None,
+        },
+    }
+
+def _quantile(counts, count, q):
+    # upper bound of the bucket holding the q-th observation
+    rank, seen = q * count, 0
+    for bound, c in zip(LATENCY_BUCKETS + (None,), counts):
+        seen += c
+        if seen >= rank:
+            return bound
+    return None
+
+class CollectorRun:
+    """Context manager around one collector run: on exit it saves the run's
+    timing and counters (a registry delta) as a collector_runs row, with
+    status "error" when the run raised. A no-op when metrics are off.
+
+    With profile=True the run is also profiled (see profiling.py) into
+    PROFILE_DIR/<collector>-<time>-<run id>/, recorded in the row's profile
+    column; profiling works with metrics off too.
+
+    With scoped=True the row holds only what this run recorded, in this
+    thread and in threads started with in_scope(), rather than the registry
+    delta, so runs may overlap in one process."""
+
+    def __init__(self, engine, collector: str, profile: bool = False, scoped: bool = False):
+        self.engine = engine
+        self.collector = collector
+        self.profile = profile
+        self.scoped = scoped
+        self.profile_dir = None
+        self.summary = None
+
+    def __enter__(self):
+        self.started_at = time.time()
+        if self.profile:
+            from db import collector_run_id
+            from profiling import PROFILE_DIR, Profiler
+            stamp = time.strftime("%Y%m%dT%H%M%S", time.gmtime(self.started_at))
+            self.profile_dir = os.path.join(PROFILE_DIR, f"{self.collector}-{stamp}-"
+                                            f"{collector_run_id(self.collector, self.started_at)[:8]}")
+            self._profiler = Profiler(self.profile_dir).start()
+        if REGISTRY.enabled:
+            self._t0 = time.perf_counter()
+            if self.scoped:
+                self._local = Registry()
+                self._token = _scope.set(self._local)
+                self._before = self._local.snapshot()
+            else:
+                self._before = REGISTRY.snapshot()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if self.profile:
+            self._profiler.stop()
+            print(self._profiler.write(), flush=True)
+        if not REGISTRY.enabled:
+            return False
+        from db import record_collector_run
+        seconds = time.perf_counter() - self._t0
+        if self.scoped:
+            _scope.reset(self._token)
+        self.summary = run_summary(self._before, (self._local if self.scoped else REGISTRY).snapshot(), seconds)
+        status = "ok" if exc_type is None else ("interrupted" if issubclass(exc_type, KeyboardInterrupt) else "error")
+        try:
+            with self.engine.begin() as conn:
+                record_collector_run(conn, self.collector, self.started_at, seconds, status, self.summary,
+                                     profile=self.profile_dir)
+        except Exception as e:
+            print(f"⚠️ Could not record collector run: {e}")
+        return False
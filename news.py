@@ -0,0 +1,99 @@
+import hashlib, re
+from datetime import datetime, timezone
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+from sqlalchemy import text
+from db import bump_data_version
+
+# RSS / HTTP items are kept in news_items, unique on (canonical_url,
+# content_hash), so an item is stored and alerted once, and again only if
+# its title/summary change.
+
+# Query parameters that only track the click, never select the content
+TRACKING_PARAMS = {"fbclid", "gclid", "dclid", "msclkid", "mc_cid", "mc_eid", "igshid", "ref", "ref_src"}
+_DEFAULT_PORTS = {"http": "80", "https": "443"}
+_WS = re.compile(r"\s+")
+
+NEWS_FIELDS = [
+    "id","source","jurisdiction","title","summary","url","canonical_url","content_hash",
+    "status","effective_date","topic_labels","first_seen"
+]
+
+def canonical_url(url: str) -> str:
+    """Lowercased scheme/host, no default port, fragment or tracking params,
+    query sorted, trailing slash dropped."""
+    url = (url or "").strip()
+    if not url:
+        return ""
+    parts = urlsplit(url)
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or "").lower()
+    if host.startswith("www."):
+        host = host[4:]
+    if parts.port and str(parts.port) != _DEFAULT_PORTS.get(scheme):
+        host = f"{host}:{parts.port}"
+    path = parts.path.rstrip("/") or "/"
+    query = urlencode(sorted(
+        (k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True)
+        if not k.lower().startswith("utm_") and k.lower() not in TRACKING_PARAMS
+    ))
+    return urlunsplit((scheme, host, path, query, ""))
+
+def content_hash(item: dict) -> str:
+    # Whitespace/case-insensitive, so re-rendered feeds don't look new
+    body = "\n".join(_WS.sub(" ", (item.get(k) or "")).strip().lower() for k in ("title", "summary"))
+    return hashlib.sha256(body.encode("utf-8")).hexdigest()
+
+def news_key(canonical: str, chash: str) -> str:
+    return hashlib.sha256(f"{canonical}|{chash}".encode("utf-8")).hexdigest()[:32]
+
+class SeenNews:
+    """In-memory set of news_items keys, warmed from the table once, so
+    duplicates are dropped before any formatting, insert or alert work."""
+
+    def __init__(self):
+        self._keys = None
+
+    def warm(self, conn):
+        self._keys = {r[0] for r in conn.execute(text("SELECT id FROM news_items"))}
+        return self
+
+    def __len__(self):
+        return len(self._keys or ())
+
+    def filter(self, conn, items):
+        """Return rows for items not seen before (first occurrence wins within
+        a batch). Each row is the item plus its canonical_url, content_hash
+        and id. Call add() once the rows are committed."""
+        if self._keys is None:
+            self.warm(conn)
+        fresh, batch = [], set()
+        for item in items:
+            canonical = canonical_url(item.get("url"))
+            if not canonical:
+                continue
+            chash = content_hash(item)
+            key = news_key(canonical, chash)
+            if key in self._keys or key in batch:
+                continue
+            batch.add(key)
+            fresh.append(dict(item, id=key, canonical_url=canonical, content_hash=chash))
+        return fresh
+
+    def add(self, rows):
+        if self._keys is not None:
+            self._keys.update(r["id"] for r in rows)
+
+_INSERT_SQL = text(f"""
+    INSERT INTO news_items ({", ".join(NEWS_FIELDS)})
+    VALUES ({", ".join(f":{f}" for f in NEWS_FIELDS)})
+    ON CONFLICT(canonical_url, content_hash) DO NOTHING
+""")
+
+def store_news(conn, rows):
+    """Insert rows from SeenNews.filter; a row another process stored first
+    is left alone."""
+    if not rows:
+        return
+    now = datetime.now(timezone.utc).isoformat()
+    conn.execute(_INSERT_SQL, [dict({f: r.get(f) for f in NEWS_FIELDS}, first_seen=now) for r in rows])
+    bump_data_version(conn)
@@ -1,4 +1,5 @@
 \
+import json, hashlib
 from datetime import datetime
 from typing import Dict, Any, List
 
@@ -19,27 +20,105 @@ CLASSIFY_MAP = {
     "veto": "VETOED",
 }
 
-def derive_status_general(actions: List[Dict[str, Any]]) -> str:
-    # Coarse heuristic: last-most-significant classification wins
-    order = [
-        "VETOED", "ENACTED", "PASSED_LEGISLATURE",
-        "ON_FLOOR", "REPORTED", "IN_COMMITTEE", "INTRODUCED"
-    ]
-    seen = set()
-    for a in sorted(actions, key=lambda x: x.get("action_date","")):
-        for c in a.get("classification", []):
-            mapped = CLASSIFY_MAP.get(c)
-            if mapped:
-                if mapped == "PASSED_CHAMBER":
-                    seen.add(mapped)
-                    if "PASSED_CHAMBER" in seen and len([1 for s in actions if "passage" in s.get("classification",[])]) >= 2:
-                        return "PASSED_LEGISLATURE"
-                else:
-                    last = mapped
-    return last if (last := locals().get("last")) else "INTRODUCED"
-
-def normalize_openstates_bill(b: Dict[str, Any]) -> Dict[str, Any]:
-    bill_uid = f"openstates:{b['id']}"
+# classification -> status for everything but "passage", which is counted instead
+_NON_PASSAGE = {c: s for c, s in CLASSIFY_MAP.items() if s != "PASSED_CHAMBER"}
+
+class StatusState:
+    """Running state of derive_status_general, fed actions in list order.
+
+    Status is PASSED_LEGISLATURE once two actions carry a "passage"
+    classification; otherwise the last mapped non-passage classification of
+    the latest action (by action_date, later list position winning ties),
+    else INTRODUCED. Only a passage count and the current winner are kept,
+    so feeding is one pass and a stored state can be resumed with just the
+    actions appended since (see dumps/loads).
+    """
+    __slots__ = ("passages", "last_key", "last_status", "seen", "tail")
+
+    def __init__(self, passages=0, last_key=None, last_status=None, seen=0, tail=None):
+        self.passages = passages
+        self.last_key = last_key  # (action_date, position) of the current winner
+        self.last_status = last_status
+        self.seen = seen  # actions consumed so far
+        self.tail = tail  # digest of the last consumed action
+
+    def feed(self, actions: List[Dict[str, Any]]) -> "StatusState":
+        passages, key, status = self.passages, self.last_key, self.last_status
+        last_date = key[0] if key else None
+        pos = self.seen
+        for a in actions:
+            classes = a.get("classification") or ()
+            if "passage" in classes:
+                passages += 1
+            mapped = None
+            for c in classes:
+                mapped = _NON_PASSAGE.get(c, mapped)
+            if mapped is not None:
+                date = a.get("action_date") or ""
+                # positions only grow, so an equal date means a later action: it wins
+                if last_date is None or date >= last_date:
+                    last_date, key, status = date, (date, pos), mapped
+            pos += 1
+        self.passages, self.last_key, self.last_status, self.seen = passages, key, status, pos
+        if actions:
+            self.tail = action_digest(actions[-1])
+        return self
+
+    @property
+    def status(self) -> str:
+        if self.passages >= 2:
+            return "PASSED_LEGISLATURE"
+        return self.last_status or "INTRODUCED"
+
+    def copy(self) -> "StatusState":
+        return StatusState(self.passages, self.last_key, self.last_status, self.seen, self.tail)
+
+    def dumps(self) -> str:
+        return json.dumps([self.passages, list(self.last_key) if self.last_key else None,
+                           self.last_status, self.seen, self.tail], separators=(",", ":"))
+
+    @classmethod
+    def loads(cls, raw):
+        try:
+            passages, key, status, seen, tail = json.loads(raw)
+        except (TypeError, ValueError):
+            return None
+        return cls(passages, tuple(key) if key else None, status, seen, tail)
+
+    def resume(self, actions: List[Dict[str, Any]]) -> "StatusState":
+        """A state for the full `actions` list, fed only the actions past the
+        ones already consumed when the list still ends the consumed prefix
+        the same way; otherwise rebuilt from scratch."""
+        if 0 < self.seen <= len(actions) and action_digest(actions[self.seen - 1]) == self.tail:
+            return self.copy().feed(actions[self.seen:])
+        return StatusState().feed(actions)
+
+def action_digest(a: Dict[str, Any]) -> str:
+    s = f"{a.get('action_date')}|{','.join(a.get('classification') or [])}|{a.get('action_text')}"
+    return hashlib.sha256(s.encode("utf-8")).hexdigest()[:16]
+
+def derive_status_general(actions: List[Dict[str, Any]], state: StatusState = None) -> str:
+    # Coarse heuristic: last-most-significant classification wins (see StatusState)
+    if state is not None:
+        return state.resume(actions).status
+    return StatusState().feed(actions).status
+
+# Top-level payload keys that move without the bill itself changing
+FINGERPRINT_IGNORE = {"updated_at"}
+
+def payload_fingerprint(b: Dict[str, Any]) -> str:
+    # Canonical JSON (sorted keys, fixed separators) so key order and
+    # whitespace differences between responses don't change the digest
+    canon = json.dumps({k: v for k, v in b.items() if k not in FINGERPRINT_IGNORE},
+                       sort_keys=True, separators=(",", ":"), ensure_ascii=False, default=str)
+    return hashlib.sha256(canon.encode("utf-8")).hexdigest()
+
+def openstates_bill_uid(b: Dict[str, Any]) -> str:
+    return f"openstates:{b['id']}"
+
+def normalize_openstates_bill(b: Dict[str, Any], status_state: str = None) -> Dict[str, Any]:
+    # status_state: the bill's stored StatusState.dumps(), to resume from
+    bill_uid = openstates_bill_uid(b)
     jurisdiction = b.get("jurisdiction", {}).get("name")
     session = b.get("from_session")
     bill_number = b.get("identifier")
@@ -65,7 +144,9 @@ def normalize_openstates_bill(b: Dict[str, Any]) -> Dict[str, Any]:
             "classification": a.get("classification", []),
             "action_text": a.get("description")
         })
-    status_general = derive_status_general(actions_norm) if actions_norm else "INTRODUCED"
+    prior = StatusState.loads(status_state) if status_state else None
+    state = prior.resume(actions_norm) if prior else StatusState().feed(actions_norm)
+    status_general = state.status
     introduced_date = None
     if b.get("first_action_date"):
         introduced_date = b.get("first_action_date")
@@ -87,7 +168,8 @@ def normalize_openstates_bill(b: Dict[str, Any]) -> Dict[str, Any]:
             "introduced_date": introduced_date,
             "effective_date": None,
             "last_action_date": last_action_date,
-            "updated_at": datetime.utcnow().isoformat()
+            "updated_at": datetime.utcnow().isoformat(),
+            "status_state": state.dumps(),
         },
         "actions": actions_norm
     }
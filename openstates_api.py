@@ -0,0 +1,167 @@
+import os, threading
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from dotenv import load_dotenv
+from metrics import inc, timer, host_of, in_scope
+
+load_dotenv()
+
+OPENSTATES_API_KEY = os.getenv("OPENSTATES_API_KEY")
+OPENSTATES_CONCURRENCY = int(os.getenv("OPENSTATES_CONCURRENCY", "4"))
+# Pages fetched ahead of the consumer at most (0: twice the concurrency)
+OPENSTATES_FETCH_AHEAD = int(os.getenv("OPENSTATES_FETCH_AHEAD", "0"))
+
+BASE_URL = "https://v3.openstates.org/bills"
+_HOST = host_of(BASE_URL)
+
+_session = None
+_pool_size = 0
+_session_lock = threading.Lock()
+
+def get_session(pool_size: int = OPENSTATES_CONCURRENCY) -> requests.Session:
+    # One keep-alive pool shared by every fetch thread; 429/5xx are retried
+    # honoring Retry-After so higher concurrency doesn't burn the quota.
+    # The pool grows to the largest concurrency asked for (iter_pages passes
+    # its own), so no fetch thread finds it full and drops its connection.
+    global _session, _pool_size
+    with _session_lock:
+        if _session is None:
+            _session = requests.Session()
+        if pool_size > _pool_size:
+            retry = Retry(total=3, backoff_factor=1.0, status_forcelist=(429, 502, 503, 504),
+                          allowed_methods=("GET",), respect_retry_after_header=True)
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max(pool_size, 1), max_retries=retry)
+            _session.mount("https://", adapter)
+            _session.mount("http://", adapter)
+            _pool_size = pool_size
+    return _session
+
+def openstates_get(params):
+    headers = {"X-API-KEY": OPENSTATES_API_KEY}
+    with timer("http_client_request_seconds", host=_HOST):
+        r = get_session().get(BASE_URL, params=params, headers=headers, timeout=30)
+    inc("http_client_responses_total", host=_HOST, code=str(r.status_code))
+    r.raise_for_status()
+    return r.json()
+
+def _page_params(params, jurisdiction, page, overrides=None):
+    p = dict(params, page=page)
+    if overrides and jurisdiction in overrides:
+        p.update(overrides[jurisdiction])
+    if jurisdiction != "__ALL__":
+        p["jurisdiction"] = jurisdiction
+    return p
+
+def _iter_serial(jurisdiction, params, overrides=None, start=1):
+    page = start
+    while True:
+        results = openstates_get(_page_params(params, jurisdiction, page, overrides)).get("results", [])
+        if not results:
+            return
+        yield jurisdiction, page, results
+        page += 1
+
+def iter_pages(jurisdictions, params, concurrency=OPENSTATES_CONCURRENCY, overrides=None, start_pages=None,
+               ahead=None):
+    """Yield (jurisdiction, page, results) for every non-empty page.
+
+    Pages come out in exactly the order the serial walk produces them
+    (jurisdiction by jurisdiction, page by page), so a single writer
+    consuming this generator sees the same sequence as before. With
+    concurrency > 1 pages are fetched ahead of the writer, in that same
+    order: once a first page reports `pagination.max_page` the rest of its
+    jurisdiction is queued, and first pages of later jurisdictions are
+    requested while earlier ones are being walked. At most `ahead` pages
+    (default OPENSTATES_FETCH_AHEAD, else 2 x concurrency) are requested
+    but not yet yielded, so a slow consumer holds memory for that many
+    pages, not a whole session.
+
+    `overrides` optionally maps a jurisdiction to extra params (e.g. its own
+    updated_since) layered over `params`; `start_pages` maps a jurisdiction
+    to the page its walk starts at (default 1).
+    """
+    start_pages = start_pages or {}
+    if concurrency <= 1:
+        for st in jurisdictions:
+            yield from _iter_serial(st, params, overrides, start=start_pages.get(st, 1))
+        return
+
+    jurisdictions = list(jurisdictions)
+    window = max(ahead or OPENSTATES_FETCH_AHEAD or 2 * concurrency, concurrency)
+    get_session(concurrency)
+    pool = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="openstates")
+    futures = {}   # (jurisdiction, page) -> future, requested and not yet yielded
+    last_page = {}  # jurisdiction -> its last page, once its first page is back (None: walk serially)
+    queued = {}    # jurisdiction -> last page requested
+
+    def fetch(st, page):
+        futures[(st, page)] = pool.submit(in_scope(openstates_get), _page_params(params, st, page, overrides))
+        queued[st] = page
+
+    def paginate(st, data):
+        max_page = (data.get("pagination") or {}).get("max_page")
+        last_page[st] = int(max_page) if data.get("results") and max_page else None
+
+    def top_up(current):
+        # request pages in the order they will be yielded, skipping those
+        # still waiting on their first page's pagination
+        for st in jurisdictions[current:]:
+            if len(futures) >= window:
+                return
+            first = start_pages.get(st, 1)
+            if st not in queued:
+                fetch(st, first)
+                continue
+            if st not in last_page:
+                f = futures.get((st, first))
+                if f is None or not f.done():
+                    continue
+                paginate(st, f.result() if f.exception() is None else {})
+            while last_page[st] is not None and queued[st] < last_page[st] and len(futures) < window:
+                fetch(st, queued[st] + 1)
+
+    def take(current, st, page):
+        key = (st, page)
+        while True:
+            top_up(current)
+            if key not in futures:
+                fetch(st, page)  # the window is full of later first pages
+            f = futures[key]
+            if f.done():
+                break
+            waiting = [g for (j, p), g in futures.items() if p == start_pages.get(j, 1) and j not in last_page]
+            wait([f] + waiting, return_when=FIRST_COMPLETED)
+        del futures[key]
+        return f.result()
+
+    def drop(st):
+        for key in [k for k in futures if k[0] == st]:
+            futures.pop(key).cancel()
+        last_page[st] = queued[st] = 0  # nothing more to request
+
+    try:
+        for i, st in enumerate(jurisdictions):
+            first = start_pages.get(st, 1)
+            data = take(i, st, first)
+            results = data.get("results", [])
+            if not results:
+                drop(st)
+                continue
+            if st not in last_page:
+                paginate(st, data)
+            yield st, first, results
+            if last_page[st] is None:
+                # No pagination info: fall back to walking until an empty page
+                drop(st)
+                yield from _iter_serial(st, params, overrides, start=first + 1)
+                continue
+            for page in range(first + 1, last_page[st] + 1):
+                results = take(i, st, page).get("results", [])
+                if not results:
+                    drop(st)
+                    break
+                yield st, page, results
+    finally:
+        pool.shutdown(wait=False, cancel_futures=True)
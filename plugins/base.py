@@ -1,8 +1,19 @@
-from typing import Iterable, Dict, Any
+from typing import Iterable, Dict, Any, List
 
 class SourcePlugin:
-    """Base class for a data source plugin."""
+    """Base class for a data source plugin.
+
+    Plugins are looked up by name in plugins/registry.py and their module is
+    only imported when the plugin is enabled, so keep heavy parser imports
+    in the plugin's own module. A plugin is built from the entries of its
+    `config` file and an optional HTTPCache."""
     name = "base"
+    config = None  # YAML list of entries (feeds, pages, ...) the collectors load for it
+    icon = "🔔"    # prefix of its Slack alerts
+
+    def __init__(self, entries: List[dict], cache=None):
+        self.entries = entries
+        self.cache = cache  # optional HTTPCache: skip entries that haven't changed
 
     def fetch(self, **kwargs) -> Iterable[Dict[str, Any]]:
         """Yield dicts representing 'policy items' in a common schema.
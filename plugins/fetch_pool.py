@@ -0,0 +1,70 @@
+import os, time, threading
+from concurrent.futures import ThreadPoolExecutor, as_completed, TimeoutError as FuturesTimeout
+from contextlib import contextmanager
+from typing import Callable, Iterable, Iterator, Tuple, Any
+from urllib.parse import urlparse
+from metrics import in_scope
+
+# Bounded parallel fetching for the list/feed plugins, polite per host:
+# at most PER_HOST_CONCURRENCY requests in flight to one host and at least
+# PER_HOST_MIN_INTERVAL seconds between request starts to the same host.
+
+SOURCE_WORKERS = int(os.getenv("SOURCE_WORKERS", "8"))
+PER_HOST_CONCURRENCY = int(os.getenv("PER_HOST_CONCURRENCY", "2"))
+PER_HOST_MIN_INTERVAL = float(os.getenv("PER_HOST_MIN_INTERVAL", "1.0"))
+# Wall-clock cap for a whole plugin pass; sources still running are dropped
+SOURCES_DEADLINE = float(os.getenv("SOURCES_DEADLINE", "300"))
+
+class HostLimiter:
+    def __init__(self, per_host: int = PER_HOST_CONCURRENCY, min_interval: float = PER_HOST_MIN_INTERVAL):
+        self.per_host = max(per_host, 1)
+        self.min_interval = min_interval
+        self._lock = threading.Lock()
+        self._sems = {}
+        self._next_start = {}
+
+    @contextmanager
+    def slot(self, url: str):
+        host = urlparse(url).netloc.lower()
+        with self._lock:
+            sem = self._sems.setdefault(host, threading.BoundedSemaphore(self.per_host))
+        with sem:
+            with self._lock:
+                # reserve the next start time for this host, then sleep outside the lock
+                now = time.monotonic()
+                start = max(now, self._next_start.get(host, now))
+                self._next_start[host] = start + self.min_interval
+            if start > now:
+                time.sleep(start - now)
+            yield
+
+def fetch_concurrently(sources: Iterable[dict], fn: Callable[[dict], Any], workers: int = SOURCE_WORKERS,
+                       limiter: HostLimiter = None, deadline: float = SOURCES_DEADLINE) -> Iterator[Tuple[dict, Any]]:
+    """Run fn(source) for every source with a url, yielding (source, result)
+    as each one finishes. Sources that raise are skipped, like the old
+    serial loops did; anything unfinished at `deadline` seconds is dropped.
+    A dropped fn keeps running in its thread, so it must leave results to
+    the caller (who only sees what was yielded) rather than commit them."""
+    limiter = limiter or HostLimiter()
+    todo = [s for s in sources if s.get("url")]
+    if not todo:
+        return
+
+    def run(s):
+        with limiter.slot(s["url"]):
+            return fn(s)
+
+    pool = ThreadPoolExecutor(max_workers=max(1, min(workers, len(todo))), thread_name_prefix="sources")
+    futures = {pool.submit(in_scope(run), s): s for s in todo}
+    try:
+        for fut in as_completed(futures, timeout=deadline):
+            try:
+                result = fut.result()
+            except Exception:
+                continue
+            yield futures[fut], result
+    except FuturesTimeout:
+        late = [futures[f].get("name") or futures[f]["url"] for f in futures if not f.done()]
+        print(f"⚠️ Sources still running after {deadline:.0f}s, skipped: {', '.join(late)}")
+    finally:
+        pool.shutdown(wait=False, cancel_futures=True)
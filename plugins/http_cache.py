@@ -0,0 +1,122 @@
+import os, json, time, hashlib, threading
+from typing import Optional
+import requests
+from metrics import inc, timer, host_of
+
+# On-disk conditional-request cache shared by the RSS and HTTP keyword
+# plugins. One small JSON file per URL holds the validators (ETag,
+# Last-Modified) and a digest of the last body we processed.
+
+HTTP_CACHE_DIR = os.getenv("HTTP_CACHE_DIR", ".http_cache")
+
+DEFAULT_HEADERS = {
+    "User-Agent": "PolicyTrackerBot/0.1 (contact: your-email@example.com)"
+}
+
+# Hard cap on one request, body download included; requests' own timeout
+# only bounds each socket read, so a trickling server could hold it forever.
+FETCH_TIMEOUT = float(os.getenv("FETCH_TIMEOUT", "30"))
+
+def http_get(url, headers=None, timeout=FETCH_TIMEOUT, session=None, max_bytes=None) -> requests.Response:
+    """GET with DEFAULT_HEADERS and a total deadline; the body is read
+    eagerly (truncated at max_bytes, if given) so r.content/r.text work as
+    usual afterwards."""
+    h = dict(DEFAULT_HEADERS)
+    h.update(headers or {})
+    deadline = time.monotonic() + timeout
+    host = host_of(url)
+    with timer("http_client_request_seconds", host=host):
+        r = (session or requests).get(url, headers=h, timeout=(min(10, timeout), timeout), stream=True)
+        chunks, size = [], 0
+        for chunk in r.iter_content(64 * 1024):
+            chunks.append(chunk)
+            size += len(chunk)
+            if time.monotonic() > deadline:
+                r.close()
+                raise requests.Timeout(f"{url}: body not received within {timeout:.0f}s")
+            if max_bytes is not None and size >= max_bytes:
+                r.close()
+                break
+    inc("http_client_responses_total", host=host, code=str(r.status_code))
+    r._content = b"".join(chunks)[:max_bytes]
+    return r
+
+class HTTPCache:
+    """Fetch URLs with If-None-Match / If-Modified-Since.
+
+    `fetch` returns the response only when the body is new to us (not a 304
+    and not byte-identical to the last processed body); otherwise None, and
+    the caller skips parsing. A returned response carries its new
+    validators as `r.cache_entry`; the caller hands them to `stage()` once
+    the body parsed, and runs `commit()` once the items from those bodies
+    are safely stored. A body that fails to parse, or a crash mid-run, is
+    re-fetched next time instead of losing its items behind a 304.
+    """
+
+    def __init__(self, directory: str = HTTP_CACHE_DIR, session: Optional[requests.Session] = None):
+        self.directory = directory
+        self.session = session or requests.Session()
+        self._pending = {}
+        self._lock = threading.Lock()  # plugins fetch from worker threads
+        self.stats = {"not_modified": 0, "unchanged": 0, "changed": 0}
+
+    def _path(self, url: str) -> str:
+        return os.path.join(self.directory, hashlib.sha256(url.encode("utf-8")).hexdigest() + ".json")
+
+    def get(self, url: str) -> dict:
+        if url in self._pending:
+            return self._pending[url]
+        try:
+            with open(self._path(url), "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _count(self, key):
+        with self._lock:
+            self.stats[key] += 1
+
+    def fetch(self, url: str, headers=None, timeout=FETCH_TIMEOUT, max_bytes=None) -> Optional[requests.Response]:
+        entry = self.get(url)
+        h = dict(headers or {})
+        if entry.get("etag"):
+            h["If-None-Match"] = entry["etag"]
+        if entry.get("last_modified"):
+            h["If-Modified-Since"] = entry["last_modified"]
+        r = http_get(url, headers=h, timeout=timeout, session=self.session, max_bytes=max_bytes)
+        if r.status_code == 304:
+            self._count("not_modified")
+            return None
+        r.raise_for_status()
+        digest = hashlib.sha256(r.content).hexdigest()
+        unchanged = entry.get("digest") == digest
+        entry = {
+            "url": url,
+            "etag": r.headers.get("ETag"),
+            "last_modified": r.headers.get("Last-Modified"),
+            "digest": digest,
+            "fetched_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        }
+        if unchanged:
+            self.stage(entry)  # nothing to parse: only the validators may be new
+            self._count("unchanged")
+            return None
+        self._count("changed")
+        r.cache_entry = entry
+        return r
+
+    def stage(self, entry: dict):
+        """Hold a URL's new validators (a response's cache_entry) for commit()."""
+        with self._lock:
+            self._pending[entry["url"]] = entry
+
+    def commit(self):
+        os.makedirs(self.directory, exist_ok=True)
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        for url, entry in pending.items():
+            path = self._path(url)
+            tmp = path + ".tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(entry, f)
+            os.replace(tmp, path)
@@ -1,77 +1,162 @@
-import time
-from typing import Iterable, Dict, Any, List
-import requests
-from bs4 import BeautifulSoup
+import os, re, time
+from functools import lru_cache
+from typing import Iterable, Dict, Any, List, Optional, Tuple
+import lxml.html
+from lxml.cssselect import CSSSelector
 from urllib.parse import urljoin
 
+from .base import SourcePlugin
+from .http_cache import http_get
+from .fetch_pool import fetch_concurrently
+from metrics import stage
+
 # A lightweight HTML keyword-scanner for list pages.
 # It does not do deep crawling; it scans the page, extracts links by CSS selector,
 # and filters by include/exclude keywords in link text (and optionally snippet).
 
-DEFAULT_HEADERS = {
-    "User-Agent": "PolicyTrackerBot/0.1 (contact: your-email@example.com)"
-}
+# Per-page work caps: bytes of HTML parsed and links examined
+HTTP_MAX_PAGE_BYTES = int(os.getenv("HTTP_MAX_PAGE_BYTES", str(5 * 1024 * 1024)))
+HTTP_MAX_LINKS = int(os.getenv("HTTP_MAX_LINKS", "5000"))
+
+class KeywordFilter:
+    """include/exclude keyword lists compiled to one case-insensitive regex
+    each; same substring semantics as checking every keyword with `in`."""
+
+    def __init__(self, include: List[str], exclude: List[str]):
+        self.include = self._compile(include)
+        self.exclude = self._compile(exclude)
 
-def _match(text: str, include: List[str], exclude: List[str]) -> bool:
-    t = (text or "").lower()
-    if include:
-        if not any(k.lower() in t for k in include):
+    @staticmethod
+    def _compile(words: List[str]) -> Optional[re.Pattern]:
+        words = [str(w).lower() for w in (words or [])]
+        if not words:
+            return None
+        return re.compile("|".join(re.escape(w) for w in sorted(set(words), key=len, reverse=True)))
+
+    def __call__(self, text: str) -> bool:
+        t = (text or "").lower()
+        if self.include is not None and not self.include.search(t):
             return False
-    if exclude:
-        if any(k.lower() in t for k in exclude):
+        if self.exclude is not None and self.exclude.search(t):
             return False
-    return True
+        return True
 
-class HTTPKeywordPlugin:
-    name = "http-keyword"
+@lru_cache(maxsize=256)
+def _selector(css: str) -> CSSSelector:
+    # CSS -> compiled XPath, once per distinct selector
+    return CSSSelector(css)
 
-    def __init__(self, sources: List[dict]):
-        self.sources = sources
+def _text(el) -> str:
+    return (el.text_content() or "").strip()
 
-    def fetch(self, **kwargs) -> Iterable[Dict[str, Any]]:
-        now = time.strftime("%Y-%m-%d")
-        for s in self.sources:
-            url = s.get("url")
-            if not url:
+_SHARED = object()  # marks an ancestor holding more than one snippet
+
+def _snippet_index(snippets) -> Dict[Any, Any]:
+    """Map every ancestor of a snippet node to that snippet, or to _SHARED
+    once a second snippet shows up beneath it, so a link's result container
+    is found by walking up from the link instead of searching the whole
+    document."""
+    index = {}
+    for sn in snippets:
+        el = sn
+        while el is not None:
+            if el in index:
+                # this ancestor and everything above hold an earlier snippet too
+                while el is not None and index.get(el) is not _SHARED:
+                    index[el] = _SHARED
+                    el = el.getparent()
+                break
+            index[el] = sn
+            el = el.getparent()
+    return index
+
+def extract_links(html: bytes, base_url: str, link_selector: str = "a", snippet_selector: str = None,
+                  keep=None, max_links: int = HTTP_MAX_LINKS):
+    """Yield (title, absolute url) for links on a list page that pass `keep`.
+
+    The page is parsed once with lxml. A link whose text fails `keep` is
+    judged on the snippet in its own result container: the nearest ancestor
+    that contains a snippet_selector match, as long as it contains only one.
+    A link outside every result (nav, footer) has no snippet of its own and
+    is judged on its text alone.
+    """
+    keep = keep or (lambda t: True)
+    if not html or not html.strip():
+        return
+    doc = lxml.html.document_fromstring(html[:HTTP_MAX_PAGE_BYTES])
+    snippets = _snippet_index(_selector(snippet_selector)(doc)) if snippet_selector else None
+    snippet_text = {}
+    seen = set()
+    for a in _selector(link_selector)(doc)[:max_links]:
+        title = _text(a)
+        href = a.get("href")
+        if not href or not title:
+            continue
+        if not keep(title):
+            # if we have a snippet selector, try the snippet of this link's result
+            if snippets is None:
                 continue
-            try:
-                r = requests.get(url, headers=DEFAULT_HEADERS, timeout=30)
-                r.raise_for_status()
-            except Exception:
+            el, sn = a, None
+            while el is not None:
+                sn = snippets.get(el)
+                if sn is not None:
+                    break
+                el = el.getparent()
+            if sn is None or sn is _SHARED:
                 continue
-            soup = BeautifulSoup(r.text, "lxml")
-
-            link_sel = s.get("link_selector") or "a"
-            snippet_sel = s.get("snippet_selector")  # optional
-
-            include = s.get("include") or []
-            exclude = s.get("exclude") or []
-            topic = s.get("topic") or ""
-            state = s.get("state")
-
-            for a in soup.select(link_sel):
-                title = (a.get_text() or "").strip()
-                href = a.get("href")
-                if not href or not title:
-                    continue
-                if not _match(title, include, exclude):
-                    # if we have a snippet selector, try to grab neighbor text to match on
-                    if snippet_sel:
-                        sn = soup.select_one(snippet_sel)
-                        sn_text = (sn.get_text() or "").strip() if sn else ""
-                        if not _match(sn_text, include, exclude):
-                            continue
-                    else:
-                        continue
-                abs_url = urljoin(url, href)
-                yield {
-                    "source": "http",
-                    "jurisdiction": state,
-                    "title": title,
-                    "summary": "",
-                    "url": abs_url,
-                    "status": "ANNOUNCEMENT",
-                    "effective_date": None,
-                    "updated_at": now,
-                    "topic_labels": topic,
-                }
+            if sn not in snippet_text:
+                snippet_text[sn] = keep(_text(sn))
+            if not snippet_text[sn]:
+                continue
+        abs_url = urljoin(base_url, href)
+        if (abs_url, title) in seen:
+            continue
+        seen.add((abs_url, title))
+        yield title, abs_url
+
+class HTTPKeywordPlugin(SourcePlugin):
+    name = "http-keyword"
+    config = "sources.yml"
+    icon = "🌐"
+
+    def fetch(self, **kwargs) -> Iterable[Dict[str, Any]]:
+        # Pages are fetched in parallel; items stream out as each page finishes.
+        # Validators are staged here, as in RSSPlugin.fetch.
+        for _, (items, entry) in fetch_concurrently(self.entries, self._scan_page):
+            if entry is not None:
+                self.cache.stage(entry)
+            yield from items
+
+    def _scan_page(self, s: dict) -> Tuple[List[Dict[str, Any]], Optional[dict]]:
+        now = time.strftime("%Y-%m-%d")
+        url = s.get("url")
+        if self.cache is None:
+            r = http_get(url, max_bytes=HTTP_MAX_PAGE_BYTES)
+            r.raise_for_status()
+        else:
+            r = self.cache.fetch(url, max_bytes=HTTP_MAX_PAGE_BYTES)
+            if r is None:
+                return [], None  # 304 / same body as last run: nothing to parse
+
+        keep = KeywordFilter(s.get("include") or [], s.get("exclude") or [])
+        topic = s.get("topic") or ""
+        state = s.get("state")
+
+        with stage("http_extract"):
+            links = list(extract_links(r.content, url, s.get("link_selector") or "a",
+                                       s.get("snippet_selector"), keep, int(s.get("max_links") or HTTP_MAX_LINKS)))
+        items = []
+        for title, abs_url in links:
+            items.append({
+                "source": "http",
+                "jurisdiction": state,
+                "title": title,
+                "summary": "",
+                "url": abs_url,
+                "status": "ANNOUNCEMENT",
+                "effective_date": None,
+                "updated_at": now,
+                "topic_labels": topic,
+                "slack": s.get("slack", True) is not False,
+            })
+        return items, getattr(r, "cache_entry", None)
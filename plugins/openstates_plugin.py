@@ -4,8 +4,8 @@ from normalize import normalize_openstates_bill
 class OpenStatesAdapter:
     name = "openstates-adapter"
 
-    def wrap(self, bill_json) -> Dict[str, Any]:
-        pack = normalize_openstates_bill(bill_json)
+    def wrap(self, bill_json, status_state=None) -> Dict[str, Any]:
+        pack = normalize_openstates_bill(bill_json, status_state=status_state)
         b = pack['bill']
         return {
             "source": "openstates",
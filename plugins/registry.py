@@ -0,0 +1,62 @@
+import os, importlib
+from .base import SourcePlugin
+
+# Source plugins by name, as "module:Class" paths that are only imported when
+# a run enables the plugin, so an OpenStates-only run never loads feedparser
+# or lxml. Besides the built-ins, plugins can be declared
+#   - in SOURCE_PLUGINS, e.g. "courts=my_sources.courts:CourtsPlugin,...",
+#     which can also replace a built-in
+#   - by an installed package, under the "policy_radar.plugins" entry point
+#     group, only scanned for names not found above (the scan reads every
+#     installed distribution's metadata)
+# Every plugin class must subclass SourcePlugin.
+
+ENTRY_POINT_GROUP = "policy_radar.plugins"
+
+BUILTIN_PLUGINS = {
+    "rss": "plugins.rss_source:RSSPlugin",
+    "http": "plugins.http_keyword:HTTPKeywordPlugin",
+}
+
+def _declared(value: str) -> dict:
+    out = {}
+    for part in value.split(","):
+        name, sep, target = part.partition("=")
+        if part.strip() and not (sep and ":" in target):
+            raise ValueError(f"bad SOURCE_PLUGINS entry {part.strip()!r}: use name=module:Class")
+        if sep:
+            out[name.strip()] = target.strip()
+    return out
+
+DECLARED_PLUGINS = _declared(os.getenv("SOURCE_PLUGINS", ""))
+
+_classes = {}  # name -> loaded class
+
+def _entry_points() -> dict:
+    from importlib.metadata import entry_points
+    return {ep.name: ep.value for ep in entry_points(group=ENTRY_POINT_GROUP)}
+
+def plugin_target(name: str) -> str:
+    """The "module:Class" path registered for `name`, without importing it."""
+    target = DECLARED_PLUGINS.get(name) or BUILTIN_PLUGINS.get(name) or _entry_points().get(name)
+    if target is None:
+        raise ValueError(f"unknown source plugin {name!r} (available: {', '.join(sorted(available_plugins()))})")
+    return target
+
+def available_plugins() -> dict:
+    """Every registered name -> "module:Class", scanning entry points too."""
+    return {**_entry_points(), **BUILTIN_PLUGINS, **DECLARED_PLUGINS}
+
+def load_plugin(name: str) -> type:
+    """Import and return the plugin class registered as `name`."""
+    cls = _classes.get(name)
+    if cls is None:
+        target = plugin_target(name)
+        module, _, attr = target.partition(":")
+        cls = importlib.import_module(module)
+        for part in attr.split("."):
+            cls = getattr(cls, part)
+        if not (isinstance(cls, type) and issubclass(cls, SourcePlugin)):
+            raise TypeError(f"source plugin {name!r} ({target}) is not a SourcePlugin subclass")
+        _classes[name] = cls
+    return cls
@@ -1,9 +1,11 @@
 import time
-from typing import Iterable, Dict, Any, List
-import requests
+from typing import Iterable, Dict, Any, List, Optional, Tuple
 import feedparser
+from metrics import stage
 
 from .base import SourcePlugin
+from .http_cache import http_get
+from .fetch_pool import fetch_concurrently
 
 def _match_filters(title: str, summary: str, include: List[str], exclude: List[str]) -> bool:
     t = (title or "").lower()
@@ -18,39 +20,57 @@ def _match_filters(title: str, summary: str, include: List[str], exclude: List[s
 
 class RSSPlugin(SourcePlugin):
     name = "rss"
-
-    def __init__(self, feeds: List[dict]):
-        self.feeds = feeds
+    config = "feeds.yml"
+    icon = "📰"
 
     def fetch(self, **kwargs) -> Iterable[Dict[str, Any]]:
+        # Feeds are fetched in parallel; items stream out as each feed finishes.
+        # Validators are staged here, not in the fetch threads, so a feed
+        # still running at the deadline (its items dropped) never stages.
+        for _, (items, entry) in fetch_concurrently(self.entries, self._fetch_feed):
+            if entry is not None:
+                self.cache.stage(entry)
+            yield from items
+
+    def _fetch_feed(self, f: dict) -> Tuple[List[Dict[str, Any]], Optional[dict]]:
         now = time.strftime("%Y-%m-%d")
-        for f in self.feeds:
-            url = f.get("url")
-            if not url:
-                continue
-            try:
-                d = feedparser.parse(url)
-            except Exception:
+        url = f.get("url")
+        if self.cache is None:
+            r = http_get(url)
+            r.raise_for_status()
+        else:
+            r = self.cache.fetch(url)
+            if r is None:
+                return [], None  # 304 / same body as last run: nothing to parse
+        with stage("rss_parse"):
+            d = feedparser.parse(r.content, response_headers={
+                "content-location": r.url,
+                "content-type": r.headers.get("Content-Type", ""),
+            })
+        if d.bozo and not d.entries:
+            raise ValueError(f"{url}: not a feed ({d.get('bozo_exception')})")
+        include = f.get("include") or []
+        exclude = f.get("exclude") or []
+        topic = f.get("topic") or ""
+        state = f.get("state")
+        items = []
+        for e in d.entries:
+            title = getattr(e, "title", "")
+            summary = getattr(e, "summary", "") or getattr(e, "subtitle", "")
+            link = getattr(e, "link", "")
+            if not _match_filters(title, summary, include, exclude):
                 continue
-            include = f.get("include") or []
-            exclude = f.get("exclude") or []
-            topic = f.get("topic") or ""
-            state = f.get("state")
-            for e in d.entries:
-                title = getattr(e, "title", "")
-                summary = getattr(e, "summary", "") or getattr(e, "subtitle", "")
-                link = getattr(e, "link", "")
-                if not _match_filters(title, summary, include, exclude):
-                    continue
-                item = {
-                    "source": "rss",
-                    "jurisdiction": state,
-                    "title": title,
-                    "summary": summary,
-                    "url": link,
-                    "status": "ANNOUNCEMENT",
-                    "effective_date": None,
-                    "updated_at": now,
-                    "topic_labels": topic,
-                }
-                yield item
+            item = {
+                "source": "rss",
+                "jurisdiction": state,
+                "title": title,
+                "summary": summary,
+                "url": link,
+                "status": "ANNOUNCEMENT",
+                "effective_date": None,
+                "updated_at": now,
+                "topic_labels": topic,
+                "slack": f.get("slack", True) is not False,
+            }
+            items.append(item)
+        return items, getattr(r, "cache_entry", None)
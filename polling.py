@@ -0,0 +1,71 @@
+import os
+
+# Adaptive poll intervals for daemon.py jobs. Each job keeps an exponentially
+# weighted estimate of how many new or changed items it finds per second
+# (bills for an OpenStates jurisdiction, items for a feed or page) and aims
+# for ADAPTIVE_TARGET of them per poll, within the job's bounds:
+#   - a poll that finds nothing stretches the interval by ADAPTIVE_BACKOFF
+#   - a poll that finds changes sets it to target / rate at once, using the
+#     faster of the smoothed and the just-measured rate, so a legislature
+#     coming back into session is picked up within one poll
+# A source producing about ADAPTIVE_TARGET changes per poll keeps its
+# interval.
+
+ADAPTIVE = os.getenv("DAEMON_ADAPTIVE", "1") != "0"
+ADAPTIVE_TARGET = float(os.getenv("ADAPTIVE_TARGET", "1"))
+ADAPTIVE_ALPHA = float(os.getenv("ADAPTIVE_ALPHA", "0.3"))  # EWMA weight of the latest poll
+ADAPTIVE_BACKOFF = float(os.getenv("ADAPTIVE_BACKOFF", "1.5"))
+
+class PollState:
+    """What a job has learned about its source."""
+    __slots__ = ("interval", "rate", "quiet_runs", "last_change")
+
+    def __init__(self, interval: float, rate: float = 0.0, quiet_runs: int = 0, last_change: float = None):
+        self.interval = interval        # seconds until the next poll
+        self.rate = rate                # smoothed changes per second
+        self.quiet_runs = quiet_runs    # polls in a row that found nothing
+        self.last_change = last_change  # unix time of the last poll that found something
+
+    def changes_per_day(self) -> float:
+        return self.rate * 86400
+
+def clamp(interval, bounds):
+    lo, hi = bounds
+    return min(max(interval, lo), hi)
+
+def adapt(state: PollState, changes: int, elapsed: float, bounds, now: float,
+          target: float = ADAPTIVE_TARGET, alpha: float = ADAPTIVE_ALPHA, backoff: float = ADAPTIVE_BACKOFF) -> PollState:
+    """State after a poll that found `changes` items `elapsed` seconds after
+    the previous one."""
+    elapsed = max(elapsed, 1.0)
+    measured = changes / elapsed
+    rate = alpha * measured + (1 - alpha) * state.rate
+    if changes:
+        return PollState(clamp(target / max(rate, measured), bounds), rate, 0, now)
+    return PollState(clamp(state.interval * backoff, bounds), rate, state.quiet_runs + 1, state.last_change)
+
+def explain(state: PollState, bounds) -> str:
+    """One line on why the job polls at its current interval."""
+    per_day = f"{state.changes_per_day():.1f} changes/day"
+    if bounds is None:
+        return f"{per_day}; fixed interval"
+    lo, hi = bounds
+    if state.interval >= hi:
+        why = f"quiet, at the {fmt_interval(hi)} ceiling"
+    elif state.interval <= lo:
+        why = f"busy, at the {fmt_interval(lo)} floor"
+    elif state.quiet_runs:
+        why = f"backing off after {state.quiet_runs} quiet poll{'s' if state.quiet_runs > 1 else ''}"
+    elif state.last_change is None:
+        why = "no history yet"
+    else:
+        why = f"aiming at {ADAPTIVE_TARGET:g} change per poll"
+    return f"{per_day}; {why}"
+
+def fmt_interval(seconds) -> str:
+    seconds = float(seconds)
+    for unit, size in (("d", 86400), ("h", 3600), ("m", 60)):
+        if seconds >= size:
+            v = seconds / size
+            return f"{v:.0f}{unit}" if abs(v - round(v)) < 0.05 else f"{v:.1f}{unit}"
+    return f"{seconds:.0f}s"
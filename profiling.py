@@ -0,0 +1,202 @@
+import os, sys, io, time, threading, functools, itertools, cProfile, pstats, tracemalloc
+from collections import Counter
+
+# Opt-in profiling for one collector run (--profile) or serve.py request
+# (SERVE_PROFILE=1). Three views of the same window:
+#   cpu.pstats        cProfile of the profiled thread (snakeviz, pstats)
+#   stacks.collapsed  wall-clock stack samples of every thread, one
+#                     "frame;frame;... count" line per stack, for
+#                     flamegraph.pl / speedscope / inferno
+#   memory.txt        tracemalloc peak and top allocation sites
+# plus summary.txt, the printed top-N report with samples attributed to
+# pipeline stages. Samples are wall-clock: a thread blocked on the network
+# counts against the stage that is waiting.
+
+PROFILE_DIR = os.getenv("PROFILE_DIR", "profiles")
+PROFILE_INTERVAL = float(os.getenv("PROFILE_INTERVAL", "0.005"))  # seconds between stack samples
+PROFILE_TOP = int(os.getenv("PROFILE_TOP", "20"))
+PROFILE_MEMORY = os.getenv("PROFILE_MEMORY", "1") != "0"  # tracemalloc slows the run down noticeably
+PROFILE_MEMORY_FRAMES = int(os.getenv("PROFILE_MEMORY_FRAMES", "10"))
+
+# (file, function) -> pipeline stage; a sample belongs to the innermost match
+# on its stack. Names match metrics.stage() where both exist.
+STAGE_FRAMES = {
+    ("openstates_api.py", "openstates_get"): "fetch",
+    ("http_cache.py", "http_get"): "fetch",
+    ("ingest.py", "select_changed"): "select_changed",
+    ("ingest.py", "prepare_bills"): "normalize",
+    ("normalize.py", "normalize_openstates_bill"): "normalize",
+    ("ingest.py", "label_row"): "label",
+    ("classify.py", "label_record"): "label",
+    ("ingest.py", "write_prepared"): "db_write",
+    ("db.py", "refresh_facet_counts"): "refresh_facets",
+    ("rss_source.py", "_fetch_feed"): "rss_parse",
+    ("http_keyword.py", "extract_links"): "http_extract",
+    ("collector_plugins.py", "store_news_items"): "news_store",
+    ("alerts.py", "enqueue_alert"): "alerts_enqueue",
+    ("alerts.py", "send_slack"): "slack_send",
+    ("search.py", "search_bills"): "search",
+    ("serve.py", "query_bills"): "query",
+    ("serve.py", "iter_export"): "export",
+}
+# Threads parked here with no stage on their stack are idle pool workers
+_IDLE_FILES = ("threading.py", "queue.py", "selectors.py", "thread.py")
+
+def _frame_label(code) -> str:
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+class _Sampler(threading.Thread):
+    def __init__(self, interval, thread_ids=None):
+        super().__init__(name="profile-sampler", daemon=True)
+        self.interval = interval
+        self.thread_ids = thread_ids  # None = every thread
+        self.stacks = Counter()       # (thread name, frames root-first) -> samples
+        self.stages = Counter()       # stage -> samples
+        self.stage_leaves = {}        # stage -> Counter(innermost frame label)
+        self.samples = 0
+        self._done = threading.Event()
+
+    def run(self):
+        me = threading.get_ident()
+        while not self._done.wait(self.interval):
+            names = {t.ident: t.name for t in threading.enumerate()}
+            for tid, frame in sys._current_frames().items():
+                if tid == me or (self.thread_ids is not None and tid not in self.thread_ids):
+                    continue
+                self._record(names.get(tid, str(tid)), frame)
+
+    def _record(self, thread_name, frame):
+        codes = []
+        while frame is not None:
+            codes.append(frame.f_code)
+            frame = frame.f_back
+        stage = None
+        for code in codes:  # innermost first
+            stage = STAGE_FRAMES.get((os.path.basename(code.co_filename), code.co_name))
+            if stage:
+                break
+        if stage is None:
+            if os.path.basename(codes[0].co_filename) in _IDLE_FILES:
+                return
+            stage = "other"
+        self.samples += 1
+        self.stages[stage] += 1
+        self.stage_leaves.setdefault(stage, Counter())[_frame_label(codes[0])] += 1
+        self.stacks[(thread_name, tuple(_frame_label(c) for c in reversed(codes)))] += 1
+
+    def stop(self):
+        self._done.set()
+        self.join()
+
+class Profiler:
+    """Profile the calling thread with cProfile, sample stacks (of every
+    thread, or only the calling one with all_threads=False) and trace
+    allocations, between start() and stop(); write() saves the files into
+    `out_dir` and returns the summary text."""
+
+    def __init__(self, out_dir: str, all_threads: bool = True, memory: bool = PROFILE_MEMORY,
+                 interval: float = PROFILE_INTERVAL, top: int = PROFILE_TOP):
+        self.out_dir = out_dir
+        self.all_threads = all_threads
+        self.memory = memory
+        self.interval = interval
+        self.top = top
+        self.seconds = None
+
+    def start(self):
+        self._own_tracemalloc = False
+        if self.memory and not tracemalloc.is_tracing():
+            tracemalloc.start(PROFILE_MEMORY_FRAMES)
+            self._own_tracemalloc = True
+        self._sampler = _Sampler(self.interval, None if self.all_threads else {threading.get_ident()})
+        self._cprofile = cProfile.Profile()
+        self._t0 = time.perf_counter()
+        self._sampler.start()
+        self._cprofile.enable()
+        return self
+
+    def stop(self):
+        self._cprofile.disable()
+        self.seconds = time.perf_counter() - self._t0
+        self._sampler.stop()
+        self._snapshot = self._peak = None
+        if self._own_tracemalloc:
+            self._snapshot = tracemalloc.take_snapshot().filter_traces([
+                tracemalloc.Filter(False, tracemalloc.__file__), tracemalloc.Filter(False, __file__)])
+            self._peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+        return self
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+        self.write()
+        return False
+
+    def write(self) -> str:
+        os.makedirs(self.out_dir, exist_ok=True)
+        self._cprofile.dump_stats(os.path.join(self.out_dir, "cpu.pstats"))
+        with open(os.path.join(self.out_dir, "stacks.collapsed"), "w", encoding="utf-8") as f:
+            for (thread, frames), n in sorted(self._sampler.stacks.items()):
+                f.write(";".join((thread,) + frames).replace(" ", "_") + f" {n}\n")
+        memory = self._memory_report()
+        if memory:
+            with open(os.path.join(self.out_dir, "memory.txt"), "w", encoding="utf-8") as f:
+                f.write(memory)
+        summary = self.summary()
+        with open(os.path.join(self.out_dir, "summary.txt"), "w", encoding="utf-8") as f:
+            f.write(summary)
+        return summary
+
+    def summary(self) -> str:
+        s = self._sampler
+        out = [f"Profile of {self.seconds:.2f}s → {self.out_dir}/ (cpu.pstats, stacks.collapsed"
+               + (", memory.txt)" if self._snapshot is not None else ")")]
+        out.append(f"\nBy pipeline stage ({s.samples} wall-clock samples every {self.interval * 1000:.0f} ms):")
+        if not s.samples:
+            out.append("  (none: the run was shorter than the sampling interval)")
+        for stage, n in s.stages.most_common():
+            leaves = ", ".join(f"{label} {c * 100 // n}%" for label, c in s.stage_leaves[stage].most_common(3))
+            out.append(f"  {stage:16s} {n * 100 / max(s.samples, 1):5.1f}%  {leaves}")
+        buf = io.StringIO()
+        stats = pstats.Stats(self._cprofile, stream=buf)
+        stats.sort_stats("cumulative").print_stats(self.top)
+        table = buf.getvalue()
+        table = table[table.find("   ncalls"):] if "   ncalls" in table else table
+        out.append(f"\nTop {self.top} by cumulative time (profiled thread, cProfile):\n{table.rstrip()}")
+        if self._snapshot is not None:
+            out.append(f"\nPeak traced memory {self._peak / 2**20:.1f} MB; top allocation sites still live at the end:")
+            for st in self._snapshot.statistics("lineno")[:min(self.top, 10)]:
+                out.append(f"  {st.size / 2**20:8.2f} MB {st.count:8d} blocks  {st.traceback[0]}")
+        return "\n".join(out) + "\n"
+
+    def _memory_report(self):
+        if self._snapshot is None:
+            return None
+        out = [f"peak {self._peak / 2**20:.1f} MB\n", "Top allocation sites (live at the end of the run):"]
+        out += [f"  {st}" for st in self._snapshot.statistics("lineno")[:50]]
+        out.append("\nTop allocation tracebacks:")
+        for st in self._snapshot.statistics("traceback")[:10]:
+            out.append(f"\n{st.size / 2**20:.2f} MB in {st.count} blocks")
+            out += [f"    {line}" for line in st.traceback.format()]
+        return "\n".join(out) + "\n"
+
+_call_lock = threading.Lock()  # tracemalloc and the sampler see the whole process
+_call_seq = itertools.count(1)
+
+def profile_call(fn, out_dir: str):
+    """Wrap `fn` so every call runs under a Profiler writing to a fresh
+    directory below `out_dir`. Profiled calls run one at a time."""
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        with _call_lock:
+            name = f"{time.strftime('%Y%m%dT%H%M%S')}-{next(_call_seq):04d}-{fn.__name__}"
+            prof = Profiler(os.path.join(out_dir, name), all_threads=False).start()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                prof.stop()
+                print(prof.write(), flush=True)
+    return wrapper
@@ -0,0 +1,69 @@
+import os, time, threading
+from collections import OrderedDict
+
+# In-process LRU/TTL cache for serve.py responses. Keys carry the database
+# data_version, so a collector commit makes every older entry unreachable;
+# they age out through LRU/TTL rather than being flushed.
+
+SERVE_CACHE_ENTRIES = int(os.getenv("SERVE_CACHE_ENTRIES", "512"))
+SERVE_CACHE_MAX_BYTES = int(os.getenv("SERVE_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+SERVE_CACHE_TTL = float(os.getenv("SERVE_CACHE_TTL", "300"))
+
+class ResponseCache:
+    def __init__(self, max_entries: int = SERVE_CACHE_ENTRIES, max_bytes: int = SERVE_CACHE_MAX_BYTES,
+                 ttl: float = SERVE_CACHE_TTL):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # key -> (expires, size, value)
+        self.bytes = 0
+        self.hits = self.misses = self.evictions = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > time.monotonic():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[2]
+            if entry is not None:
+                self._drop(key)
+            self.misses += 1
+            return None
+
+    def put(self, key, value, size: int):
+        if size > self.max_bytes // 4:
+            return  # one response may not push out most of the cache
+        with self._lock:
+            if key in self._entries:
+                self._drop(key)
+            self._entries[key] = (time.monotonic() + self.ttl, size, value)
+            self.bytes += size
+            while len(self._entries) > self.max_entries or self.bytes > self.max_bytes:
+                self._drop(next(iter(self._entries)))
+                self.evictions += 1
+
+    def _drop(self, key):
+        _, size, _ = self._entries.pop(key)
+        self.bytes -= size
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.bytes = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self.bytes,
+                "max_entries": self.max_entries,
+                "max_bytes": self.max_bytes,
+                "ttl_seconds": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else None,
+            }
@@ -0,0 +1,170 @@
+import hashlib, html, re
+from sqlalchemy import text, bindparam
+from db import BULK_PAGE_SIZE
+
+# Full-text index over bills.title/summary/subjects and their action texts.
+# SQLite: an FTS5 table whose rowid is derived from bill_uid, so a bill's
+# entry is replaced by rowid without scanning. Postgres: a tsvector column
+# with a GIN index. Other dialects have no index and /search returns nothing.
+
+SEARCH_SCHEMA = {
+    "sqlite": [
+        """CREATE VIRTUAL TABLE IF NOT EXISTS bills_fts USING fts5(
+             bill_uid UNINDEXED, title, summary, subjects, actions,
+             tokenize='porter unicode61'
+           )""",
+    ],
+    "postgresql": [
+        """CREATE TABLE IF NOT EXISTS bill_search (
+             bill_uid TEXT PRIMARY KEY,
+             document TSVECTOR NOT NULL
+           )""",
+        "CREATE INDEX IF NOT EXISTS idx_bill_search_document ON bill_search USING GIN (document)",
+    ],
+}
+
+SEARCH_TABLE = {"sqlite": "bills_fts", "postgresql": "bill_search"}
+
+def ensure_search_schema(conn) -> bool:
+    stmts = SEARCH_SCHEMA.get(conn.dialect.name)
+    for stmt in stmts or []:
+        conn.execute(text(stmt))
+    return bool(stmts)
+
+def fts_rowid(bill_uid: str) -> int:
+    # 60 bits of sha256: a positive int64, stable across runs and VACUUM
+    return int(hashlib.sha256(bill_uid.encode("utf-8")).hexdigest()[:15], 16)
+
+def search_row(bill, action_texts):
+    return {
+        "bill_uid": bill["bill_uid"],
+        "title": bill.get("title") or "",
+        "summary": bill.get("summary") or "",
+        "subjects": (bill.get("subjects") or "").replace(",", " "),
+        "actions": "\n".join(t for t in action_texts if t),
+    }
+
+_FTS_DELETE_SQL = text("DELETE FROM bills_fts WHERE rowid IN :ids").bindparams(bindparam("ids", expanding=True))
+_FTS_INSERT_SQL = text("""
+    INSERT INTO bills_fts (rowid, bill_uid, title, summary, subjects, actions)
+    VALUES (:rowid, :bill_uid, :title, :summary, :subjects, :actions)
+""")
+_PG_UPSERT_SQL = text("""
+    INSERT INTO bill_search (bill_uid, document)
+    VALUES (:bill_uid,
+            setweight(to_tsvector('english', :title), 'A') ||
+            setweight(to_tsvector('english', :subjects), 'B') ||
+            setweight(to_tsvector('english', :summary), 'B') ||
+            setweight(to_tsvector('english', :actions), 'C'))
+    ON CONFLICT (bill_uid) DO UPDATE SET document=excluded.document
+""")
+
+def index_bills(conn, rows):
+    """Replace the search entries of the bills in `rows` (from search_row)."""
+    if not rows:
+        return
+    rows = list({r["bill_uid"]: r for r in rows}.values())
+    dialect = conn.dialect.name
+    if dialect == "sqlite":
+        for r in rows:
+            r["rowid"] = fts_rowid(r["bill_uid"])
+        for i in range(0, len(rows), BULK_PAGE_SIZE):
+            conn.execute(_FTS_DELETE_SQL, {"ids": [r["rowid"] for r in rows[i:i + BULK_PAGE_SIZE]]})
+        conn.execute(_FTS_INSERT_SQL, rows)
+    elif dialect == "postgresql":
+        conn.execute(_PG_UPSERT_SQL, rows)
+
+_ACTION_TEXT_SQL = text("SELECT bill_uid, action_text FROM actions WHERE bill_uid IN :uids ORDER BY action_date") \
+    .bindparams(bindparam("uids", expanding=True))
+
+def backfill_search(conn, chunk=BULK_PAGE_SIZE * 10) -> int:
+    """Index every stored bill, once: a no-op when the index already has
+    rows or the dialect has none. Returns the number of bills indexed."""
+    table = SEARCH_TABLE.get(conn.dialect.name)
+    if table is None or conn.execute(text(f"SELECT 1 FROM {table} LIMIT 1")).first():
+        return 0
+    done, after = 0, ""
+    while True:
+        bills = conn.execute(text("""
+            SELECT bill_uid, title, summary, subjects FROM bills
+            WHERE bill_uid > :after ORDER BY bill_uid LIMIT :lim
+        """), {"after": after, "lim": chunk}).mappings().all()
+        if not bills:
+            return done
+        texts = {}
+        uids = [b["bill_uid"] for b in bills]
+        for i in range(0, len(uids), BULK_PAGE_SIZE):
+            for r in conn.execute(_ACTION_TEXT_SQL, {"uids": uids[i:i + BULK_PAGE_SIZE]}):
+                texts.setdefault(r.bill_uid, []).append(r.action_text)
+        index_bills(conn, [search_row(b, texts.get(b["bill_uid"], [])) for b in bills])
+        done += len(bills)
+        after = uids[-1]
+
+_WORD = re.compile(r"\w+", re.UNICODE)
+
+def fts5_query(q: str) -> str:
+    # Words only, each quoted, so user input can't hit FTS5 query syntax;
+    # a trailing * on the last word keeps it a prefix search.
+    words = _WORD.findall(q or "")
+    if not words:
+        return ""
+    terms = [f'"{w}"' for w in words]
+    if q.rstrip().endswith("*"):
+        terms[-1] += "*"
+    return " ".join(terms)
+
+# snippet()/ts_headline() mark matches with control characters that bill
+# text doesn't contain; the snippet is HTML-escaped before they become <b>
+HIT_START, HIT_END = "\x02", "\x03"
+
+def _highlight(rows):
+    out = []
+    for r in rows:
+        d = dict(r)
+        if d.get("snippet"):
+            d["snippet"] = html.escape(d["snippet"]).replace(HIT_START, "<b>").replace(HIT_END, "</b>")
+        out.append(d)
+    return out
+
+def search_bills(conn, q: str, columns: str, where, params, limit: int):
+    """Ranked bill matches for `q` with a highlighted snippet: HTML-escaped
+    text with <b></b> around the matches.
+
+    `columns`, `where` and `params` are the bill listing's (aliases b and l),
+    so the usual filters apply on top of the match.
+    """
+    dialect = conn.dialect.name
+    if dialect == "sqlite":
+        match = fts5_query(q)
+        if not match:
+            return []
+        sql = f"""
+            SELECT {columns},
+                   snippet(bills_fts, -1, :hit_start, :hit_end, '…', 16) AS snippet,
+                   bm25(bills_fts, 0.0, 10.0, 4.0, 4.0, 1.0) AS rank
+            FROM bills_fts f
+            JOIN bills b ON b.bill_uid=f.bill_uid
+            LEFT JOIN labels l ON l.bill_uid=b.bill_uid
+            WHERE {" AND ".join(["bills_fts MATCH :match"] + where)}
+            ORDER BY rank
+            LIMIT :lim
+        """
+        params = dict(params, match=match, lim=limit, hit_start=HIT_START, hit_end=HIT_END)
+        return _highlight(conn.execute(text(sql), params).mappings())
+    if dialect == "postgresql":
+        sql = f"""
+            SELECT {columns},
+                   ts_headline('english', COALESCE(b.title, '') || ' — ' || COALESCE(b.summary, ''), query,
+                               :headline) AS snippet,
+                   -ts_rank_cd(s.document, query) AS rank
+            FROM websearch_to_tsquery('english', :q) query
+            JOIN bill_search s ON s.document @@ query
+            JOIN bills b ON b.bill_uid=s.bill_uid
+            LEFT JOIN labels l ON l.bill_uid=b.bill_uid
+            {"WHERE " + " AND ".join(where) if where else ""}
+            ORDER BY rank
+            LIMIT :lim
+        """
+        params = dict(params, q=q, lim=limit, headline=f"StartSel={HIT_START}, StopSel={HIT_END}, MaxWords=30, MinWords=10")
+        return _highlight(conn.execute(text(sql), params).mappings())
+    return []
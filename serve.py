@@ -1,16 +1,165 @@
-import os
-from datetime import date, datetime
-from fastapi import FastAPI, Request
-from fastapi.responses import HTMLResponse, JSONResponse
-from sqlalchemy import create_engine, text
+import os, io, re, csv, json, time, base64, hashlib
+from contextlib import nullcontext
+from datetime import date, datetime, timedelta
+from urllib.parse import urlencode
+from fastapi import FastAPI, Request, HTTPException
+from fastapi.responses import HTMLResponse, JSONResponse, Response, StreamingResponse
+from starlette.concurrency import run_in_threadpool
+from sqlalchemy import text, bindparam
 from dotenv import load_dotenv
+from db import get_engine, facet_id, get_data_version
+from response_cache import ResponseCache
+from search import search_bills
+from metrics import REGISTRY, format_metric
 
 load_dotenv()
-DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///policy_radar.db")
-engine = create_engine(DATABASE_URL, future=True)
+engine = get_engine("reader")
 
 app = FastAPI(title="Policy Radar")
 
+# Read-only pages served from the response cache, keyed by path, sorted
+# query params, data_version and today's date (effective_status depends on it)
+CACHED_PATHS = {"/", "/bills", "/facets", "/search", "/news"}
+# How stale the data_version we key on may be, in seconds
+DATA_VERSION_CHECK = float(os.getenv("DATA_VERSION_CHECK", "1.0"))
+
+cache = ResponseCache()
+_version = {"value": None, "checked": None}
+
+def current_data_version():
+    now = time.monotonic()
+    if _version["checked"] is None or now - _version["checked"] >= DATA_VERSION_CHECK:
+        with engine.connect() as conn:
+            _version["value"] = get_data_version(conn)
+        _version["checked"] = now
+    return _version["value"]
+
+@app.middleware("http")
+async def cache_responses(request: Request, call_next):
+    if request.method != "GET" or request.url.path not in CACHED_PATHS:
+        return await call_next(request)
+    version = await run_in_threadpool(current_data_version)
+    key = (request.url.path, urlencode(sorted(request.query_params.multi_items())), version, date.today().isoformat())
+    etag = '"' + hashlib.sha256(repr(key).encode("utf-8")).hexdigest()[:32] + '"'
+    if etag in [t.strip() for t in request.headers.get("if-none-match", "").split(",")]:
+        return Response(status_code=304, headers={"ETag": etag})
+    hit = cache.get(key)
+    if hit is None:
+        response = await call_next(request)
+        if response.status_code != 200:
+            return response
+        body = b"".join([chunk async for chunk in response.body_iterator])
+        headers = {k: v for k, v in response.headers.items() if k.lower() != "content-length"}
+        hit = (body, headers)
+        cache.put(key, hit, len(body))
+    body, headers = hit
+    return Response(body, headers=dict(headers, ETag=etag, **{"Cache-Control": "no-cache"}))
+
+# Registered after cache_responses, so it wraps it: cached hits are timed too.
+# Streaming responses are timed up to their headers.
+@app.middleware("http")
+async def time_requests(request: Request, call_next):
+    if not REGISTRY.enabled:
+        return await call_next(request)
+    t0 = time.perf_counter()
+    response = await call_next(request)
+    route = request.scope.get("route")
+    # route templates only, so unknown URLs can't grow the label set
+    path = route.path if route is not None else (request.url.path if request.url.path in CACHED_PATHS else "other")
+    REGISTRY.observe("http_server_request_seconds", time.perf_counter() - t0, method=request.method, route=path)
+    REGISTRY.inc("http_server_responses_total", method=request.method, route=path, code=str(response.status_code))
+    return response
+
+@app.get("/cache/stats")
+def cache_stats():
+    return JSONResponse(dict(cache.stats(), data_version=_version["value"]))
+
+def collector_run_metrics(conn) -> str:
+    """Ingest stats from collector_runs: all-time totals as counters, the
+    latest run of each collector as gauges."""
+    totals = conn.execute(text("""
+        SELECT collector, status, COUNT(*) AS runs, SUM(seconds) AS seconds,
+               SUM(bills_new) AS bills_new, SUM(bills_changed) AS bills_changed,
+               SUM(bills_skipped) AS bills_skipped, SUM(news_new) AS news_new,
+               SUM(alerts_queued) AS alerts_queued, SUM(alerts_sent) AS alerts_sent
+        FROM collector_runs GROUP BY collector, status
+    """)).mappings().all()
+    latest = conn.execute(text("""
+        SELECT r.collector, r.started_at, r.seconds, r.stats FROM collector_runs r
+        JOIN (SELECT collector, MAX(started_at) AS started_at FROM collector_runs GROUP BY collector) m
+          ON m.collector=r.collector AND m.started_at=r.started_at
+    """)).mappings().all()
+
+    def summed(col, label=None, value=None):
+        out = {}
+        for r in totals:
+            labels = {"collector": r["collector"]}
+            if label:
+                labels[label] = value
+            k = tuple(labels.items())
+            out[k] = out.get(k, 0) + (r[col] or 0)
+        return [(dict(k), v) for k, v in out.items()]
+
+    parts = [
+        format_metric("collector_runs_total", "counter",
+                      [({"collector": r["collector"], "status": r["status"]}, r["runs"]) for r in totals],
+                      "Collector runs recorded, by status"),
+        format_metric("collector_run_seconds_total", "counter", summed("seconds"), "Wall time of all collector runs"),
+        format_metric("collector_bills_total", "counter",
+                      summed("bills_new", "result", "new") + summed("bills_changed", "result", "changed")
+                      + summed("bills_skipped", "result", "skipped"),
+                      "Bills seen by collectors, by result"),
+        format_metric("collector_news_new_total", "counter", summed("news_new"), "New RSS/HTTP items stored"),
+        format_metric("collector_alerts_total", "counter",
+                      summed("alerts_queued", "state", "queued") + summed("alerts_sent", "state", "sent"),
+                      "Alerts queued and sent by collectors"),
+    ]
+    started, duration, rate, stage_s, host_s, host_n, alert_p95 = [], [], [], [], [], [], []
+    for r in latest:
+        c = {"collector": r["collector"]}
+        stats = json.loads(r["stats"] or "{}")
+        started.append((c, datetime.fromisoformat(r["started_at"]).timestamp()))
+        duration.append((c, r["seconds"] or 0))
+        if (stats.get("rates") or {}).get("bills_per_second") is not None:
+            rate.append((c, stats["rates"]["bills_per_second"]))
+        for name, s in (stats.get("stages") or {}).items():
+            stage_s.append((dict(c, stage=name), s["seconds"]))
+        for host, s in (stats.get("hosts") or {}).items():
+            host_s.append((dict(c, host=host), s["seconds"]))
+            host_n.append((dict(c, host=host), s["count"]))
+        latency = (stats.get("alerts") or {}).get("latency")
+        if latency and latency.get("p95_seconds") is not None:
+            alert_p95.append((c, latency["p95_seconds"]))
+    parts += [
+        format_metric("collector_last_run_start_seconds", "gauge", started, "Start of the latest run (unix time)"),
+        format_metric("collector_last_run_duration_seconds", "gauge", duration, "Duration of the latest run"),
+        format_metric("collector_last_run_bills_per_second", "gauge", rate, "Bills processed per second in the latest run"),
+        format_metric("collector_last_run_stage_seconds", "gauge", stage_s, "Seconds per pipeline stage in the latest run"),
+        format_metric("collector_last_run_request_seconds", "gauge", host_s, "Seconds in HTTP requests per host in the latest run"),
+        format_metric("collector_last_run_requests", "gauge", host_n, "HTTP requests per host in the latest run"),
+        format_metric("collector_last_run_alert_latency_p95_seconds", "gauge", alert_p95,
+                      "Queue-to-delivery alert latency (p95 bucket bound) in the latest run"),
+    ]
+    return "".join(parts)
+
+@app.get("/metrics")
+def metrics():
+    """Prometheus text format: serve.py request latencies and response cache
+    counters from this process, ingest stats from collector_runs."""
+    stats = cache.stats()
+    parts = [
+        REGISTRY.render(),
+        format_metric("response_cache_lookups_total", "counter",
+                      [({"result": "hit"}, stats["hits"]), ({"result": "miss"}, stats["misses"])],
+                      "Response cache lookups"),
+        format_metric("response_cache_bytes", "gauge", [({}, stats["bytes"])], "Bytes held by the response cache"),
+    ]
+    with engine.connect() as conn:
+        parts.append(collector_run_metrics(conn))
+    return Response("".join(parts), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+EFFECTIVE_SOON_DAYS = 90
+
 def effective_status(eff_date: str | None) -> str:
     if not eff_date:
         return "unknown"
@@ -21,36 +170,135 @@ def effective_status(eff_date: str | None) -> str:
     today = date.today()
     if d <= today:
         return "active"
-    elif (d - today).days <= 90:
+    elif (d - today).days <= EFFECTIVE_SOON_DAYS:
         return "effective soon"
     else:
         return "scheduled"
 
-@app.get("/bills")
-def list_bills(topic: str = "", state: str = "", status: str = "", limit: int = 100):
+# Largest page /bills and the dashboard return; walk further with the cursor
+MAX_PAGE_SIZE = int(os.getenv("MAX_PAGE_SIZE", "1000"))
+
+BILL_COLUMNS = """
+    b.bill_uid, b.jurisdiction, b.bill_number, b.title, b.status_general, b.last_action_date,
+    b.effective_date, b.updated_at, COALESCE(l.topic_labels, '') AS topic_labels
+"""
+
+def bill_filters(topic: str = "", state: str = "", status: str = "", only_effective_soon: int = 0):
+    """WHERE clauses and params shared by every bill listing."""
     where = []
     params = {}
     if topic:
-        where.append("EXISTS (SELECT 1 FROM labels l WHERE l.bill_uid=b.bill_uid AND l.topic_labels LIKE :topic)")
-        params["topic"] = f"%{topic}%"
+        where.append("EXISTS (SELECT 1 FROM bill_facets bf WHERE bf.facet_id=:topic AND bf.bill_uid=b.bill_uid)")
+        params["topic"] = facet_id("topic", topic)
     if state:
         where.append("b.jurisdiction=:st")
         params["st"] = state
     if status:
         where.append("b.status_general=:sg")
         params["sg"] = status
+    if only_effective_soon:
+        # effective_status() in ("active", "effective soon"): ISO dates compare as strings
+        where.append("b.effective_date IS NOT NULL AND b.effective_date <> '' AND b.effective_date < :eff_before")
+        params["eff_before"] = (date.today() + timedelta(days=EFFECTIVE_SOON_DAYS + 1)).isoformat()
+    return where, params
+
+def encode_cursor(row) -> str:
+    raw = json.dumps([row["updated_at"], row["bill_uid"]], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+def decode_cursor(cursor: str):
+    try:
+        updated_at, bill_uid = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+    except Exception:
+        raise HTTPException(status_code=400, detail="invalid cursor")
+    return updated_at, bill_uid
+
+def _bills_page(conn, where, params, limit, after=None):
+    # Keyset order is (updated_at DESC, bill_uid DESC) over bills that have an
+    # updated_at, then bills without one by bill_uid DESC. Each segment is a
+    # range scan on an index ending in (updated_at, bill_uid).
+    rows = []
+    if after is None or after[0] is not None:
+        seg = ["b.updated_at IS NOT NULL"]
+        p = dict(params)
+        if after is not None:
+            seg = ["(b.updated_at < :cu OR (b.updated_at = :cu AND b.bill_uid < :cb))"]
+            p.update(cu=after[0], cb=after[1])
+        rows = _bills_segment(conn, where + seg, p, "b.updated_at DESC, b.bill_uid DESC", limit)
+        after = None
+    if len(rows) < limit:
+        seg = ["b.updated_at IS NULL"]
+        p = dict(params)
+        if after is not None:
+            seg.append("b.bill_uid < :cb")
+            p["cb"] = after[1]
+        rows += _bills_segment(conn, where + seg, p, "b.bill_uid DESC", limit - len(rows))
+    return rows
+
+def _bills_segment(conn, where, params, order, limit):
     sql = f"""
-        SELECT b.bill_uid, b.jurisdiction, b.bill_number, b.title, b.status_general, b.last_action_date,
-               b.effective_date, COALESCE(l.topic_labels, '') AS topic_labels
+        SELECT {BILL_COLUMNS}
         FROM bills b
         LEFT JOIN labels l ON l.bill_uid=b.bill_uid
-        {"WHERE " + " AND ".join(where) if where else ""}
-        ORDER BY b.updated_at DESC
+        WHERE {" AND ".join(where)}
+        ORDER BY {order}
         LIMIT :lim
     """
-    params["lim"] = limit
-    with engine.begin() as conn:
-        rows = conn.execute(text(sql), params).mappings().all()
+    return conn.execute(text(sql), dict(params, lim=limit)).mappings().all()
+
+def query_bills(topic: str = "", state: str = "", status: str = "", only_effective_soon: int = 0,
+                limit: int = 100, cursor: str = ""):
+    """One page of bills, newest update first, filtered entirely in SQL.
+    Returns (rows, next_cursor); next_cursor is None on the last page."""
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+    where, params = bill_filters(topic, state, status, only_effective_soon)
+    after = decode_cursor(cursor) if cursor else None
+    with engine.connect() as conn:
+        rows = _bills_page(conn, where, params, limit, after)
+    next_cursor = encode_cursor(rows[-1]) if len(rows) == limit else None
+    return rows, next_cursor
+
+@app.get("/bills")
+def list_bills(topic: str = "", state: str = "", status: str = "", only_effective_soon: int = 0,
+               limit: int = 100, cursor: str = ""):
+    rows, next_cursor = query_bills(topic, state, status, only_effective_soon, limit, cursor)
+    data = []
+    for r in rows:
+        d = dict(r)
+        d["effective_status"] = effective_status(d.get("effective_date"))
+        data.append(d)
+    headers = {"X-Next-Cursor": next_cursor} if next_cursor else {}
+    return JSONResponse(data, headers=headers)
+
+FACET_KINDS = ("topic", "state", "status", "committee", "subject", "sponsor")
+
+@app.get("/facets")
+def list_facets(kinds: str = "topic,state,status,committee", top: int = 50):
+    """Bill counts per facet value from facet_counts (kept current by every write),
+    the `top` largest per kind."""
+    wanted = [k for k in kinds.split(",") if k in FACET_KINDS]
+    if not wanted:
+        return JSONResponse({"facets": {}, "refreshed_at": None})
+    sql = text("SELECT kind, value, bills, refreshed_at FROM facet_counts WHERE kind IN :kinds ORDER BY kind, bills DESC, value") \
+        .bindparams(bindparam("kinds", expanding=True))
+    with engine.connect() as conn:
+        rows = conn.execute(sql, {"kinds": wanted}).all()
+    data = {k: [] for k in wanted}
+    refreshed = None
+    for r in rows:
+        if len(data[r.kind]) < top:
+            data[r.kind].append({"value": r.value, "count": r.bills})
+        refreshed = max(refreshed or "", r.refreshed_at or "") or None
+    return JSONResponse({"facets": data, "refreshed_at": refreshed})
+
+@app.get("/search")
+def search(q: str, topic: str = "", state: str = "", status: str = "", only_effective_soon: int = 0, limit: int = 50):
+    """Full-text search over title, summary, subjects and action text, best
+    match first, with the /bills filters."""
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+    where, params = bill_filters(topic, state, status, only_effective_soon)
+    with engine.connect() as conn:
+        rows = search_bills(conn, q, BILL_COLUMNS, where, params, limit)
     data = []
     for r in rows:
         d = dict(r)
@@ -58,32 +306,116 @@ def list_bills(topic: str = "", state: str = "", status: str = "", limit: int =
         data.append(d)
     return JSONResponse(data)
 
-@app.get("/", response_class=HTMLResponse)
-def dashboard(request: Request, topic: str = "", state: str = "", status: str = "", limit: int = 100, only_effective_soon: int = 0):
-    base_sql = """
-        SELECT b.bill_uid, b.jurisdiction, b.bill_number, b.title, b.status_general,
-               b.last_action_date, b.effective_date, COALESCE(l.topic_labels, '') AS topic_labels
+EXPORT_CHUNK = int(os.getenv("EXPORT_CHUNK", "1000"))
+EXPORT_FIELDS = ["bill_uid", "jurisdiction", "bill_number", "title", "status_general", "last_action_date",
+                 "effective_date", "updated_at", "topic_labels", "effective_status"]
+ACTION_EXPORT_FIELDS = ["action_date", "organization", "classification", "action_text"]
+_EXPORT_ACTIONS_SQL = text("""
+    SELECT bill_uid, action_date, organization, classification, action_text FROM actions
+    WHERE bill_uid IN :uids ORDER BY bill_uid, action_date
+""").bindparams(bindparam("uids", expanding=True))
+
+def iter_export(topic="", state="", status="", only_effective_soon=0, limit=0, include_actions=0):
+    """Yield lists of bill dicts (with "actions" when asked), EXPORT_CHUNK at
+    a time, from a server-side cursor: memory stays flat however many
+    bills match."""
+    where, params = bill_filters(topic, state, status, only_effective_soon)
+    sql = f"""
+        SELECT {BILL_COLUMNS}
         FROM bills b
         LEFT JOIN labels l ON l.bill_uid=b.bill_uid
-        ORDER BY b.updated_at DESC
+        {"WHERE " + " AND ".join(where) if where else ""}
+        ORDER BY b.updated_at DESC, b.bill_uid DESC
+        {"LIMIT :lim" if limit > 0 else ""}
+    """
+    if limit > 0:
+        params["lim"] = limit
+    with engine.connect() as conn:
+        result = conn.execution_options(stream_results=True, yield_per=EXPORT_CHUNK).execute(text(sql), params)
+        # actions are read on a second connection: the first is busy streaming
+        with (engine.connect() if include_actions else nullcontext()) as aconn:
+            keys = list(result.keys())
+            for part in result.partitions(EXPORT_CHUNK):
+                bills = []
+                for r in part:
+                    d = dict(zip(keys, r))
+                    d["effective_status"] = effective_status(d["effective_date"])
+                    bills.append(d)
+                if include_actions:
+                    acts = {}
+                    for a in aconn.execute(_EXPORT_ACTIONS_SQL, {"uids": [b["bill_uid"] for b in bills]}).mappings():
+                        acts.setdefault(a["bill_uid"], []).append({f: a[f] for f in ACTION_EXPORT_FIELDS})
+                    for b in bills:
+                        b["actions"] = acts.get(b["bill_uid"], [])
+                yield bills
+
+@app.get("/export.ndjson")
+def export_ndjson(topic: str = "", state: str = "", status: str = "", only_effective_soon: int = 0,
+                  limit: int = 0, include_actions: int = 0):
+    def lines():
+        for bills in iter_export(topic, state, status, only_effective_soon, limit, include_actions):
+            yield "".join(json.dumps(b, ensure_ascii=False) + "\n" for b in bills)
+    return StreamingResponse(lines(), media_type="application/x-ndjson",
+                             headers={"Content-Disposition": 'attachment; filename="bills.ndjson"'})
+
+@app.get("/export.csv")
+def export_csv(topic: str = "", state: str = "", status: str = "", only_effective_soon: int = 0,
+               limit: int = 0, include_actions: int = 0):
+    """One row per bill, or with include_actions one row per action (bill
+    columns repeated; bills without actions get one row)."""
+    fields = EXPORT_FIELDS + (ACTION_EXPORT_FIELDS if include_actions else [])
+
+    def rows():
+        buf = io.StringIO()
+        w = csv.DictWriter(buf, fieldnames=fields, extrasaction="ignore")
+        w.writeheader()
+        for bills in iter_export(topic, state, status, only_effective_soon, limit, include_actions):
+            for b in bills:
+                if include_actions and b["actions"]:
+                    w.writerows(dict(b, **a) for a in b["actions"])
+                else:
+                    w.writerow(b)
+            yield buf.getvalue()
+            buf.seek(0)
+            buf.truncate()
+    return StreamingResponse(rows(), media_type="text/csv",
+                             headers={"Content-Disposition": 'attachment; filename="bills.csv"'})
+
+@app.get("/news")
+def list_news(topic: str = "", state: str = "", source: str = "", q: str = "", limit: int = 100):
+    where = []
+    params = {}
+    if topic:
+        # whole comma-separated labels only, so "ai" doesn't match "privacy"
+        where.append("(',' || REPLACE(COALESCE(n.topic_labels, ''), ' ', '') || ',') LIKE :topic ESCAPE '!'")
+        params["topic"] = "%," + re.sub(r"([!%_])", r"!\1", topic.strip()) + ",%"
+    if state:
+        where.append("n.jurisdiction=:st")
+        params["st"] = state
+    if source:
+        where.append("n.source=:src")
+        params["src"] = source
+    if q:
+        where.append("(LOWER(n.title) LIKE :q OR LOWER(n.summary) LIKE :q)")
+        params["q"] = f"%{q.lower()}%"
+    sql = f"""
+        SELECT n.id, n.source, n.jurisdiction, n.title, n.summary, n.url, n.status,
+               n.effective_date, COALESCE(n.topic_labels, '') AS topic_labels, n.first_seen
+        FROM news_items n
+        {"WHERE " + " AND ".join(where) if where else ""}
+        ORDER BY n.first_seen DESC
         LIMIT :lim
     """
+    params["lim"] = limit
     with engine.begin() as conn:
-        rows = conn.execute(text(base_sql), {"lim": limit}).mappings().all()
+        rows = conn.execute(text(sql), params).mappings().all()
+    return JSONResponse([dict(r) for r in rows])
 
-    items = []
-    for r in rows:
-        topics = (r["topic_labels"] or "").split(",") if r["topic_labels"] else []
-        if topic and topic not in topics:
-            continue
-        if state and state != r["jurisdiction"]:
-            continue
-        if status and status != r["status_general"]:
-            continue
-        eff_stat = effective_status(r["effective_date"])
-        if only_effective_soon and eff_stat not in ("effective soon", "active"):
-            continue
-        items.append((r, eff_stat))
+@app.get("/", response_class=HTMLResponse)
+def dashboard(request: Request, topic: str = "", state: str = "", status: str = "", limit: int = 100, only_effective_soon: int = 0,
+              cursor: str = ""):
+    rows, next_cursor = query_bills(topic, state, status, only_effective_soon, limit, cursor)
+    items = [(r, effective_status(r["effective_date"])) for r in rows]
 
     def selected(val, opt):
         return "selected" if str(val) == str(opt) else ""
@@ -176,8 +508,24 @@ def dashboard(request: Request, topic: str = "", state: str = "", status: str =
     html += """
             </tbody>
         </table>
+    """
+    if next_cursor:
+        qs = urlencode({"topic": topic, "state": state, "status": status, "limit": limit,
+                        "only_effective_soon": only_effective_soon, "cursor": next_cursor})
+        html += f'<p><a href="/?{qs}">Next page →</a></p>'
+    html += """
         <p style="margin-top:12px;color:#666;font-size:12px;">Tip: filter by two-letter postal (e.g., CA) or full state name (e.g., California).</p>
     </body>
     </html>
     """
     return HTMLResponse(html)
+
+# SERVE_PROFILE=1 profiles every request's handler (see profiling.py) into
+# PROFILE_DIR/serve/, one directory per request; requests are serialized
+# while it's on. Streaming bodies (/export) are profiled up to the return.
+if os.getenv("SERVE_PROFILE", "0") == "1":
+    from fastapi.routing import APIRoute
+    from profiling import PROFILE_DIR, profile_call
+    for route in app.routes:
+        if isinstance(route, APIRoute) and route.path != "/metrics":
+            route.dependant.call = profile_call(route.dependant.call, os.path.join(PROFILE_DIR, "serve"))